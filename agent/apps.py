@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AgentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agent'
+
+    def ready(self):
+        # Registers the Project save/delete signals that invalidate cached detail cards
+        from agent.tools import project_info_tool  # noqa: F401
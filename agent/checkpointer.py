@@ -0,0 +1,433 @@
+import random
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from agent.models import GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite
+
+
+# list values remembered per (thread, namespace, channel) to diff appends against
+APPEND_BASES_SIZE = 1024
+
+
+class DjangoCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    LangGraph checkpointer stored in the Django database.
+
+    Usage:
+        app = build_graph().compile(checkpointer=DjangoCheckpointSaver())
+        app.invoke({"messages": [new_message]}, {"configurable": {"thread_id": str(conversation_id)}})
+
+    Storage is delta-based, like the official Postgres saver: each checkpoint
+    row only holds channel *versions*; a channel's value is written to
+    GraphCheckpointBlob once per new version, so channels a step didn't touch
+    cost nothing. `prune()` drops old checkpoints and blobs nobody references.
+
+    Appending channels (`messages`) get a new version every step, so a list
+    that extends the one this saver last wrote or read for the thread is
+    stored as just the appended items, on top of that `base_version`. Reads
+    rebuild it from the chain. When the base isn't known (e.g. a fresh
+    process), the whole list is written once and later steps append to it.
+
+    The async methods run the ORM work via sync_to_async, so the saver works
+    with both `invoke` and `ainvoke`. LangGraph calls put/put_writes from
+    background threads; writes are serialized with a lock because SQLite
+    allows a single writer.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._write_lock = threading.Lock()
+        # (thread_id, checkpoint_ns, channel) -> (version, list value)
+        self._append_bases: "OrderedDict[Tuple[str, str, str], Tuple[str, list]]" = OrderedDict()
+        self._bases_lock = threading.Lock()
+
+    # ---------- helpers ----------
+
+    @staticmethod
+    def _ids(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    @staticmethod
+    def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        match = Q()
+        for channel, version in versions.items():
+            match |= Q(channel=channel, version=str(version))
+        rows = GraphCheckpointBlob.objects.filter(match, thread_id=thread_id, checkpoint_ns=checkpoint_ns)
+        values = {}
+        for row in rows:
+            if row.value_type == "empty":
+                continue
+            if row.base_version:
+                values[row.channel] = self._load_appended(row)
+            else:
+                values[row.channel] = self._loads_blob(row)
+            self._remember_list(thread_id, checkpoint_ns, row.channel, row.version, values[row.channel])
+        return values
+
+    def _loads_blob(self, row: GraphCheckpointBlob) -> Any:
+        return self.serde.loads_typed((row.value_type, bytes(row.value)))
+
+    def _load_appended(self, row: GraphCheckpointBlob) -> list:
+        # one query for the channel's blobs, then follow the chain of bases
+        chain = {
+            blob.version: blob
+            for blob in GraphCheckpointBlob.objects.filter(
+                thread_id=row.thread_id, checkpoint_ns=row.checkpoint_ns, channel=row.channel
+            )
+        }
+        parts = [self._loads_blob(row)]
+        while row.base_version:
+            row = chain[row.base_version]
+            parts.append(self._loads_blob(row))
+        return [item for part in reversed(parts) for item in part]
+
+    def _remember_list(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, value: Any) -> None:
+        if not isinstance(value, list):
+            return
+        key = (thread_id, checkpoint_ns, channel)
+        with self._bases_lock:
+            # a copy: the caller may go on appending to its list in place
+            self._append_bases[key] = (str(version), list(value))
+            self._append_bases.move_to_end(key)
+            while len(self._append_bases) > APPEND_BASES_SIZE:
+                self._append_bases.popitem(last=False)
+
+    def _append_base(self, thread_id: str, checkpoint_ns: str, channel: str, value: Any) -> Optional[Tuple[str, int]]:
+        """
+        (base version, base length) when `value` extends the list last
+        written or read for this channel, else None.
+        """
+        if not isinstance(value, list):
+            return None
+        with self._bases_lock:
+            known = self._append_bases.get((thread_id, checkpoint_ns, channel))
+        if known is None:
+            return None
+        version, base = known
+        if not base or len(value) < len(base) or value[:len(base)] != base:
+            return None
+        return version, len(base)
+
+    def _forget_lists(self, thread_id: str) -> None:
+        with self._bases_lock:
+            for key in [key for key in self._append_bases if key[0] == thread_id]:
+                del self._append_bases[key]
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = GraphCheckpointWrite.objects.filter(
+            thread_id=thread_id,
+            checkpoint_ns=checkpoint_ns,
+            checkpoint_id=checkpoint_id,
+        ).order_by("task_id", "idx")
+        return [
+            (row.task_id, row.channel, self.serde.loads_typed((row.value_type, bytes(row.value))))
+            for row in rows
+        ]
+
+    def _to_tuple(self, row: GraphCheckpoint, metadata: Optional[CheckpointMetadata] = None) -> CheckpointTuple:
+        checkpoint: Checkpoint = self.serde.loads_typed((row.checkpoint_type, bytes(row.checkpoint)))
+        if metadata is None:
+            metadata = self.serde.loads_typed((row.metadata_type, bytes(row.metadata)))
+        return CheckpointTuple(
+            config=self._config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(
+                    row.thread_id, row.checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=metadata,
+            parent_config=(
+                self._config(row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id)
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._load_writes(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+        )
+
+    # ---------- sync API ----------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self._ids(config)
+        qs = GraphCheckpoint.objects.filter(thread_id=thread_id, checkpoint_ns=checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            row = qs.filter(checkpoint_id=checkpoint_id).first()
+        else:
+            row = qs.order_by("-checkpoint_id").first()
+        return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        qs = GraphCheckpoint.objects.all()
+        if config:
+            configurable = config["configurable"]
+            qs = qs.filter(thread_id=str(configurable["thread_id"]))
+            if configurable.get("checkpoint_ns") is not None:
+                qs = qs.filter(checkpoint_ns=configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                qs = qs.filter(checkpoint_id=checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            qs = qs.filter(checkpoint_id__lt=before_id)
+
+        for row in qs.order_by("thread_id", "checkpoint_ns", "-checkpoint_id").iterator():
+            metadata = self.serde.loads_typed((row.metadata_type, bytes(row.metadata)))
+            if filter and not all(metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._to_tuple(row, metadata)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns = self._ids(config)
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        blobs = []
+        for channel, version in new_versions.items():
+            base_version = ""
+            if channel not in values:
+                value_type, value = "empty", b""
+            else:
+                new_value = values[channel]
+                base = self._append_base(thread_id, checkpoint_ns, channel, new_value)
+                if base is not None:
+                    # only the appended items: the rest is in the base blob
+                    base_version, base_length = base
+                    new_value = new_value[base_length:]
+                value_type, value = self.serde.dumps_typed(new_value)
+            blobs.append(
+                GraphCheckpointBlob(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    channel=channel,
+                    version=str(version),
+                    value_type=value_type,
+                    value=value,
+                    base_version=base_version,
+                )
+            )
+
+        checkpoint_type, checkpoint_bytes = self.serde.dumps_typed(c)
+        metadata_type, metadata_bytes = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._write_lock, transaction.atomic():
+            # Only channels with a new version are written – this is the delta
+            GraphCheckpointBlob.objects.bulk_create(blobs, ignore_conflicts=True)
+            GraphCheckpoint.objects.update_or_create(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                defaults={
+                    "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+                    "checkpoint_type": checkpoint_type,
+                    "checkpoint": checkpoint_bytes,
+                    "metadata_type": metadata_type,
+                    "metadata": metadata_bytes,
+                },
+            )
+
+        for channel, version in new_versions.items():
+            if channel in values:
+                self._remember_list(thread_id, checkpoint_ns, channel, str(version), values[channel])
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        regular = []
+        with self._write_lock, transaction.atomic():
+            for idx, (channel, value) in enumerate(writes):
+                value_type, value_bytes = self.serde.dumps_typed(value)
+                row = GraphCheckpointWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    task_path=task_path,
+                    idx=WRITES_IDX_MAP.get(channel, idx),
+                    channel=channel,
+                    value_type=value_type,
+                    value=value_bytes,
+                )
+                if row.idx >= 0:
+                    regular.append(row)
+                else:
+                    # Special writes (errors, interrupts, ...) replace earlier ones
+                    GraphCheckpointWrite.objects.update_or_create(
+                        thread_id=thread_id,
+                        checkpoint_ns=checkpoint_ns,
+                        checkpoint_id=checkpoint_id,
+                        task_id=task_id,
+                        idx=row.idx,
+                        defaults={
+                            "task_path": task_path,
+                            "channel": channel,
+                            "value_type": value_type,
+                            "value": value_bytes,
+                        },
+                    )
+            # Regular writes are idempotent: an existing (task, idx) is kept
+            GraphCheckpointWrite.objects.bulk_create(regular, ignore_conflicts=True)
+
+    def delete_thread(self, thread_id: str) -> None:
+        thread_id = str(thread_id)
+        with self._write_lock, transaction.atomic():
+            GraphCheckpoint.objects.filter(thread_id=thread_id).delete()
+            GraphCheckpointBlob.objects.filter(thread_id=thread_id).delete()
+            GraphCheckpointWrite.objects.filter(thread_id=thread_id).delete()
+        self._forget_lists(thread_id)
+
+    def prune(self, thread_id: Optional[str] = None, keep_last: int = 1) -> int:
+        """
+        Keeps the newest `keep_last` checkpoints per (thread, namespace) and deletes
+        the rest, with their pending writes and any blob no kept checkpoint uses
+        (directly or as the base of an appended list).
+        Returns the number of checkpoints deleted.
+        """
+        qs = GraphCheckpoint.objects.all()
+        if thread_id is not None:
+            qs = qs.filter(thread_id=str(thread_id))
+
+        kept: Dict[Tuple[str, str], List[GraphCheckpoint]] = defaultdict(list)
+        doomed: List[int] = []
+        doomed_ids: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for row in qs.order_by("thread_id", "checkpoint_ns", "-checkpoint_id").iterator():
+            key = (row.thread_id, row.checkpoint_ns)
+            if len(kept[key]) < keep_last:
+                kept[key].append(row)
+            else:
+                doomed.append(row.pk)
+                doomed_ids[key].append(row.checkpoint_id)
+
+        if not doomed:
+            return 0
+
+        with self._write_lock, transaction.atomic():
+            GraphCheckpoint.objects.filter(pk__in=doomed).delete()
+            for (t_id, ns), checkpoint_ids in doomed_ids.items():
+                GraphCheckpointWrite.objects.filter(
+                    thread_id=t_id, checkpoint_ns=ns, checkpoint_id__in=checkpoint_ids
+                ).delete()
+
+                live = set()
+                for row in kept[(t_id, ns)]:
+                    checkpoint = self.serde.loads_typed((row.checkpoint_type, bytes(row.checkpoint)))
+                    live.update((ch, str(v)) for ch, v in checkpoint["channel_versions"].items())
+                blobs = {
+                    (channel, version): (pk, base_version)
+                    for pk, channel, version, base_version in GraphCheckpointBlob.objects.filter(
+                        thread_id=t_id, checkpoint_ns=ns
+                    ).values_list("pk", "channel", "version", "base_version")
+                }
+                # appended lists keep their chain of bases alive
+                pending = list(live)
+                while pending:
+                    channel, version = pending.pop()
+                    base_version = blobs.get((channel, version), (None, ""))[1]
+                    if base_version and (channel, base_version) not in live:
+                        live.add((channel, base_version))
+                        pending.append((channel, base_version))
+                stale = [pk for key, (pk, _) in blobs.items() if key not in live]
+                GraphCheckpointBlob.objects.filter(pk__in=stale).delete()
+                self._forget_lists(t_id)
+
+        return len(doomed)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # Zero-padded so versions sort correctly as strings
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---------- async API ----------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await sync_to_async(self.get_tuple)(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await sync_to_async(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )()
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await sync_to_async(self.put)(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await sync_to_async(self.put_writes)(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await sync_to_async(self.delete_thread)(thread_id)
@@ -1,15 +1,26 @@
+import copy
+import functools
 import json
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional
 
 from langgraph.graph import StateGraph, END
 
 from agent.state import AgentState, BuyerProfile
-from agent.llm_client import LLMClient
+from agent.llm_client import LLMClient, reply_tokens
 from agent.tools.t2sql_tool import project_sql_tool
 from agent.tools.booking_tool import create_lead_and_booking
-from agent.tools.project_info_tool import get_project_details
-
-from agent.tools.web_search_tool import web_search_tool
+from agent.tools.project_info_tool import get_project_card, is_sparse, warm_project_cards
+from agent.prefetch import web_info_prefetcher
+from agent.tracing import traced
+from properties.currency import (
+    SUPPORTED_CURRENCIES,
+    UnsupportedCurrency,
+    format_money,
+    normalize_currency,
+    parse_amount,
+    resolve_currency,
+)
+from properties.geo import find_place
 
 
 
@@ -66,11 +77,14 @@ Your job is to:
 You MUST respond ONLY with a valid JSON object with these exact keys:
 - intent: one of ["prefs", "book", "detail", "generic"]
 - city: string or null
-- budget_min: integer or null
-- budget_max: integer or null
+- budget_min: string or null
+- budget_max: string or null
+- currency: string or null
 - unit_size: string or null
 - bedrooms: integer or null
 - property_type: string or null
+- near_location: string or null
+- radius_km: number or null
 - lead_first_name: string or null
 - lead_last_name: string or null
 - lead_email: string or null
@@ -88,13 +102,19 @@ Rules for 'intent':
 Rules for fields:
 - city: best guess of the city or area if mentioned; otherwise null.
 - budget_min / budget_max:
+    - Copy each amount exactly as the user wrote it, including any unit or currency
+      (e.g. "300000 USD", "200k", "50 lakhs", "1.2 million AED"). Do NOT convert or calculate.
     - If a single budget is given (e.g. "up to 300000 USD"), use null for budget_min
-      and that number for budget_max.
-    - If a range is given (e.g. "from 200k to 350k"), convert to integers and fill both.
-    - If values like "50 lakhs" or "0.5 million" are used, convert to an approximate integer.
+      and that amount for budget_max.
+    - If a range is given (e.g. "from 200k to 350k"), fill both ("200k" and "350k").
+- currency: the ISO code of the currency the user mentions (e.g. "USD", "AED", "INR"); otherwise null.
 - unit_size: use labels like "1BHK", "2BHK", "3BHK", "studio" where possible.
 - bedrooms: numeric version of size where clear (e.g. 2 for 2BHK, 1 for 1BHK/studio).
 - property_type: normalize to a simple type like "apartment", "villa", "townhouse", "studio" where clear; otherwise null.
+- near_location: a landmark or district the user wants to be close to (e.g. "near Dubai Marina",
+  "close to Burj Khalifa"), without the city unless it is part of the name; otherwise null.
+- radius_km: the distance the user allows around near_location, converted to kilometres
+  (e.g. "within 5 km" -> 5, "within 2 miles" -> 3.2); otherwise null.
 - If the user mentions their name (e.g. "I'm Mukesh", "My name is John"), fill lead_first_name and lead_last_name if possible.
 - If the user mentions an email address, fill lead_email.
 
@@ -146,13 +166,25 @@ Output format:
     if city:
         profile.city = city
 
-    budget_min = data.get("budget_min")
-    if isinstance(budget_min, (int, float)):
-        profile.budget_min = int(budget_min)
+    # Amounts are parsed here, deterministically – the LLM only copies the text
+    raw_currency = data.get("currency")
+    currency = normalize_currency(raw_currency)
+    if currency is None and isinstance(raw_currency, str) and raw_currency.strip():
+        # kept as given (e.g. "JPY"), so the buyer is told it can't be searched
+        currency = raw_currency.strip().upper()
+
+    budget_min = parse_amount(data.get("budget_min"))
+    if budget_min:
+        profile.budget_min = budget_min[0]
+        currency = currency or budget_min[1]
 
-    budget_max = data.get("budget_max")
-    if isinstance(budget_max, (int, float)):
-        profile.budget_max = int(budget_max)
+    budget_max = parse_amount(data.get("budget_max"))
+    if budget_max:
+        profile.budget_max = budget_max[0]
+        currency = currency or budget_max[1]
+
+    if currency:
+        profile.currency = currency
 
     unit_size = data.get("unit_size")
     if unit_size:
@@ -166,6 +198,18 @@ Output format:
     if property_type:
         profile.property_type = property_type
 
+    near_location = data.get("near_location")
+    if isinstance(near_location, str) and near_location.strip():
+        profile.near_location = near_location.strip()
+        # A known landmark also tells us the city
+        place = find_place(profile.near_location)
+        if place and not profile.city:
+            profile.city = place["city"]
+
+    radius_km = data.get("radius_km")
+    if isinstance(radius_km, (int, float)) and radius_km > 0:
+        profile.radius_km = float(radius_km)
+
     state.buyer_profile = profile
 
     # ---------- fill LeadInfo (optional early capture) ----------
@@ -215,15 +259,32 @@ def router_node(state: AgentState) -> str:
     return "respond_node"
 
 
+def unsupported_currency_question(profile: BuyerProfile) -> Optional[str]:
+    """
+    For a budget in a currency there are no prices in (e.g. JPY): forgets that
+    budget and returns the question to ask instead. None when the currency is fine.
+    """
+    try:
+        resolve_currency(profile.currency)
+        return None
+    except UnsupportedCurrency as e:
+        profile.currency = profile.budget_min = profile.budget_max = None
+        return (
+            f"Sorry, I can't search prices in {e.currency}. What is your approximate maximum budget "
+            f"in {', '.join(SUPPORTED_CURRENCIES[:-1])} or {SUPPORTED_CURRENCIES[-1]}?"
+        )
+
+
 def clarify_prefs_node(state: AgentState) -> AgentState:
     """
     Ask the buyer for missing key preferences:
       - city
       - unit size / bedrooms
-      - budget_max
+      - budget_max (again when it was given in an unsupported currency)
     """
 
     p = state.buyer_profile
+    currency_question = unsupported_currency_question(p)
     questions = []
 
     if not p.city:
@@ -231,7 +292,9 @@ def clarify_prefs_node(state: AgentState) -> AgentState:
     if not (p.unit_size or p.bedrooms):
         questions.append("What unit size are you interested in (e.g., 1BHK, 2BHK, 3BHK)?")
     if p.budget_max is None:
-        questions.append("What is your approximate maximum budget (in USD)?")
+        questions.append(
+            currency_question or "What is your approximate maximum budget (e.g. 300k USD, 1.2M AED or 50 lakhs)?"
+        )
 
     if not questions:
         text = "Could you please confirm your city, preferred unit size, and budget range?"
@@ -249,10 +312,25 @@ def t2sql_node(state: AgentState) -> AgentState:
     based on buyer_profile.
     """
 
-    projects = project_sql_tool.search_projects_by_profile(state.buyer_profile)
+    try:
+        projects = project_sql_tool.search_projects_by_profile(state.buyer_profile)
+    except UnsupportedCurrency:
+        state.messages.append({"role": "assistant", "content": unsupported_currency_question(state.buyer_profile)})
+        state.stage = "asking_prefs"
+        return state
     state.candidate_projects = projects
     state.stage = "recommendations"
 
+    # Prerender detail cards for the shortlist so follow-up detail turns are cache hits
+    cards = warm_project_cards([p.id for p in projects])
+
+    # Start web lookups now for projects we have little structured data on;
+    # the detail turn then only reads the result from the web search cache.
+    web_info_prefetcher.prefetch_projects(
+        p for p in projects
+        if p.id not in cards or is_sparse(cards[p.id]["details"])
+    )
+
     # If there are no projects at all (even after soft fallback)
     if not projects:
         msg = (
@@ -267,9 +345,10 @@ def t2sql_node(state: AgentState) -> AgentState:
     budget_miss = False
     if budget_max is not None:
         # Among the returned projects, check if *any* are actually within budget
+        # (prices are already in the buyer's currency)
         within_budget = [
             p for p in projects
-            if p.price_usd and p.price_usd <= budget_max
+            if p.price and p.price <= budget_max
         ]
         if not within_budget:
             budget_miss = True
@@ -277,7 +356,7 @@ def t2sql_node(state: AgentState) -> AgentState:
     lines = []
 
     if budget_miss:
-        budget_str = f"{budget_max:,.0f} USD"
+        budget_str = format_money(budget_max, state.buyer_profile.currency)
         # Acknowledge that nothing fits strictly within budget
         lines.append(
             f"I couldn't find any properties that fully match your preferences "
@@ -292,15 +371,18 @@ def t2sql_node(state: AgentState) -> AgentState:
 
     # List the projects (already sorted by price in the SQL tool)
     for idx, p in enumerate(projects, start=1):
-        if p.price_usd:
-            price_text = f"{p.price_usd:,.0f} USD"
+        if p.price:
+            price_text = format_money(p.price, p.currency)
         else:
             price_text = "Price on request"
 
-        lines.append(
+        line = (
             f"{idx}. {p.name} in {p.city}, {p.country} – approx. price: {price_text} "
             f"({p.unit_type or 'unit'})"
         )
+        if p.distance_km is not None:
+            line += f" – {p.distance_km:.1f} km from {state.buyer_profile.near_location}"
+        lines.append(line)
 
     lines.append("Would you like to know more about any of these, or book a property visit?")
     state.messages.append({"role": "assistant", "content": "\n".join(lines)})
@@ -441,26 +523,25 @@ Rules:
     # -------------------------------------------
     # 3) We have a selected_project_id → fetch details
     # -------------------------------------------
-    details = get_project_details(state.selected_project_id)
-
-    if not details:
-        # Try web search as a fallback for extra information
-        from properties.models import Project
+    card = get_project_card(state.selected_project_id)
 
+    if not card:
+        # Try web search as a fallback for extra information. The project isn't
+        # in the DB, so take its name/city from the shortlist instead.
         project_name = None
         city = None
-        try:
-            p = Project.objects.get(id=state.selected_project_id)
-            project_name = p.name
-            city = p.city
-        except Project.DoesNotExist:
-            pass
+        for p in state.candidate_projects:
+            if p.id == state.selected_project_id:
+                project_name = p.name
+                city = p.city
+                break
 
         if project_name:
-            # Your web_search_tool returns a textual summary
-            summary = web_search_tool.search_project_info(
-                project_name=project_name,
-                city=city,
+            # Usually prefetched after the shortlist; looked up inline otherwise
+            summary = web_info_prefetcher.get(
+                project_name,
+                city,
+                fetch_if_missing=True,
             )
         else:
             summary = None
@@ -492,29 +573,17 @@ Rules:
         return state
 
     # -------------------------------------------
-    # 4) Format and return rich project details + booking nudge (single message)
+    # 4) Prerendered project card + booking nudge (single message)
     # -------------------------------------------
-    lines = [
-        f"**{details['name']}** – Full Details:",
-        "",
-        f"🏙 **Location:** {details['city']}, {details['country']}",
-        f"🏗 **Developer:** {details['developer_name']}" if details.get("developer_name") else "",
-        f"🛏 **Bedrooms:** {details['no_of_bedrooms']}" if details.get("no_of_bedrooms") is not None else "",
-        f"🛁 **Bathrooms:** {details['bathrooms']}" if details.get("bathrooms") is not None else "",
-        f"🏠 **Property Type:** {details['property_type']}" if details.get("property_type") else "",
-        f"📐 **Area:** {details['area_sqm']} sq. m." if details.get("area_sqm") else "",
-        f"💰 **Price:** {details['price_usd']} USD" if details.get("price_usd") else "",
-        f"📅 **Completion Status:** {details['completion_status']}" if details.get("completion_status") else "",
-        f"🗓 **Completion Date:** {details['completion_date']}" if details.get("completion_date") else "",
-        "",
-        f"✨ **Features:**\n{details['features']}" if details.get("features") else "",
-        "",
-        f"🏢 **Facilities:**\n{details['facilities']}" if details.get("facilities") else "",
-        "",
-        f"📝 **Description:**\n{details['description']}" if details.get("description") else "",
-    ]
+    details = card["details"]
+    currency = normalize_currency(state.buyer_profile.currency) or "USD"
+    detail_text = card["markdown"][currency]
 
-    detail_text = "\n".join(line for line in lines if line.strip())
+    if is_sparse(details):
+        # Only read what the background prefetch found – never block on a cold lookup
+        extra = web_info_prefetcher.get(details["name"], details["city"])
+        if extra:
+            detail_text += f"\n\n🌐 **From external sources:**\n{extra}"
 
     booking_nudge = (
         f"\n\nIf this looks interesting, I can help you schedule a property viewing "
@@ -699,6 +768,7 @@ Do NOT include explanations. Output ONLY the JSON object.
         lead_info=state.lead_info,
         buyer_profile=state.buyer_profile,
         project_id=state.selected_project_id,
+        conversation_id=state.conversation_id,
     )
 
     if booking is None:
@@ -751,13 +821,44 @@ Tone:
     # Prepend system message to the conversation
     messages = [{"role": "system", "content": system_prompt}] + state.messages
 
-    reply = llm.chat(messages)
+    # streamed token by token when the caller is listening (WebSocket chat)
+    on_token = reply_tokens.get()
+    reply = llm.chat(messages) if on_token is None else llm.chat_stream(messages, on_token)
     state.messages.append({"role": "assistant", "content": reply})
     state.stage = "generic"
     return state
 
 
 
+def changed_fields(node: Callable[[AgentState], AgentState]) -> Callable[[AgentState], Dict[str, Any]]:
+    """
+    Wraps a node so it returns only the state fields it actually changed.
+
+    Nodes mutate and return the whole AgentState, which LangGraph would treat
+    as a write to every channel. Returning just the changed fields keeps
+    channel versions stable, so a checkpointer only stores real deltas.
+    `messages` appends (see AgentState), so only the messages the node added
+    are returned.
+
+    Fields are snapshotted with shallow copies (nodes replace or mutate them
+    one level deep), so this costs no serialization of the state.
+    """
+    @functools.wraps(node)
+    def wrapper(state: AgentState) -> Dict[str, Any]:
+        before = {k: copy.copy(getattr(state, k)) for k in AgentState.model_fields}
+        result = node(state)
+        changes = {
+            k: getattr(result, k)
+            for k in AgentState.model_fields
+            if k != "messages" and getattr(result, k) != before[k]
+        }
+        if len(result.messages) > len(before["messages"]):
+            changes["messages"] = result.messages[len(before["messages"]):]
+        return changes
+
+    return wrapper
+
+
 def build_graph() -> StateGraph:
     """
     Build and return a LangGraph StateGraph using AgentState.
@@ -772,14 +873,14 @@ def build_graph() -> StateGraph:
 
     graph = StateGraph(AgentState)
 
-    # Register nodes
-    graph.add_node("user_input_node", user_input_node)
-    graph.add_node("intent_classification_node", intent_classification_node)
-    graph.add_node("clarify_prefs_node", clarify_prefs_node)
-    graph.add_node("t2sql_node", t2sql_node)
-    graph.add_node("project_detail_node", project_detail_node)
-    graph.add_node("booking_node", booking_node)
-    graph.add_node("respond_node", respond_node)
+    # Register nodes (each one timed, see agent/tracing.py)
+    graph.add_node("user_input_node", changed_fields(traced("node")(user_input_node)))
+    graph.add_node("intent_classification_node", changed_fields(traced("node")(intent_classification_node)))
+    graph.add_node("clarify_prefs_node", changed_fields(traced("node")(clarify_prefs_node)))
+    graph.add_node("t2sql_node", changed_fields(traced("node")(t2sql_node)))
+    graph.add_node("project_detail_node", changed_fields(traced("node")(project_detail_node)))
+    graph.add_node("booking_node", changed_fields(traced("node")(booking_node)))
+    graph.add_node("respond_node", changed_fields(traced("node")(respond_node)))
 
     # Entry point
     graph.set_entry_point("user_input_node")
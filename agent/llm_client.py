@@ -1,53 +1,123 @@
+import json
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from agent.rate_limit import TokenBucket
+from agent.tracing import record_llm_usage, span
+
+# Set by a caller that streams the reply (the WebSocket chat): receives the
+# text of each token of the assistant's free-form reply as it arrives
+reply_tokens: ContextVar[Optional[Callable[[str], None]]] = ContextVar("reply_tokens", default=None)
+
 
 class LLMClient:
     """
     Wrapper for calling GPT-4o (or Claude, Mistral etc.) via OpenRouter.
     Centralizes authentication and error handling.
+
+    Calls are paced by a token bucket matched to the OpenRouter rate limit
+    (OPENROUTER_RATE_LIMIT_RPM / OPENROUTER_RATE_LIMIT_BURST, per process),
+    and share one pool of keep-alive connections (no TLS handshake per call).
+    Every call is timed and its token usage counted (agent/tracing.py).
     """
 
     def __init__(self):
         self.api_key = settings.OPENROUTER_API_KEY
         self.model = settings.OPENROUTER_MODEL
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        # OpenRouter, or a compatible stand-in (python manage.py fake_openrouter)
+        self.base_url = settings.OPENROUTER_BASE_URL.rstrip("/") + "/chat/completions"
+        self.http = requests.Session()
+        # one connection per concurrent turn (admission control bounds them)
+        adapter = HTTPAdapter(pool_maxsize=max(settings.LLM_MAX_IN_FLIGHT_TURNS, 10))
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self.limiter = TokenBucket.per_minute(
+            settings.OPENROUTER_RATE_LIMIT_RPM, settings.OPENROUTER_RATE_LIMIT_BURST or None
+        )
 
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY missing — add it to .env")
 
-    def chat(self, messages: List[Dict[str, str]]) -> str:
-        """
-        messages: [
-            {"role": "system", "content": "..."},
-            {"role": "user", "content": "..."},
-            ...
-        ]
-        Returns the assistant's reply (string).
-        """
-
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "silverland.ai",  # optional but recommended
             "X-Title": "SilverLand Property Assistant",
             "Content-Type": "application/json",
         }
 
-        payload = {
+    def _payload(self, messages: List[Dict[str, str]], **extra) -> Dict:
+        return {
             "model": self.model,
             "messages": messages,
             "temperature": 0.3,
+            **extra,
         }
 
-        response = requests.post(
-            self.base_url,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        response.raise_for_status()
+    def chat(self, messages: List[Dict[str, str]]) -> str:
+        """
+        messages: [
+            {"role": "system", "content": "..."},
+            {"role": "user", "content": "..."},
+            ...
+        ]
+        Returns the assistant's reply (string).
+        Raises RateLimitTimeout when the rate limit would delay the call
+        longer than the request timeout.
+        """
+        self.limiter.acquire(timeout=30)
 
-        data = response.json()
+        with span("llm", self.model) as attrs:
+            response = self.http.post(
+                self.base_url,
+                json=self._payload(messages),
+                headers=self._headers(),
+                timeout=30
+            )
+            response.raise_for_status()
+
+            data = response.json()
+            record_llm_usage(attrs, self.model, data.get("usage"))
 
         return data["choices"][0]["message"]["content"]
+
+    def chat_stream(self, messages: List[Dict[str, str]], on_token: Callable[[str], None]) -> str:
+        """
+        chat() with a streamed response (server-sent events): `on_token` gets
+        each piece of the reply as it arrives. Returns the whole reply.
+        """
+        self.limiter.acquire(timeout=30)
+
+        parts = []
+        usage = None
+        with span("llm", self.model) as attrs, self.http.post(
+            self.base_url,
+            json=self._payload(messages, stream=True),
+            headers=self._headers(),
+            timeout=30,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            # SSE is always UTF-8; requests would decode a charset-less text/* as ISO-8859-1
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                # "data: {...}" events; ": comment" keep-alives are skipped
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # the last chunk carries the usage of the whole call
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or [{}]
+                token = (choices[0].get("delta") or {}).get("content")
+                if token:
+                    parts.append(token)
+                    on_token(token)
+            record_llm_usage(attrs, self.model, usage)
+        return "".join(parts)
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_id', models.CharField(max_length=255)),
+                ('checkpoint_ns', models.CharField(blank=True, default='', max_length=255)),
+                ('checkpoint_id', models.CharField(max_length=64)),
+                ('parent_checkpoint_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('checkpoint_type', models.CharField(max_length=32)),
+                ('checkpoint', models.BinaryField()),
+                ('metadata_type', models.CharField(max_length=32)),
+                ('metadata', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GraphCheckpointBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_id', models.CharField(max_length=255)),
+                ('checkpoint_ns', models.CharField(blank=True, default='', max_length=255)),
+                ('channel', models.CharField(max_length=255)),
+                ('version', models.CharField(max_length=64)),
+                ('value_type', models.CharField(max_length=32)),
+                ('value', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GraphCheckpointWrite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('thread_id', models.CharField(max_length=255)),
+                ('checkpoint_ns', models.CharField(blank=True, default='', max_length=255)),
+                ('checkpoint_id', models.CharField(max_length=64)),
+                ('task_id', models.CharField(max_length=64)),
+                ('task_path', models.CharField(blank=True, default='', max_length=255)),
+                ('idx', models.IntegerField()),
+                ('channel', models.CharField(max_length=255)),
+                ('value_type', models.CharField(max_length=32)),
+                ('value', models.BinaryField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='graphcheckpointwrite',
+            constraint=models.UniqueConstraint(fields=('thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx'), name='graph_checkpoint_write_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='graphcheckpointblob',
+            constraint=models.UniqueConstraint(fields=('thread_id', 'checkpoint_ns', 'channel', 'version'), name='graph_checkpoint_blob_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='graphcheckpoint',
+            constraint=models.UniqueConstraint(fields=('thread_id', 'checkpoint_ns', 'checkpoint_id'), name='graph_checkpoint_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0001_graph_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graphcheckpointblob',
+            name='base_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
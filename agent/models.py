@@ -1,3 +1,78 @@
 from django.db import models
 
-# Create your models here.
+
+class GraphCheckpoint(models.Model):
+    """
+    One LangGraph checkpoint (see agent/checkpointer.py).
+
+    Channel values are NOT stored here – only the checkpoint skeleton
+    (channel versions, versions seen, ...). Values live in GraphCheckpointBlob,
+    one row per (channel, version), so unchanged channels are never rewritten.
+    """
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    parent_checkpoint_id = models.CharField(max_length=64, blank=True, null=True)
+    checkpoint_type = models.CharField(max_length=32)
+    checkpoint = models.BinaryField()
+    metadata_type = models.CharField(max_length=32)
+    metadata = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["thread_id", "checkpoint_ns", "checkpoint_id"],
+                name="graph_checkpoint_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.checkpoint_id} ({self.thread_id})"
+
+
+class GraphCheckpointBlob(models.Model):
+    """
+    Serialized value of one channel at one version.
+
+    When `base_version` is set, `value` holds only the items appended to the
+    list stored at that version (e.g. a turn's new messages), not the list.
+    """
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    channel = models.CharField(max_length=255)
+    version = models.CharField(max_length=64)
+    value_type = models.CharField(max_length=32)
+    value = models.BinaryField()
+    base_version = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["thread_id", "checkpoint_ns", "channel", "version"],
+                name="graph_checkpoint_blob_uniq",
+            ),
+        ]
+
+
+class GraphCheckpointWrite(models.Model):
+    """
+    Pending write of a task, attached to the checkpoint it was produced from.
+    """
+    thread_id = models.CharField(max_length=255)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    task_id = models.CharField(max_length=64)
+    task_path = models.CharField(max_length=255, blank=True, default="")
+    idx = models.IntegerField()
+    channel = models.CharField(max_length=255)
+    value_type = models.CharField(max_length=32)
+    value = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"],
+                name="graph_checkpoint_write_uniq",
+            ),
+        ]
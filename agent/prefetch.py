@@ -0,0 +1,120 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+from agent.state import ProjectSummary
+from agent.tools.web_search_tool import WebSearchTool, web_search_tool
+
+
+logger = logging.getLogger(__name__)
+
+
+class WebInfoPrefetcher:
+    """
+    Runs web lookups for shortlisted projects in the background, so the
+    detail turn finds the result already in WebSearchTool's cache.
+
+    - Bounded: at most `max_workers` lookups run at once and at most
+      `max_pending` are queued; anything beyond that is simply skipped.
+    - Deduplicated: a project already cached or in flight is not submitted again.
+    - Only the web call runs in the pool (no DB access from worker threads).
+    """
+
+    def __init__(
+        self,
+        tool: WebSearchTool = web_search_tool,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        self.tool = tool
+        self.max_workers = max_workers or settings.WEB_PREFETCH_WORKERS
+        self.max_pending = max_pending or settings.WEB_PREFETCH_MAX_PENDING
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tool.api_url) and self.max_workers > 0
+
+    def _key(self, project_name: str, city: Optional[str]) -> str:
+        return self.tool.build_query(project_name, city).lower()
+
+    def prefetch(self, project_name: str, city: Optional[str] = None) -> Optional[Future]:
+        """
+        Schedules a lookup unless it's cached, already in flight, or the pool is saturated.
+        """
+        if not self.enabled:
+            return None
+
+        key = self._key(project_name, city)
+        if self.tool.cache.lookup(key)[0]:
+            return None
+
+        with self._lock:
+            if key in self._in_flight:
+                return self._in_flight[key]
+            if len(self._in_flight) >= self.max_pending:
+                logger.debug("web prefetch queue full, skipping %s", key)
+                return None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="web-prefetch",
+                )
+            future = self._executor.submit(self.tool.search_project_info, project_name, city)
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _f, key=key: self._done(key))
+        return future
+
+    def prefetch_projects(self, projects: Iterable[ProjectSummary]) -> int:
+        """
+        Prefetches every given project; returns how many lookups were scheduled.
+        """
+        return sum(1 for p in projects if self.prefetch(p.name, p.city) is not None)
+
+    def get(
+        self,
+        project_name: str,
+        city: Optional[str] = None,
+        wait: Optional[float] = None,
+        fetch_if_missing: bool = False,
+    ) -> Optional[str]:
+        """
+        Reads a prefetched summary.
+
+        - cached          -> returned immediately
+        - still in flight -> waits up to `wait` seconds for it
+        - neither         -> None, or a synchronous lookup if `fetch_if_missing`
+        """
+        key = self._key(project_name, city)
+        hit, summary = self.tool.cache.lookup(key)
+        if hit:
+            return summary
+
+        with self._lock:
+            future = self._in_flight.get(key)
+        if future is not None:
+            try:
+                return future.result(timeout=settings.WEB_PREFETCH_WAIT if wait is None else wait)
+            except TimeoutError:
+                return None
+
+        if fetch_if_missing:
+            return self.tool.search_project_info(project_name, city)
+        return None
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def _done(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+
+web_info_prefetcher = WebInfoPrefetcher()
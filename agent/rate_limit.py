@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class RateLimitTimeout(Exception):
+    """
+    No token became available within the caller's timeout.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"rate limited for another {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for outbound calls.
+
+    - Refills at `rate` tokens per second, up to `capacity` (the burst size).
+    - `acquire()` takes a token, sleeping until one is available.
+    - `rate <= 0` disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = max(capacity if capacity is not None else rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: Optional[float] = None, **kwargs) -> "TokenBucket":
+        return cls(requests_per_minute / 60.0, burst, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _reserve(self) -> float:
+        """
+        Takes a token (the balance may go negative: a reservation).
+        Returns how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Waits for a token; returns the seconds waited.
+        Raises RateLimitTimeout (without taking a token) if that would exceed `timeout`.
+        """
+        if not self.enabled:
+            return 0.0
+        wait = self._reserve()
+        if timeout is not None and wait > timeout:
+            with self._lock:
+                self._tokens += 1  # give the reservation back
+            raise RateLimitTimeout(wait)
+        if wait:
+            self._sleep(wait)
+        return wait
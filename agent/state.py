@@ -1,4 +1,5 @@
-from typing import List, Optional, Any, Dict
+import operator
+from typing import Annotated, List, Optional, Any, Dict
 from pydantic import BaseModel
 from uuid import UUID
 
@@ -10,9 +11,12 @@ class BuyerProfile(BaseModel):
     city: Optional[str] = None
     budget_min: Optional[int] = None     # lower bound of budget, e.g. 500000
     budget_max: Optional[int] = None     # upper bound, e.g. 900000
+    currency: Optional[str] = None       # currency of the budget ("USD" when None)
     unit_size: Optional[str] = None      # e.g. "1BHK", "2BHK"
     bedrooms: Optional[int] = None       # in case user says "2 bedrooms"
     property_type: Optional[str] = None  # "apartment" / "villa" / etc.
+    near_location: Optional[str] = None  # landmark / district, e.g. "Dubai Marina"
+    radius_km: Optional[float] = None    # search radius around near_location
 
 
 class LeadInfo(BaseModel):
@@ -33,9 +37,12 @@ class ProjectSummary(BaseModel):
     city: str
     country: str
     price_usd: float
+    price: Optional[float] = None        # price in `currency` (buyer's currency)
+    currency: str = "USD"
     unit_type: Optional[str] = None
     no_of_bedrooms: Optional[int] = None
     property_type: Optional[str] = None
+    distance_km: Optional[float] = None  # set for "near X" searches
 
 
 class AgentState(BaseModel):
@@ -46,7 +53,8 @@ class AgentState(BaseModel):
     conversation_id: Optional[UUID] = None
 
     # full chat history: [{role: "user"/"assistant", content: "..."}]
-    messages: List[Dict[str, Any]] = []
+    # (a LangGraph channel that appends: nodes write only their new messages)
+    messages: Annotated[List[Dict[str, Any]], operator.add] = []
 
     # buyer preferences
     buyer_profile: BuyerProfile = BuyerProfile()
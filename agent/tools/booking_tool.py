@@ -1,17 +1,27 @@
 from typing import Optional
+from uuid import UUID
+
+from django.db import IntegrityError, transaction
 
 from properties.models import Lead, Booking, Project
 from agent.state import LeadInfo, BuyerProfile
+from agent.tracing import traced
 
 
+@traced("tool")
 def create_lead_and_booking(
     lead_info: LeadInfo,
     buyer_profile: BuyerProfile,
     project_id: int,
+    conversation_id: Optional[UUID] = None,
 ) -> Optional[Booking]:
     """
     Creates a Lead + Booking entry in the database.
 
+    With a conversation_id, a conversation books a project only once: a turn
+    replayed after another worker saved the conversation (see chat_turn)
+    gets back the booking its first run created.
+
     Returns:
         Booking instance if successful, None if project not found.
     """
@@ -21,17 +31,28 @@ def create_lead_and_booking(
     except Project.DoesNotExist:
         return None
 
-    lead = Lead.objects.create(
-        first_name=lead_info.first_name or "",
-        last_name=lead_info.last_name or "",
-        email=lead_info.email or "",
-        preferences=buyer_profile.model_dump(mode="json"),
-    )
-
-    booking = Booking.objects.create(
-        lead=lead,
-        project=project,
-        city=project.city,
-    )
+    if conversation_id is not None:
+        existing = Booking.objects.select_related("lead").filter(conversation_id=conversation_id, project=project).first()
+        if existing is not None:
+            return existing
+
+    try:
+        with transaction.atomic():
+            lead = Lead.objects.create(
+                first_name=lead_info.first_name or "",
+                last_name=lead_info.last_name or "",
+                email=lead_info.email or "",
+                preferences=buyer_profile.model_dump(mode="json"),
+            )
+
+            booking = Booking.objects.create(
+                lead=lead,
+                project=project,
+                city=project.city,
+                conversation_id=conversation_id,
+            )
+    except IntegrityError:
+        # a concurrent run of the same turn booked it first
+        return Booking.objects.select_related("lead").get(conversation_id=conversation_id, project=project)
 
     return booking
@@ -1,18 +1,98 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from properties.currency import SUPPORTED_CURRENCIES, format_money, price_field_for
 from properties.models import Project
+from agent.tracing import traced
 
 
-def get_project_details(project_id: int) -> Optional[dict]:
+# Only the columns a detail card needs (skips geo / bookkeeping columns)
+CARD_FIELDS = (
+    "id",
+    "name",
+    "developer_name",
+    "city",
+    "country",
+    "property_type",
+    "unit_type",
+    "no_of_bedrooms",
+    "bathrooms",
+    "price_usd",
+    "price_aed",
+    "price_inr",
+    "price_eur",
+    "price_gbp",
+    "area_sqm",
+    "completion_status",
+    "completion_date",
+    "features",
+    "facilities",
+    "description",
+    "updated_at",
+)
+
+
+# Cards are stored under (project id, version), so a card can only ever be
+# served for the version it was built from. The current version of a project
+# comes either from a version pointer in a cache all processes share
+# (PROJECT_CARD_CACHE_BACKEND: no DB query on a hit, pointers are moved on
+# save/delete), or, with a process-local cache, from Project.updated_at (one
+# primary-key query per lookup, since other processes' saves can't reach this
+# process's cache).
+
+_DELETED = ""  # version pointer of a deleted project
+
+
+def _shared_cache():
+    alias = settings.PROJECT_CARD_CACHE_BACKEND
+    return caches[alias] if alias else None
+
+
+def _card_cache():
+    return _shared_cache() or caches["default"]
+
+
+def _version_key(project_id: int) -> str:
+    return f"project_card:v:{project_id}"
+
+
+def _card_key(project_id: int, version: str) -> str:
+    return f"project_card:{project_id}:{version}"
+
+
+def _version_of(p: Project) -> str:
+    return _version_str(p.updated_at)
+
+
+def _version_str(updated_at) -> str:
+    return str(int(updated_at.timestamp() * 1_000_000))
+
+
+def _db_versions(project_ids: Iterable[int]) -> Dict[int, str]:
+    rows = Project.objects.filter(id__in=list(project_ids)).values_list("id", "updated_at")
+    return {pk: _version_str(updated_at) for pk, updated_at in rows}
+
+
+def _current_versions(project_ids: Iterable[int]) -> Dict[int, str]:
     """
-    Returns a structured dictionary of full project details.
+    {project_id: version} for the projects whose current version is known.
     """
+    shared = _shared_cache()
+    if shared is None:
+        return _db_versions(project_ids)
+    found = shared.get_many([_version_key(pk) for pk in project_ids])
+    return {
+        pk: found[_version_key(pk)]
+        for pk in project_ids
+        if found.get(_version_key(pk), _DELETED) != _DELETED
+    }
 
-    try:
-        p = Project.objects.get(id=project_id)
-    except Project.DoesNotExist:
-        return None
 
+def _to_details(p: Project) -> dict:
     return {
         "id": p.id,
         "name": p.name,
@@ -24,6 +104,10 @@ def get_project_details(project_id: int) -> Optional[dict]:
         "no_of_bedrooms": p.no_of_bedrooms,
         "bathrooms": p.bathrooms,
         "price_usd": p.price_usd,
+        "price_aed": p.price_aed,
+        "price_inr": p.price_inr,
+        "price_eur": p.price_eur,
+        "price_gbp": p.price_gbp,
         "area_sqm": p.area_sqm,
         "completion_status": p.completion_status,
         "completion_date": str(p.completion_date) if p.completion_date else None,
@@ -31,3 +115,173 @@ def get_project_details(project_id: int) -> Optional[dict]:
         "facilities": p.facilities,
         "description": p.description,
     }
+
+
+def render_project_card(details: dict, currency: Optional[str] = None) -> str:
+    """
+    Markdown detail card for a project. When the buyer's currency is not USD,
+    the price line also shows the precomputed local price.
+    """
+    price_line = ""
+    if details.get("price_usd"):
+        price_line = f"💰 **Price:** {details['price_usd']} USD"
+        if currency and currency != "USD" and details.get(price_field_for(currency)):
+            local_price = details[price_field_for(currency)]
+            price_line += f" (≈ {format_money(local_price, currency)})"
+
+    lines = [
+        f"**{details['name']}** – Full Details:",
+        "",
+        f"🏙 **Location:** {details['city']}, {details['country']}",
+        f"🏗 **Developer:** {details['developer_name']}" if details.get("developer_name") else "",
+        f"🛏 **Bedrooms:** {details['no_of_bedrooms']}" if details.get("no_of_bedrooms") is not None else "",
+        f"🛁 **Bathrooms:** {details['bathrooms']}" if details.get("bathrooms") is not None else "",
+        f"🏠 **Property Type:** {details['property_type']}" if details.get("property_type") else "",
+        f"📐 **Area:** {details['area_sqm']} sq. m." if details.get("area_sqm") else "",
+        price_line,
+        f"📅 **Completion Status:** {details['completion_status']}" if details.get("completion_status") else "",
+        f"🗓 **Completion Date:** {details['completion_date']}" if details.get("completion_date") else "",
+        "",
+        f"✨ **Features:**\n{details['features']}" if details.get("features") else "",
+        "",
+        f"🏢 **Facilities:**\n{details['facilities']}" if details.get("facilities") else "",
+        "",
+        f"📝 **Description:**\n{details['description']}" if details.get("description") else "",
+    ]
+
+    return "\n".join(line for line in lines if line.strip())
+
+
+def _build_card(p: Project) -> dict:
+    details = _to_details(p)
+    return {
+        "details": details,
+        # prerendered once per supported currency, so a hit never re-renders
+        "markdown": {cur: render_project_card(details, cur) for cur in SUPPORTED_CURRENCIES},
+    }
+
+
+def _store_cards(projects: Iterable[Project]) -> Dict[int, dict]:
+    cards: Dict[int, dict] = {}
+    entries = {}
+    versions = {}
+    for p in projects:
+        version = _version_of(p)
+        cards[p.id] = _build_card(p)
+        versions[p.id] = version
+        entries[_card_key(p.id, version)] = cards[p.id]
+    if entries:
+        _card_cache().set_many(entries, timeout=settings.PROJECT_CARD_CACHE_TIMEOUT)
+    shared = _shared_cache()
+    if shared is not None:
+        for pk, version in versions.items():
+            # add, not set: a save/delete that moved the pointer after these
+            # rows were read wins over this (now stale) version
+            shared.add(_version_key(pk), version, timeout=settings.PROJECT_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+def _cached_cards(project_ids: Iterable[int]) -> Dict[int, dict]:
+    versions = _current_versions(project_ids)
+    if not versions:
+        return {}
+    card_keys = {_card_key(pk, version): pk for pk, version in versions.items()}
+    found = _card_cache().get_many(list(card_keys))
+    return {card_keys[key]: card for key, card in found.items()}
+
+
+@traced("tool", "project_info_tool")
+def get_project_card(project_id: int) -> Optional[dict]:
+    """
+    Returns {"details": dict, "markdown": {currency: str}} for a project.
+
+    Cards are cached per (project id, updated_at). With a shared
+    PROJECT_CARD_CACHE_BACKEND a hit costs two cache lookups and no DB
+    queries; otherwise one primary-key query for the project's version.
+    Returns None if the project doesn't exist.
+    """
+    cached = _cached_cards([project_id])
+    if project_id in cached:
+        return cached[project_id]
+
+    p = Project.objects.only(*CARD_FIELDS).filter(id=project_id).first()
+    if p is None:
+        return None
+    return _store_cards([p])[p.id]
+
+
+def project_version(project_id: int) -> Optional[str]:
+    """
+    Version of a project (its updated_at in microseconds), for HTTP caching.
+    Served from a shared card cache when possible; None if the project doesn't exist.
+    """
+    shared = _shared_cache()
+    if shared is None:
+        return _db_versions([project_id]).get(project_id)
+    version = shared.get(_version_key(project_id))
+    if version is not None:
+        return version or None
+    if get_project_card(project_id) is None:  # caches the card and its version
+        return None
+    return shared.get(_version_key(project_id)) or None
+
+
+def warm_project_cards(project_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Makes sure every project in a shortlist has a cached card, with at most one query.
+    Returns {project_id: card} for the projects that exist.
+    """
+    project_ids = list(dict.fromkeys(project_ids))
+    cards = _cached_cards(project_ids)
+    missing = set(project_ids) - set(cards)
+    if missing:
+        cards.update(_store_cards(Project.objects.only(*CARD_FIELDS).filter(id__in=missing)))
+    return cards
+
+
+def is_sparse(details: dict) -> bool:
+    """
+    True when a project has none of the descriptive fields a detail card relies on.
+    """
+    return not any((details.get(f) or "").strip() for f in ("features", "facilities", "description"))
+
+
+def get_project_details(project_id: int) -> Optional[dict]:
+    """
+    Returns a structured dictionary of full project details.
+    """
+    card = get_project_card(project_id)
+    return card["details"] if card else None
+
+
+def invalidate_project_cards(project_ids: Iterable[int]) -> None:
+    """
+    For bulk updates, which bypass the save/delete signals below (they must
+    still set updated_at). Moves the shared version pointers to the projects'
+    current versions; a process-local cache needs nothing, it reads versions
+    from the DB.
+    """
+    shared = _shared_cache()
+    if shared is None:
+        return
+    project_ids = list(project_ids)
+    versions = _db_versions(project_ids)
+    shared.set_many(
+        {_version_key(pk): versions.get(pk, _DELETED) for pk in project_ids},
+        timeout=settings.PROJECT_CARD_CACHE_TIMEOUT,
+    )
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_card(sender, instance: Project, **kwargs) -> None:
+    # Point at the new version: the old card can no longer be reached
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_version_key(instance.id), _version_of(instance), timeout=settings.PROJECT_CARD_CACHE_TIMEOUT)
+
+
+@receiver(post_delete, sender=Project)
+def forget_project_card(sender, instance: Project, **kwargs) -> None:
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_version_key(instance.id), _DELETED, timeout=settings.PROJECT_CARD_CACHE_TIMEOUT)
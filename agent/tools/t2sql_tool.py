@@ -1,8 +1,19 @@
-from typing import List
-from django.db.models import Q
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Q, QuerySet
 
+from properties.currency import PRICE_FIELDS, normalize_currency, price_field_for, resolve_currency
+from properties.geo import bounding_box, distances_km, find_place, grid_cells_for_box, haversine_km
 from properties.models import Project
 from agent.state import BuyerProfile, ProjectSummary
+from agent.tracing import traced
+
+
+# Columns needed to build a ProjectSummary
+SUMMARY_FIELDS = (
+    "id", "name", "city", "country", "unit_type", "no_of_bedrooms", "property_type",
+    "latitude", "longitude", *PRICE_FIELDS.values(),
+)
 
 
 class ProjectSqlTool:
@@ -17,26 +28,25 @@ class ProjectSqlTool:
       natural language into actual SQL queries over the same schema.
     """
 
+    @traced("tool", "project_sql_tool")
     def search_projects_by_profile(self, profile: BuyerProfile) -> List[ProjectSummary]:
         """
         Softer search:
-          - Hard filters: city, bedrooms, property_type
+          - Hard filters: city, bedrooms, property_type, near_location (+ radius_km)
           - Soft filters: unit_size, budget_min, budget_max
           - If budget filters eliminate everything, fall back to results without budget.
+          - "Near X" searches are ordered by distance, everything else by price.
+
+        Budgets are compared against the precomputed price column of the
+        buyer's currency (price_usd, price_aed, ...), so no conversion happens here.
+        Raises UnsupportedCurrency for a currency without such a column.
         """
 
-        # Start with everything
-        qs = Project.objects.all()
+        currency = resolve_currency(profile.currency)
+        price_field = price_field_for(currency)
 
         # ---------- Hard filters ----------
-        if profile.city:
-            qs = qs.filter(city__iexact=profile.city)
-
-        if profile.property_type:
-            qs = qs.filter(property_type__iexact=(profile.property_type or "").lower())
-
-        if profile.bedrooms is not None:
-            qs = qs.filter(no_of_bedrooms=profile.bedrooms)
+        qs, distances = self.filter_projects(Project.objects.all(), profile)
 
         base_qs = qs  # keep a copy before soft filters
 
@@ -49,14 +59,8 @@ class ProjectSqlTool:
         # ---------- Soft filters: budget ----------
         qs_budget = qs
 
-        if profile.budget_min is not None:
-            tmp = qs_budget.filter(price_usd__gte=profile.budget_min)
-            if tmp.exists():
-                qs_budget = tmp
-
-        if profile.budget_max is not None:
-            # allow NULL prices to stay (price_on_request)
-            tmp = qs_budget.filter(Q(price_usd__lte=profile.budget_max) | Q(price_usd__isnull=True))
+        for condition in self.budget_conditions(profile, price_field):
+            tmp = qs_budget.filter(condition)
             if tmp.exists():
                 qs_budget = tmp
 
@@ -71,26 +75,145 @@ class ProjectSqlTool:
         if not qs.exists():
             return []
 
+        if distances is not None:
+            # Closest first, and limit to top 10
+            projects = sorted(qs, key=lambda p: distances[p.id])[:10]
+            return [self.to_summary(p, currency, distances[p.id]) for p in projects]
+
         # Order by price if possible (NULLs last), and limit to top 10
-        qs = qs.order_by("price_usd")[:10]
+        qs = qs.order_by(price_field)[:10]
 
-        results: List[ProjectSummary] = []
-        for p in qs:
-            results.append(
-                ProjectSummary(
-                    id=p.id,
-                    name=p.name,
-                    city=p.city,
-                    country=p.country,
-                    price_usd=p.price_usd or 0.0,
-                    unit_type=p.unit_type,
-                    no_of_bedrooms=p.no_of_bedrooms,
-                    property_type=p.property_type,
-                )
+        return [self.to_summary(p, currency) for p in qs]
+
+    def filter_projects(self, qs: QuerySet, profile: BuyerProfile) -> Tuple[QuerySet, Optional[Dict[int, float]]]:
+        """
+        Hard filters of a profile: city, property_type, bedrooms and
+        near_location (+ radius_km). Returns the filtered queryset and, for
+        "near X" searches, {project_id: distance_km} of the matches.
+        """
+        if profile.city:
+            qs = qs.filter(city__iexact=profile.city)
+
+        if profile.property_type:
+            qs = qs.filter(property_type__iexact=(profile.property_type or "").lower())
+
+        if profile.bedrooms is not None:
+            qs = qs.filter(no_of_bedrooms=profile.bedrooms)
+
+        distances: Optional[Dict[int, float]] = None
+        place = find_place(profile.near_location)
+        if place:
+            radius_km = profile.radius_km or settings.GEO_DEFAULT_RADIUS_KM
+            distances = self._distances_within(qs, place["lat"], place["lng"], radius_km)
+            qs = qs.filter(id__in=list(distances))
+        return qs, distances
+
+    @staticmethod
+    def budget_conditions(profile: BuyerProfile, price_field: str) -> List[Q]:
+        """
+        Budget filters of a profile on the price column of its currency.
+        Projects without a price (price on request) pass budget_max.
+        """
+        conditions = []
+        if profile.budget_min is not None:
+            conditions.append(Q(**{f"{price_field}__gte": profile.budget_min}))
+        if profile.budget_max is not None:
+            conditions.append(
+                Q(**{f"{price_field}__lte": profile.budget_max}) | Q(**{f"{price_field}__isnull": True})
             )
+        return conditions
+
+    def search_projects_near(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int = 10,
+    ) -> List[ProjectSummary]:
+        """
+        Projects within radius_km of a point, closest first.
+        """
+        distances = self._distances_within(Project.objects.all(), latitude, longitude, radius_km)
+        projects = Project.objects.filter(id__in=list(distances))
+        projects = sorted(projects, key=lambda p: distances[p.id])[:limit]
+        return [self.to_summary(p, distance_km=distances[p.id]) for p in projects]
+
+    def summaries_for_ids(self, project_ids: List[int], profile: BuyerProfile) -> List[ProjectSummary]:
+        """
+        Rebuilds a stored shortlist (persisted as ids only) in its original order,
+        with prices in the buyer's currency and distances for "near X" searches.
+        Projects deleted since are dropped.
+        """
+        if not project_ids:
+            return []
+
+        # display only: a shortlist was searched in a supported currency
+        currency = normalize_currency(profile.currency) or "USD"
+        place = find_place(profile.near_location)
+        projects = Project.objects.only(*SUMMARY_FIELDS).in_bulk(project_ids)
 
+        results: List[ProjectSummary] = []
+        for pk in project_ids:
+            p = projects.get(pk)
+            if p is None:
+                continue
+            distance = None
+            if place and p.latitude is not None and p.longitude is not None:
+                distance = round(haversine_km(place["lat"], place["lng"], p.latitude, p.longitude), 2)
+            results.append(self.to_summary(p, currency, distance))
         return results
 
+    def _distances_within(
+        self,
+        qs: QuerySet,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+    ) -> Dict[int, float]:
+        """
+        Returns {project_id: distance_km} for projects in qs within radius_km.
+
+        Step 1 (DB): bounding-box prefilter on the grid cell + lat/lng indexes.
+        Step 2 (Python): exact haversine over the few surviving rows.
+        """
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+
+        qs = qs.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+        # Skip the longitude range near the antimeridian; haversine still filters exactly.
+        if -180.0 <= min_lng and max_lng <= 180.0:
+            qs = qs.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+            cells = grid_cells_for_box(min_lat, max_lat, min_lng, max_lng)
+            if cells is not None:
+                qs = qs.filter(geo_cell__in=cells)
+
+        rows = qs.values_list("id", "latitude", "longitude")
+        return {
+            pk: round(d, 2)
+            for pk, d in distances_km(latitude, longitude, rows).items()
+            if d <= radius_km
+        }
+
+    @staticmethod
+    def to_summary(
+        p: Project,
+        currency: str = "USD",
+        distance_km: Optional[float] = None,
+    ) -> ProjectSummary:
+        price = getattr(p, price_field_for(currency))
+        return ProjectSummary(
+            id=p.id,
+            name=p.name,
+            city=p.city,
+            country=p.country,
+            price_usd=p.price_usd or 0.0,
+            price=price,
+            currency=currency,
+            unit_type=p.unit_type,
+            no_of_bedrooms=p.no_of_bedrooms,
+            property_type=p.property_type,
+            distance_km=distance_km,
+        )
+
     # Placeholder for future Vanna/Chroma-style text-to-SQL
     def text_to_sql(self, natural_language_query: str) -> str:
         """
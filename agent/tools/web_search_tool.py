@@ -1,8 +1,69 @@
 import os
-from typing import Optional
+import threading
+import time
+from typing import Callable, Dict, Optional
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from agent.tracing import traced
+from agent.ttl_cache import TTLCache
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing provider for a while.
+
+    - closed:    calls go through; consecutive failures are counted
+    - open:      after `failure_threshold` failures, calls are skipped for `reset_timeout` seconds
+    - half-open: after the timeout, one trial call is let through; success closes, failure re-opens
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
 
 
 class WebSearchTool:
@@ -17,13 +78,55 @@ class WebSearchTool:
     - Set WEB_SEARCH_API_URL in Django settings or environment.
       For example, an endpoint that accepts POST {"query": "..."} and returns:
         {"summary": "some text"}
+
+    Performance:
+    - One pooled requests.Session (keep-alive) is shared by all calls.
+    - Summaries are cached for WEB_SEARCH_CACHE_TTL seconds; empty results and
+      errors are cached for the shorter WEB_SEARCH_NEGATIVE_TTL.
+    - A circuit breaker skips the provider entirely while it keeps failing.
+    - `stats()` exposes hit/miss/error counters and call latency.
     """
 
-    def __init__(self) -> None:
-        self.api_url: Optional[str] = getattr(settings, "WEB_SEARCH_API_URL", None) or os.getenv(
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cache_ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+    ) -> None:
+        self.api_url: Optional[str] = api_url or getattr(settings, "WEB_SEARCH_API_URL", None) or os.getenv(
             "WEB_SEARCH_API_URL"
         )
+        self.timeout = timeout if timeout is not None else settings.WEB_SEARCH_TIMEOUT
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.WEB_SEARCH_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.WEB_SEARCH_NEGATIVE_TTL
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.WEB_SEARCH_POOL_SIZE,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cache = TTLCache(maxsize=settings.WEB_SEARCH_CACHE_SIZE, ttl=self.cache_ttl)
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.WEB_SEARCH_BREAKER_THRESHOLD,
+            reset_timeout=settings.WEB_SEARCH_BREAKER_RESET,
+        )
+
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {}
+        self.reset_stats()
 
+    @staticmethod
+    def build_query(project_name: str, city: Optional[str] = None) -> str:
+        query_parts = [project_name]
+        if city:
+            query_parts.append(city)
+        return " ".join(query_parts)
+
+    @traced("tool", "web_search_tool")
     def search_project_info(self, project_name: str, city: Optional[str] = None) -> Optional[str]:
         """
         Search the web for additional info about a project.
@@ -34,27 +137,83 @@ class WebSearchTool:
             # Web search not configured – graceful no-op
             return None
 
-        query_parts = [project_name]
-        if city:
-            query_parts.append(city)
-        query = " ".join(query_parts)
+        query = self.build_query(project_name, city)
+        cache_key = query.lower()
 
+        hit, cached = self.cache.lookup(cache_key)
+        if hit:
+            self._count("hits" if cached is not None else "negative_hits")
+            return cached
+        self._count("misses")
+
+        if not self.breaker.allow():
+            # Provider is failing – don't make the user wait on it
+            self._count("short_circuits")
+            return None
+
+        summary = None
+        started = time.perf_counter()
         try:
-            resp = requests.post(
+            resp = self.session.post(
                 self.api_url,
                 json={"query": query},
-                timeout=8,
+                timeout=self.timeout,
             )
             resp.raise_for_status()
             data = resp.json()
             summary = data.get("summary")
-            if isinstance(summary, str) and summary.strip():
-                return summary.strip()
         except Exception:
             # For robustness, swallow errors and return None
+            self._record_latency(started)
+            self._count("errors")
+            self.breaker.record_failure()
+            self.cache.set(cache_key, None, ttl=self.negative_ttl)
             return None
 
+        self._record_latency(started)
+        self.breaker.record_success()
+
+        if isinstance(summary, str) and summary.strip():
+            summary = summary.strip()
+            self.cache.set(cache_key, summary)
+            return summary
+
+        self.cache.set(cache_key, None, ttl=self.negative_ttl)
         return None
 
+    # ---------- counters ----------
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        calls = snapshot["calls"]
+        snapshot["latency_avg_ms"] = snapshot["latency_total_ms"] / calls if calls else 0.0
+        snapshot["breaker_state"] = self.breaker.state
+        return snapshot
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._stats = {
+                "hits": 0,
+                "negative_hits": 0,
+                "misses": 0,
+                "errors": 0,
+                "short_circuits": 0,
+                "calls": 0,
+                "latency_total_ms": 0.0,
+                "latency_max_ms": 0.0,
+            }
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _record_latency(self, started: float) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._stats["latency_total_ms"] += elapsed_ms
+            self._stats["latency_max_ms"] = max(self._stats["latency_max_ms"], elapsed_ms)
+
 
 web_search_tool = WebSearchTool()
@@ -0,0 +1,171 @@
+"""
+Per-turn tracing of the agent pipeline.
+
+- span(kind, name) times a graph node, tool or LLM call. It records the
+  time in the kind's histogram (agent_node_seconds, agent_tool_seconds,
+  agent_llm_seconds). During a traced turn it also appends the span to the
+  turn's trace.
+- trace_turn(conversation_id) wraps one graph run. The turn's DB queries
+  are counted and timed. Loading and saving the session happen outside the
+  graph run, so they are not in these totals. At the end, the turn's histograms are updated and
+  one JSON line is logged to the "agent.trace" logger. The line carries the
+  conversation id, stage, total time, DB totals, LLM token totals and every
+  span, in order.
+
+The current trace lives in a contextvar, so nodes running in the turn's
+worker thread find it. Work handed to other pools (web prefetch) still
+counts in the histograms, but not in any turn's trace.
+"""
+import functools
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.db import connection
+
+from agent.metrics import Counter, Histogram
+
+
+logger = logging.getLogger("agent.trace")
+
+SPAN_SECONDS = {
+    "node": Histogram("agent_node_seconds", "Time spent in each LangGraph node", ["name", "status"]),
+    "tool": Histogram("agent_tool_seconds", "Time spent in each agent tool call", ["name", "status"]),
+    "llm": Histogram("agent_llm_seconds", "Latency of LLM calls, by model", ["name", "status"]),
+}
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens used, by model and kind (prompt, completion, cached)", ["model", "kind"])
+LLM_REQUESTS = Counter("agent_llm_requests_total", "LLM calls, by model and prompt cache outcome (hit, miss)", ["model", "cache"])
+TURN_SECONDS = Histogram("agent_turn_seconds", "Wall time of a graph run, by resulting stage", ["stage", "status"])
+TURN_DB_QUERIES = Histogram(
+    "agent_turn_db_queries", "DB queries per graph run", buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)
+)
+TURN_DB_SECONDS = Histogram("agent_turn_db_seconds", "DB time per graph run")
+
+
+class TurnTrace:
+    def __init__(self, conversation_id) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.conversation_id = str(conversation_id)
+        self.stage: Optional[str] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: every query of the turn passes here
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def record(self, seconds: float, status: str) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "conversation_id": self.conversation_id,
+            "stage": self.stage,
+            "status": status,
+            "ms": round(seconds * 1000, 2),
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "spans": self.spans,
+        }
+
+
+current_trace: ContextVar[Optional[TurnTrace]] = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Times the block. Yields a dict for extra attributes (e.g. token counts)
+    that go into the trace.
+    """
+    attrs: Dict[str, Any] = {}
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        SPAN_SECONDS[kind].observe(seconds, name=name, status=status)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.spans.append({"kind": kind, "name": name, "ms": round(seconds * 1000, 2), "status": status, **attrs})
+
+
+def traced(kind: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorator form of span(); the name defaults to the function's.
+    """
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_llm_usage(attrs: Dict[str, Any], model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """
+    Counts the tokens of an LLM call from OpenRouter's `usage` field.
+    """
+    usage = usage or {}
+    prompt = usage.get("prompt_tokens") or 0
+    completion = usage.get("completion_tokens") or 0
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+
+    LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion, model=model, kind="completion")
+    LLM_TOKENS.inc(cached, model=model, kind="cached")
+    LLM_REQUESTS.inc(model=model, cache="hit" if cached else "miss")
+    attrs.update(prompt_tokens=prompt, completion_tokens=completion, cached_tokens=cached)
+
+    trace = current_trace.get()
+    if trace is not None:
+        trace.prompt_tokens += prompt
+        trace.completion_tokens += completion
+
+
+@contextmanager
+def trace_turn(conversation_id) -> Iterator[TurnTrace]:
+    """
+    Traces one graph run; set `trace.stage` once it's known.
+
+    Only queries made on this thread's connection inside the block count:
+    the session load and save around the run are left out.
+    """
+    trace = TurnTrace(conversation_id)
+    token = current_trace.set(trace)
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(trace):
+            yield trace
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        current_trace.reset(token)
+        TURN_SECONDS.observe(seconds, stage=trace.stage or "", status=status)
+        TURN_DB_QUERIES.observe(trace.db_queries)
+        TURN_DB_SECONDS.observe(trace.db_seconds)
+        logger.info(json.dumps(trace.record(seconds, status), default=str))
@@ -0,0 +1,186 @@
+"""
+Admission control for LLM-bound chat turns.
+
+Each process runs at most LLM_MAX_IN_FLIGHT_TURNS graph runs at a time.
+Turns beyond that wait in a priority queue, ordered by the conversation's
+stage: a buyer in the middle of booking goes before one browsing, who goes
+before small talk (turn_priority). A turn waits at most LLM_TURN_QUEUE_TIMEOUT
+seconds. When the queue holds LLM_TURN_QUEUE_SIZE turns already, or the wait
+runs out, the request is refused with 429 and a Retry-After estimated from
+recent turn durations, rather than piling up until clients time out.
+
+LLM_MAX_IN_FLIGHT_TURNS=0 disables admission control.
+
+Waiters may sit on different event loops (Django runs an async view in a
+fresh loop when served over WSGI), so the queue is guarded by a thread lock
+and a waiter is woken through its own loop.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+
+# stage -> priority: lower goes first; other stages (including a finished
+# booking, "booking_confirmed") get DEFAULT_PRIORITY
+STAGE_PRIORITIES = {
+    "booking_need_project": 0,
+    "booking_need_contact": 0,
+    "booking_error": 0,
+    "detail_need_selection": 1,
+    "detail_complete": 1,
+    "detail_from_web": 1,
+    "detail_error": 1,
+    "recommendations": 1,
+    "asking_prefs": 2,
+}
+DEFAULT_PRIORITY = 3
+
+
+def turn_priority(stage: Optional[str]) -> int:
+    return STAGE_PRIORITIES.get(stage or "", DEFAULT_PRIORITY)
+
+
+class TurnQueueFull(Exception):
+    """
+    A turn was refused: too many turns are waiting, or it waited too long.
+    """
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Too many chat turns in progress, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "loop", "granted", "abandoned")
+
+    def __init__(self, future: asyncio.Future, loop: asyncio.AbstractEventLoop) -> None:
+        self.future = future
+        self.loop = loop
+        self.granted = False
+        self.abandoned = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class TurnAdmission:
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # None -> read the setting on use, so tests can override it
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._max_wait = max_wait
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._queued = 0  # waiters in _queue that haven't given up
+        self._order = itertools.count()
+        self._avg_turn = 5.0  # seconds, moving average
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    # ---------- config ----------
+
+    @property
+    def max_in_flight(self) -> int:
+        return settings.LLM_MAX_IN_FLIGHT_TURNS if self._max_in_flight is None else self._max_in_flight
+
+    @property
+    def max_queue(self) -> int:
+        return settings.LLM_TURN_QUEUE_SIZE if self._max_queue is None else self._max_queue
+
+    @property
+    def max_wait(self) -> float:
+        return settings.LLM_TURN_QUEUE_TIMEOUT if self._max_wait is None else self._max_wait
+
+    # ---------- admission ----------
+
+    @asynccontextmanager
+    async def admit(self, priority: int = DEFAULT_PRIORITY) -> AsyncIterator[None]:
+        """
+        Holds a slot for the duration of the block; raises TurnQueueFull.
+        """
+        if self.max_in_flight <= 0:
+            yield
+            return
+
+        await self._acquire(priority)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._release(self._clock() - started)
+
+    async def _acquire(self, priority: int) -> None:
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._queued:
+                self._in_flight += 1
+                self._stats["admitted"] += 1
+                return
+            if self._queued >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise TurnQueueFull(self._retry_after())
+            loop = asyncio.get_running_loop()
+            waiter = _Waiter(loop.create_future(), loop)
+            heapq.heappush(self._queue, (priority, next(self._order), waiter))
+            self._queued += 1
+            self._stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if not waiter.granted:
+                    waiter.abandoned = True
+                    self._queued -= 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._stats["timed_out"] += 1
+                        raise TurnQueueFull(self._retry_after()) from None
+                    raise
+            # the slot was handed over just as we gave up: pass it on
+            if isinstance(e, asyncio.CancelledError):
+                self._release(None)
+                raise
+        with self._lock:
+            self._stats["admitted"] += 1
+
+    def _release(self, duration: Optional[float]) -> None:
+        with self._lock:
+            if duration is not None:
+                self._avg_turn = 0.8 * self._avg_turn + 0.2 * duration
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.abandoned:
+                    continue
+                # the slot goes straight to the next waiter
+                waiter.granted = True
+                self._queued -= 1
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                return
+            self._in_flight -= 1
+
+    def _retry_after(self) -> int:
+        # time for the queue ahead to drain through the available slots
+        ahead = self._queued + 1
+        return max(1, math.ceil(self._avg_turn * ahead / max(self.max_in_flight, 1)))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": self._in_flight, "waiting": self._queued}
+
+
+turn_admission = TurnAdmission()
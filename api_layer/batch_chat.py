@@ -0,0 +1,198 @@
+"""
+Batch chat turns (run by `python manage.py batch_chat`), for QA replays and
+lead re-qualification.
+
+Input is JSONL, one turn per line:
+
+    {"conversation_id": "8100e73d-...", "message": "Any villas in Dubai?"}
+    {"ref": "lead-42", "message": "Hi"}
+
+A `ref` instead of a conversation id starts a new conversation (with the
+usual greeting) on its first line; later lines with the same `ref` continue
+it.
+
+- Turns are grouped by conversation and each group runs on one worker of a
+  thread pool, in input order. Different conversations run in parallel.
+- A group runs all its turns on the in-memory state, then writes once: one
+  transaction appends every new message and updates the session row
+  (compare-and-swap, like a chat turn). A turn that fails ends its group:
+  the turns before it are saved, the rest are reported as skipped. A group
+  that fails outright is reported as failed; the other groups carry on.
+- Conversations are read and saved through the session cache. With a shared
+  SESSION_CACHE_BACKEND a group starts from turns the web workers haven't
+  written yet, and its save is published there, so their older copies are
+  reloaded instead of written. With sticky routing and no shared backend
+  those turns can't be seen from here: the batch saves on top of the DB, and
+  the web worker's later write is refused and reported as a conflict.
+- The workers share the process-wide LLM client (one HTTP connection pool,
+  paced by the OpenRouter rate limit) and the project caches.
+- One JSONL result per input line is written as soon as its group is saved,
+  so results of different conversations interleave.
+"""
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.http import Http404
+
+from agent.state import AgentState
+from api_layer.endpoints.chat import run_graph
+from api_layer.endpoints.conversations import GREETING
+from api_layer.session_cache import session_cache
+from api_layer.session_store import StaleSessionError, create_session
+from properties.models import ConversationSession
+
+
+class BatchItem:
+    __slots__ = ("line", "conversation_id", "ref", "message")
+
+    def __init__(self, line: int, conversation_id: Optional[str], ref: Optional[str], message: str) -> None:
+        self.line = line
+        self.conversation_id = conversation_id
+        self.ref = ref
+        self.message = message
+
+    @property
+    def group(self) -> Tuple[str, str]:
+        return ("id", self.conversation_id) if self.conversation_id else ("ref", self.ref)
+
+
+def parse_items(lines: Iterable[str]) -> Tuple[List[BatchItem], List[Dict[str, Any]]]:
+    """
+    (items, error results for the lines that aren't valid turns). Blank lines are skipped.
+    """
+    items, errors = [], []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            errors.append({"line": line_no, "error": "Invalid JSON."})
+            continue
+        if not isinstance(data, dict):
+            errors.append({"line": line_no, "error": "Expected a JSON object."})
+            continue
+
+        message = data.get("message")
+        conversation_id = data.get("conversation_id")
+        ref = data.get("ref")
+        if not isinstance(message, str) or not message.strip():
+            errors.append({"line": line_no, "error": "'message' is required."})
+        elif not conversation_id and not ref:
+            errors.append({"line": line_no, "error": "'conversation_id' or 'ref' is required."})
+        else:
+            items.append(BatchItem(line_no, str(conversation_id) if conversation_id else None, ref, message))
+    return items, errors
+
+
+def group_items(items: Iterable[BatchItem]) -> List[List[BatchItem]]:
+    """
+    Items by conversation, in order of first appearance; input order within each.
+    """
+    groups: "OrderedDict[Tuple[str, str], List[BatchItem]]" = OrderedDict()
+    for item in items:
+        groups.setdefault(item.group, []).append(item)
+    return list(groups.values())
+
+
+def _result(item: BatchItem, conversation_id=None, **fields) -> Dict[str, Any]:
+    result = {"line": item.line, "conversation_id": str(conversation_id) if conversation_id else item.conversation_id}
+    if item.ref:
+        result["ref"] = item.ref
+    result.update(fields)
+    return result
+
+
+def _turn_result(item: BatchItem, conversation_id, state: AgentState) -> Dict[str, Any]:
+    reply = next((m["content"] for m in reversed(state.messages) if m["role"] == "assistant"), "")
+    return _result(
+        item,
+        conversation_id,
+        reply=reply,
+        intent=state.intent,
+        stage=state.stage,
+        shortlisted_project_ids=[p.id for p in state.candidate_projects],
+    )
+
+
+def _open(group: List[BatchItem]) -> Tuple[ConversationSession, AgentState]:
+    first = group[0]
+    if first.conversation_id is None:
+        state = AgentState(messages=[{"role": "assistant", "content": GREETING}])
+        return create_session(state), state
+
+    # through the cache: turns other workers published to a shared backend
+    # but haven't written yet are included
+    return session_cache.get(first.conversation_id)
+
+
+def run_group(group: List[BatchItem]) -> List[Dict[str, Any]]:
+    """
+    Runs one conversation's turns in order and saves them in one transaction.
+    """
+    try:
+        try:
+            session, state = _open(group)
+        except (Http404, ValidationError):
+            return [_result(item, error="Conversation not found.") for item in group]
+
+        results = []
+        for index, item in enumerate(group):
+            # nodes edit the state in place: a failed turn must leave the
+            # last good state (saved below) untouched
+            turn_state = state.model_copy(deep=True)
+            turn_state.messages.append({"role": "user", "content": item.message})
+            try:
+                state = run_graph(session.id, turn_state)
+            except Exception as e:
+                # the failed turn is dropped, its message included
+                results.append(_result(item, session.id, error=f"Turn failed: {e}"))
+                results.extend(
+                    _result(later, session.id, error="Skipped: an earlier turn failed.")
+                    for later in group[index + 1:]
+                )
+                break
+            results.append(_turn_result(item, session.id, state))
+
+        try:
+            session_cache.put(session, state, write_through=True)
+        except StaleSessionError:
+            return [
+                _result(item, session.id, error="The conversation was updated concurrently, nothing was saved.")
+                for item in group
+            ]
+        return results
+    finally:
+        close_old_connections()
+
+
+def run_batch(items: Iterable[BatchItem], workers: int = 8) -> Iterator[Dict[str, Any]]:
+    """
+    Yields one result per item, a conversation's results together once it is saved.
+    """
+    groups = group_items(items)
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="batch-chat") as pool:
+        futures = {pool.submit(run_group, group): group for group in groups}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                # e.g. the DB went away while saving: only this conversation fails
+                results = [_result(item, error=f"Conversation failed: {e}") for item in futures[future]]
+            yield from results
+
+
+def write_results(results: Iterable[Dict[str, Any]], out: TextIO) -> Dict[str, int]:
+    """
+    Writes results as JSONL, flushing after each line; returns counts.
+    """
+    counts = {"ok": 0, "failed": 0}
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+        counts["failed" if "error" in result else "ok"] += 1
+    return counts
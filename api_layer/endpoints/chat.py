@@ -1,63 +1,204 @@
+from typing import Any, Dict, List, Union
+from uuid import UUID
+
+import jsonpatch
+from asgiref.sync import sync_to_async
 from ninja import Router
-from django.shortcuts import get_object_or_404
+from ninja.errors import HttpError
+from django.conf import settings
+from django.http import HttpResponse
 
-from api_layer.schemas import ChatRequest, ChatResponse, ProjectItem
-from properties.models import ConversationSession
+from api_layer import idempotency
+from api_layer.profiling import profile_requests, profiled_section
+from api_layer.admission import turn_admission, turn_priority
+from api_layer.schemas import ChatDeltaResponse, ChatRequest, ChatResponse, ProjectItem
+from api_layer.session_cache import session_cache
+from api_layer.session_store import StaleSessionError, client_state, dump_state
 from agent.state import AgentState
+from agent.checkpointer import DjangoCheckpointSaver
 from agent.langgraph_graph import build_graph
+from agent.tracing import trace_turn
 
 router = Router(tags=["Chat"])
 
 graph = build_graph()
 app = graph.compile()
 
+# Same graph with per-conversation checkpoints (settings.LANGGRAPH_CHECKPOINTS)
+checkpointer = DjangoCheckpointSaver()
+checkpointed_app = graph.compile(checkpointer=checkpointer)
 
-@router.post("/chat", response=ChatResponse)
-def chat_with_agent(request, payload: ChatRequest):
-    session = get_object_or_404(
-        ConversationSession, pk=payload.conversation_id
-    )
 
-    prev_state = AgentState(**session.state)
+def run_graph(conversation_id: UUID, state: AgentState) -> AgentState:
+    """
+    Runs one turn. The validated state goes in as-is, and the result is built
+    without re-validation: every channel value was produced by the graph's
+    own (already validated) AgentState.
 
-    # Add user message
-    prev_state.messages.append({
-        "role": "user",
-        "content": payload.message
-    })
+    Each run is traced (nodes, tools, LLM calls, DB queries; agent/tracing.py),
+    and profiled when its request is (api_layer/profiling.py).
+    """
+    with trace_turn(conversation_id) as trace, profiled_section():
+        if not settings.LANGGRAPH_CHECKPOINTS:
+            result = AgentState.model_construct(**app.invoke(state))
+        else:
+            result = run_checkpointed(str(conversation_id), state)
+        trace.stage = result.stage
+    return result
 
-    # Run LangGraph
-    new_state_dict = app.invoke(prev_state.dict())
-    new_state = AgentState(**new_state_dict)
 
-    # Save updated state
-    session.state = new_state.model_dump(mode="json")
+def checkpoint_matches(values: Dict[str, Any], state: AgentState) -> bool:
+    """
+    Whether a checkpoint holds `state` as it was before its last (user) message.
+    """
+    for name, field in AgentState.model_fields.items():
+        expected = state.messages[:-1] if name == "messages" else getattr(state, name)
+        if values.get(name, field.get_default()) != expected:
+            return False
+    return True
 
-    session.save()
 
-    # Get last assistant message
-    last_assistant_msg = next(
-        (m["content"] for m in reversed(new_state.messages) if m["role"] == "assistant"),
-        ""
-    )
+def run_checkpointed(thread_id: str, state: AgentState) -> AgentState:
+    """
+    Runs the turn on the conversation's latest checkpoint. Only the new user
+    message goes in, so the turn writes blobs only for the channels it
+    changes, and `messages` only for the messages it adds.
+
+    When the checkpoint isn't the state the turn starts from (first turn with
+    checkpoints, a conversation compacted since, a replay after another
+    worker saved it), the thread is restarted from `state`.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    saved = checkpointer.get_tuple(config)
+    if saved is not None and checkpoint_matches(saved.checkpoint["channel_values"], state):
+        turn_input: Any = {"messages": state.messages[-1:]}
+    else:
+        if saved is not None:
+            checkpointer.delete_thread(thread_id)
+        turn_input = state
+
+    result = AgentState.model_construct(**checkpointed_app.invoke(turn_input, config))
+    if settings.LANGGRAPH_CHECKPOINTS_KEEP > 0:
+        checkpointer.prune(thread_id, keep_last=settings.LANGGRAPH_CHECKPOINTS_KEEP)
+    return result
 
-    shortlisted = [
+
+async def arun_graph(conversation_id: UUID, state: AgentState) -> AgentState:
+    """
+    run_graph() for the async views. The nodes are sync (ORM queries, blocking
+    LLM calls), so the turn runs in the request's worker thread: the event
+    loop keeps serving other requests meanwhile, and the nodes' queries share
+    the request's DB connection (app.ainvoke would spread them over the
+    loop's default executor, whose connections Django never closes).
+    """
+    return await sync_to_async(run_graph)(conversation_id, state)
+
+
+def to_project_items(projects) -> List[ProjectItem]:
+    return [
         ProjectItem(
             id=p.id,
             name=p.name,
             city=p.city,
             country=p.country,
             price_usd=p.price_usd,
+            price=p.price,
+            currency=p.currency,
             unit_type=p.unit_type,
             no_of_bedrooms=p.no_of_bedrooms,
-            property_type=p.property_type
+            property_type=p.property_type,
+            distance_km=p.distance_km,
         )
-        for p in new_state.candidate_projects
+        for p in projects
     ]
 
+
+def state_patch(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return jsonpatch.make_patch(before, after).patch
+
+
+@router.post("/chat", response=Union[ChatResponse, ChatDeltaResponse])
+@profile_requests
+async def chat_with_agent(request, payload: ChatRequest, response: HttpResponse):
+    key = request.headers.get(idempotency.HEADER)
+    if key is None:
+        return await chat_turn(payload)
+
+    # A retry with the same key gets the first request's response (see api_layer/idempotency.py)
+    replayed = await idempotency.begin(
+        payload.conversation_id, key, idempotency.fingerprint(payload.model_dump(mode="json"))
+    )
+    if replayed is not None:
+        response[idempotency.REPLAYED_HEADER] = "true"
+        return replayed
+
+    try:
+        result = await chat_turn(payload)
+    except BaseException:
+        await idempotency.release(payload.conversation_id, key)
+        raise
+    await idempotency.complete(payload.conversation_id, key, result.model_dump(mode="json"))
+    return result
+
+
+async def chat_turn(payload: ChatRequest) -> Union[ChatResponse, ChatDeltaResponse]:
+    delta = payload.response_mode == "delta"
+
+    for _attempt in range(settings.SESSION_CAS_RETRIES + 1):
+        # Turns of one conversation run one at a time in this process
+        async with session_cache.aconversation_lock(payload.conversation_id):
+            # The only full validation of the turn (none at all on a cache hit)
+            session, prev_state = await session_cache.aget(payload.conversation_id)
+            if delta:
+                before = prev_state.model_dump(mode="json", exclude={"messages", "candidate_projects"})
+                before_shortlist = [p.model_dump() for p in prev_state.candidate_projects]
+
+            # Add user message
+            prev_state.messages.append({
+                "role": "user",
+                "content": payload.message
+            })
+
+            turn_start = len(prev_state.messages)
+
+            # Run LangGraph: one of a bounded number of LLM-bound turns, queued
+            # by the conversation's stage (429 when the queue is full)
+            async with turn_admission.admit(turn_priority(prev_state.stage)):
+                new_state = await arun_graph(session.id, prev_state)
+
+            # Serialized once, for both storage and the response
+            dumped = dump_state(new_state)
+
+            # Save updated state (write-behind; appends only the new messages)
+            try:
+                await session_cache.aput(session, new_state, dumped)
+            except StaleSessionError:
+                # Another worker saved this conversation meanwhile: replay the
+                # message on top of its state, so turns stay in order
+                continue
+        break
+    else:
+        raise HttpError(409, "The conversation was updated concurrently, please retry.")
+
+    # Get last assistant message
+    last_assistant_msg = next(
+        (m["content"] for m in reversed(new_state.messages) if m["role"] == "assistant"),
+        ""
+    )
+
+    if delta:
+        shortlist_changed = [p.model_dump() for p in new_state.candidate_projects] != before_shortlist
+        return ChatDeltaResponse(
+            conversation_id=session.id,
+            reply=last_assistant_msg,
+            new_messages=new_state.messages[turn_start:],
+            state_patch=state_patch(before, client_state(dumped)),
+            shortlisted_projects=to_project_items(new_state.candidate_projects) if shortlist_changed else None,
+        )
+
     return ChatResponse(
         conversation_id=session.id,
         reply=last_assistant_msg,
-        shortlisted_projects=shortlisted,
-        agent_state=new_state.dict()
+        shortlisted_projects=to_project_items(new_state.candidate_projects),
+        agent_state=dumped
     )
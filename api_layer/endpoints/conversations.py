@@ -1,34 +1,82 @@
-from ninja import Router
-from api_layer.schemas import ConversationCreateResponse
-from properties.models import ConversationSession
+from uuid import UUID
+
+from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
+from ninja import Query, Router
+from ninja.errors import HttpError
+from api_layer.schemas import ConversationCreateResponse, ConversationMessagesResponse
+from api_layer.session_cache import session_cache
+from api_layer.session_store import acreate_session, client_state, dump_state, stored_client_state
 from agent.state import AgentState
+from properties.models import ConversationSession
 
 router = Router(tags=["Conversations"])
 
+GREETING = (
+    "Hello! 👋 I'm your SilverLand Property Assistant. "
+    "Which city are you looking to buy in?"
+)
 
-@router.post("", response=ConversationCreateResponse)
-def create_conversation(request):
-    session = ConversationSession.objects.create(state={})
 
+@router.post("", response=ConversationCreateResponse)
+async def create_conversation(request):
     # initialize state
-    state = AgentState(
+    state = AgentState(messages=[])
+
+    state.messages.append({"role": "assistant", "content": GREETING})
+
+    # save state into DB
+    session = await acreate_session(state)
+    await session_cache.aadd(session, state)
+
+    return ConversationCreateResponse(
         conversation_id=session.id,
-        messages=[]
+        message=GREETING,
+        agent_state=client_state(dump_state(state)),
     )
 
-    greeting = (
-        "Hello! 👋 I'm your SilverLand Property Assistant. "
-        "Which city are you looking to buy in?"
-    )
 
-    state.messages.append({"role": "assistant", "content": greeting})
+@router.get("/{conversation_id}/messages", response=ConversationMessagesResponse)
+async def conversation_messages(
+    request,
+    conversation_id: UUID,
+    response: HttpResponse,
+    after: int = -1,
+    limit: int = Query(50, ge=1, le=200),
+):
+    """
+    Stored messages with seq > `after`, oldest first: pages through the
+    history to restore a conversation, then polls for new messages.
 
-    # save state into DB
-    session.state = state.model_dump(mode="json")
+    The ETag follows the session version and the page asked for (`after`,
+    `limit`), so a poll that finds nothing new costs one indexed lookup and
+    returns 304, and another page at the same version never does.
+    """
+    # turns still in the write-behind cache reach the DB first
+    await session_cache.aflush(conversation_id)
+    try:
+        session = await ConversationSession.objects.aget(pk=conversation_id)
+    except ConversationSession.DoesNotExist:
+        raise HttpError(404, "Conversation not found.")
 
-    session.save()
+    etag = quote_etag(f"v{session.version}-{after}-{limit}")
+    # weak comparison: compressed responses carry the tag as W/"..."
+    if etag in [tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))]:
+        return HttpResponse(status=304, headers={"ETag": etag})
 
-    return ConversationCreateResponse(
+    rows = [
+        m async for m in session.messages.filter(seq__gt=after)
+        .order_by("seq")
+        .values("seq", "role", "content")[: limit + 1]
+    ]
+    page = rows[:limit]
+
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return ConversationMessagesResponse(
         conversation_id=session.id,
-        message=greeting
+        messages=page,
+        next_after=page[-1]["seq"] if page else after,
+        has_more=len(rows) > limit,
+        agent_state=stored_client_state(session),
     )
@@ -0,0 +1,177 @@
+"""
+Project search and detail endpoints: browsing without an LLM turn.
+
+Search reuses ProjectSqlTool's filters, strictly (no soft fallbacks), with
+keyset pagination: `next_cursor` encodes the sort key of the last item, so
+every page is one indexed range query however deep the client pages.
+
+Responses carry ETag and Last-Modified, and conditional requests
+(If-None-Match / If-Modified-Since) get 304:
+- search: from the catalog version, one aggregate query over Project
+- detail: from the project's version, kept with its cached detail card
+  (a revalidation usually costs no DB query)
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Tuple
+
+from django.db.models import Count, F, Max, Q
+from django.views.decorators.http import condition
+from ninja import Query, Router
+from ninja.decorators import decorate_view
+from ninja.errors import HttpError
+
+from agent.state import BuyerProfile
+from agent.tools.project_info_tool import get_project_details, project_version
+from agent.tools.t2sql_tool import SUMMARY_FIELDS, project_sql_tool
+from api_layer.schemas import ProjectDetail, ProjectFilters, ProjectItem, ProjectListResponse
+from properties.currency import normalize_currency, price_field_for
+from properties.geo import find_place
+from properties.models import Project
+
+router = Router(tags=["Projects"])
+
+
+# ---------- catalog version ----------
+
+def catalog_version(request) -> Tuple[str, Optional[datetime]]:
+    """
+    (etag, last_modified) of the whole catalog. Changes with every insert,
+    update (updated_at) and delete (count) of a Project. Computed once per request.
+    """
+    cached = getattr(request, "_catalog_version", None)
+    if cached is None:
+        agg = Project.objects.aggregate(n=Count("id"), last_id=Max("id"), modified=Max("updated_at"))
+        raw = f"{agg['n']}:{agg['last_id']}:{agg['modified'].isoformat() if agg['modified'] else ''}"
+        cached = (hashlib.sha1(raw.encode()).hexdigest()[:20], agg["modified"])
+        request._catalog_version = cached
+    return cached
+
+
+def catalog_etag(request, *args, **kwargs) -> str:
+    return catalog_version(request)[0]
+
+
+def catalog_last_modified(request, *args, **kwargs) -> Optional[datetime]:
+    return catalog_version(request)[1]
+
+
+def request_project_version(request, project_id: int) -> Optional[str]:
+    """
+    project_version(), looked up once per request.
+    """
+    if getattr(request, "_project_version", None) is None:
+        request._project_version = (project_version(project_id),)
+    return request._project_version[0]
+
+
+def project_etag(request, project_id: int, **kwargs) -> Optional[str]:
+    version = request_project_version(request, project_id)
+    return f"project-{project_id}-{version}" if version else None
+
+
+def project_last_modified(request, project_id: int, **kwargs) -> Optional[datetime]:
+    version = request_project_version(request, project_id)
+    return datetime.fromtimestamp(int(version) / 1_000_000, tz=dt_timezone.utc) if version else None
+
+
+# ---------- cursors ----------
+
+def encode_cursor(sort_value, pk: int) -> str:
+    raw = json.dumps([None if sort_value is None else str(sort_value), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[Decimal], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, pk = json.loads(raw)
+        return (None if sort_value is None else Decimal(sort_value)), int(pk)
+    except (ValueError, TypeError, InvalidOperation):
+        raise HttpError(400, "Invalid cursor.")
+
+
+def after_cursor(price_field: str, cursor: str) -> Q:
+    """
+    Rows after the cursor in (price NULLS LAST, id) order.
+    """
+    price, pk = decode_cursor(cursor)
+    if price is None:
+        return Q(**{f"{price_field}__isnull": True}, id__gt=pk)
+    return (
+        Q(**{f"{price_field}__gt": price})
+        | Q(**{price_field: price}, id__gt=pk)
+        | Q(**{f"{price_field}__isnull": True})
+    )
+
+
+# ---------- endpoints ----------
+
+@router.get("", response=ProjectListResponse)
+@decorate_view(condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified))
+def search_projects(request, filters: Query[ProjectFilters]):
+    currency = "USD"
+    if filters.currency:
+        currency = normalize_currency(filters.currency)
+        if currency is None:
+            raise HttpError(400, f"Unsupported currency: {filters.currency}")
+    if filters.near and find_place(filters.near) is None:
+        raise HttpError(400, f"Unknown location: {filters.near}")
+
+    profile = BuyerProfile(
+        city=filters.city,
+        property_type=filters.property_type,
+        bedrooms=filters.bedrooms,
+        unit_size=filters.unit_size,
+        budget_min=filters.budget_min,
+        budget_max=filters.budget_max,
+        currency=currency,
+        near_location=filters.near,
+        radius_km=filters.radius_km,
+    )
+    price_field = price_field_for(currency)
+
+    qs, distances = project_sql_tool.filter_projects(Project.objects.only(*SUMMARY_FIELDS), profile)
+    if profile.unit_size:
+        qs = qs.filter(unit_type__icontains=profile.unit_size)
+    for budget in project_sql_tool.budget_conditions(profile, price_field):
+        qs = qs.filter(budget)
+
+    if distances is not None:
+        # bounded by the radius: sorted by (distance, id) in Python
+        rows = sorted(qs, key=lambda p: (distances[p.id], p.id))
+        if filters.cursor:
+            distance, pk = decode_cursor(filters.cursor)
+            rows = [p for p in rows if (Decimal(str(distances[p.id])), p.id) > (distance, pk)]
+        page = rows[: filters.limit + 1]
+        items = [project_sql_tool.to_summary(p, currency, distances[p.id]) for p in page[: filters.limit]]
+        next_cursor = None
+        if len(page) > filters.limit:
+            last = page[filters.limit - 1]
+            next_cursor = encode_cursor(distances[last.id], last.id)
+    else:
+        if filters.cursor:
+            qs = qs.filter(after_cursor(price_field, filters.cursor))
+        page = list(qs.order_by(F(price_field).asc(nulls_last=True), "id")[: filters.limit + 1])
+        items = [project_sql_tool.to_summary(p, currency) for p in page[: filters.limit]]
+        next_cursor = None
+        if len(page) > filters.limit:
+            last = page[filters.limit - 1]
+            next_cursor = encode_cursor(getattr(last, price_field), last.id)
+
+    return ProjectListResponse(
+        items=[ProjectItem(**item.model_dump()) for item in items],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/{project_id}", response=ProjectDetail)
+@decorate_view(condition(etag_func=project_etag, last_modified_func=project_last_modified))
+def project_detail(request, project_id: int):
+    details = get_project_details(project_id)
+    if details is None:
+        raise HttpError(404, "Project not found.")
+    return ProjectDetail(**details)
@@ -0,0 +1,119 @@
+"""
+`Idempotency-Key` handling for chat turns.
+
+A client that retries a turn (e.g. after a timeout) sends the same key again:
+
+- the first request claims the key (a ChatIdempotencyKey row, unique per
+  conversation) and stores its response when the turn completes
+- a retry after that gets the stored response back, without running the
+  graph again (no repeated LLM calls, no second Booking)
+- a retry while the first request is still running waits for it, up to
+  IDEMPOTENCY_WAIT_SECONDS, on any worker
+- a turn that fails releases its key, so the retry runs it again; a claim
+  left behind by a crashed worker is taken over after
+  IDEMPOTENCY_CLAIM_TIMEOUT seconds
+
+Reusing a key for a different message is refused (422). Keys are deleted
+with their conversation, or after IDEMPOTENCY_KEY_TTL_HOURS by the
+session lifecycle job.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from properties.models import ChatIdempotencyKey, ConversationSession
+
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"  # set on responses served from a stored result
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+CLAIMED = "claimed"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+
+def fingerprint(body: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def claim(conversation_id, key: str, request_fingerprint: str):
+    """
+    Tries to claim `key` for a turn of the conversation.
+    Returns (CLAIMED | IN_FLIGHT | DONE, stored response or None).
+    """
+    # checked up front: SQLite and PostgreSQL defer the foreign key check
+    # to the end of the outermost transaction
+    if not ConversationSession.objects.filter(pk=conversation_id).exists():
+        raise Http404("No ConversationSession matches the given query.")
+    try:
+        with transaction.atomic():
+            ChatIdempotencyKey.objects.create(session_id=conversation_id, key=key, fingerprint=request_fingerprint)
+        return CLAIMED, None
+    except IntegrityError:
+        pass
+
+    record = ChatIdempotencyKey.objects.filter(session_id=conversation_id, key=key).first()
+    if record is None:
+        # released by a failed request just now: the next attempt claims it
+        return IN_FLIGHT, None
+
+    if record.fingerprint != request_fingerprint:
+        raise HttpError(422, f"{HEADER} was already used for a different request.")
+    if record.response is not None:
+        return DONE, record.response
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT)
+    if record.claimed_at < stale:
+        # the worker that claimed it is gone
+        taken = ChatIdempotencyKey.objects.filter(
+            pk=record.pk, claimed_at=record.claimed_at, response__isnull=True
+        ).update(claimed_at=now)
+        if taken:
+            return CLAIMED, None
+    return IN_FLIGHT, None
+
+
+async def begin(conversation_id, key: str, request_fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Claims `key`, or returns the response of the request that did (waiting
+    for it while it's in flight). None means: run the turn, then call
+    complete() or release().
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HttpError(422, f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        status, response = await sync_to_async(claim)(conversation_id, key, request_fingerprint)
+        if status == CLAIMED:
+            return None
+        if status == DONE:
+            return response
+        if loop.time() >= deadline:
+            raise HttpError(409, "A request with this Idempotency-Key is still in progress, please retry.")
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def complete(conversation_id, key: str, response: Dict[str, Any]) -> None:
+    await ChatIdempotencyKey.objects.filter(session_id=conversation_id, key=key).aupdate(
+        response=response, completed_at=timezone.now()
+    )
+
+
+async def release(conversation_id, key: str) -> None:
+    await ChatIdempotencyKey.objects.filter(
+        session_id=conversation_id, key=key, response__isnull=True
+    ).adelete()
@@ -0,0 +1,269 @@
+"""
+Opt-in profiling of chat turns.
+
+A turn is profiled when the request carries `X-Profile: <PROFILE_TOKEN>`, or
+at random with probability PROFILE_SAMPLE_RATE. With neither configured the
+endpoint is called directly, and run_graph's profiled section is a context
+variable lookup.
+
+A profiled turn records:
+- CPU: the graph run in its worker thread, with cProfile (PROFILE_MODE=
+  "cprofile": exact call counts, slows the turn down) or a stack sampler
+  (PROFILE_MODE="sample": every PROFILE_SAMPLE_INTERVAL seconds, near-free).
+- Memory: tracemalloc over the whole request. The top lines by allocated
+  size, and the peak of traced memory.
+
+The top PROFILE_TOP_N entries of each go into a report, kept in a bounded
+in-process store (the last PROFILE_STORE_SIZE reports) and served to staff
+at /admin/profiles/. The response carries the report's id in X-Profile-Id.
+
+One turn is profiled at a time per process: cProfile and tracemalloc are
+process-wide, and concurrent turns would blur each other's numbers.
+Allocations made by other requests during a profiled turn still show up.
+"""
+import cProfile
+import functools
+import hmac
+import io
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+
+HEADER = "X-Profile"
+ID_HEADER = "X-Profile-Id"
+
+
+def _where(code) -> str:
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+class StackSampler:
+    """
+    Samples one thread's stack on a timer: self samples per function (the
+    innermost frame) and total samples (anywhere on the stack).
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.own: Counter = Counter()
+        self.total: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_where(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                where = _where(frame.f_code)
+                if where not in seen:
+                    seen.add(where)
+                    self.total[where] += 1
+                frame = frame.f_back
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileRun:
+    def __init__(self, mode: str, trigger: str, path: str) -> None:
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.trigger = trigger
+        self.path = path
+        self.cpu_seconds = 0.0
+        self.profiler = cProfile.Profile() if mode == "cprofile" else None
+        self.samplers: List[StackSampler] = []
+
+    @contextmanager
+    def section(self) -> Iterator[None]:
+        """
+        CPU-profiles the block, in the calling thread.
+        """
+        started = time.thread_time()
+        if self.profiler is not None:
+            self.profiler.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+            self.samplers.append(sampler)
+            sampler.start()
+        try:
+            yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            else:
+                sampler.stop()
+            self.cpu_seconds += time.thread_time() - started
+
+    def cpu_report(self, top_n: int) -> List[Dict[str, Any]]:
+        if self.profiler is not None:
+            stats = pstats.Stats(self.profiler, stream=io.StringIO())
+            rows = [
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": ncalls,
+                    "own_ms": round(tottime * 1000, 3),
+                    "total_ms": round(cumtime * 1000, 3),
+                }
+                for (filename, line, name), (_cc, ncalls, tottime, cumtime, _callers) in stats.stats.items()
+            ]
+            return sorted(rows, key=lambda row: row["total_ms"], reverse=True)[:top_n]
+
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for sampler in self.samplers:
+            own.update(sampler.own)
+            total.update(sampler.total)
+        return [
+            {"function": where, "own_samples": own[where], "total_samples": count}
+            for where, count in total.most_common(top_n)
+        ]
+
+
+def memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top_n: int) -> List[Dict[str, Any]]:
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    return [
+        {
+            "line": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+        }
+        for stat in diff[:top_n]
+        if stat.size_diff > 0
+    ]
+
+
+class ProfileStore:
+    """
+    The last PROFILE_STORE_SIZE reports, by id.
+    """
+
+    def __init__(self) -> None:
+        self._reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, report: Dict[str, Any]) -> None:
+        with self._lock:
+            self._reports[report["id"]] = report
+            while len(self._reports) > max(settings.PROFILE_STORE_SIZE, 1):
+                self._reports.popitem(last=False)
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            reports = list(self._reports.values())
+        keys = ("id", "created_at", "path", "conversation_id", "trigger", "mode", "wall_ms", "cpu_ms", "peak_kb")
+        return [{key: report[key] for key in keys} for report in reversed(reports)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reports.clear()
+
+
+profile_store = ProfileStore()
+current_profile: ContextVar[Optional[ProfileRun]] = ContextVar("current_profile", default=None)
+_busy = threading.Lock()
+
+
+@contextmanager
+def profiled_section() -> Iterator[None]:
+    """
+    CPU-profiles the block when the current request is being profiled.
+    """
+    run = current_profile.get()
+    if run is None:
+        yield
+        return
+    with run.section():
+        yield
+
+
+def _trigger(request) -> Optional[str]:
+    supplied = request.headers.get(HEADER)
+    if supplied and settings.PROFILE_TOKEN and hmac.compare_digest(supplied, settings.PROFILE_TOKEN):
+        return "header"
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def profile_requests(view: Callable) -> Callable:
+    """
+    Wraps an async endpoint taking `request` and `response`. The wrapped
+    view's run_graph calls must run inside profiled_section().
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not settings.PROFILE_TOKEN and settings.PROFILE_SAMPLE_RATE <= 0:
+            return await view(request, *args, **kwargs)
+        trigger = _trigger(request)
+        if trigger is None or not _busy.acquire(blocking=False):
+            return await view(request, *args, **kwargs)
+
+        run = ProfileRun(settings.PROFILE_MODE, trigger, request.path)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        token = current_profile.set(run)
+        started = time.perf_counter()
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            wall = time.perf_counter() - started
+            current_profile.reset(token)
+            try:
+                after = tracemalloc.take_snapshot()
+                _current, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                conversation_id = getattr(kwargs.get("payload"), "conversation_id", None)
+                top_n = settings.PROFILE_TOP_N
+                profile_store.add({
+                    "id": run.id,
+                    "created_at": time.time(),
+                    "path": run.path,
+                    "conversation_id": str(conversation_id) if conversation_id else None,
+                    "trigger": run.trigger,
+                    "mode": run.mode,
+                    "wall_ms": round(wall * 1000, 2),
+                    "cpu_ms": round(run.cpu_seconds * 1000, 2),
+                    "peak_kb": round(peak / 1024, 1),
+                    "cpu": run.cpu_report(top_n),
+                    "memory": memory_report(before, after, top_n),
+                })
+                response = kwargs.get("response")
+                if response is not None:
+                    response[ID_HEADER] = run.id
+            finally:
+                _busy.release()
+
+    return wrapper
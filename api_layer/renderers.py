@@ -0,0 +1,38 @@
+"""
+orjson-based JSON rendering and parsing for the Ninja API.
+
+The output is the same JSON as Ninja's default renderer, produced several
+times faster, and as UTF-8 rather than \\u-escaped ASCII. Types orjson
+doesn't handle natively, and datetimes (kept in Django's format), go
+through NinjaJSONEncoder.default.
+"""
+from typing import Any
+
+import orjson
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+from ninja.types import DictStrAny
+
+_fallback = NinjaJSONEncoder()
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _default(o: Any) -> Any:
+    return _fallback.default(o)
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=_default, option=_OPTIONS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data: Any, *, response_status: int) -> bytes:
+        return dumps(data)
+
+
+class ORJSONParser(Parser):
+    def parse_body(self, request) -> DictStrAny:
+        return orjson.loads(request.body)
@@ -1,3 +1,29 @@
+import math
+
 from ninja import NinjaAPI
 
-api = NinjaAPI(title="SilverLand Property Assistant API")
+from agent.rate_limit import RateLimitTimeout
+from api_layer.admission import TurnQueueFull
+from api_layer.renderers import ORJSONParser, ORJSONRenderer
+
+api = NinjaAPI(
+    title="SilverLand Property Assistant API",
+    renderer=ORJSONRenderer(),
+    parser=ORJSONParser(),
+)
+
+
+def too_many_requests(request, detail: str, retry_after: float):
+    response = api.create_response(request, {"detail": detail}, status=429)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+@api.exception_handler(TurnQueueFull)
+def turn_queue_full(request, exc: TurnQueueFull):
+    return too_many_requests(request, "The assistant is busy, please retry shortly.", exc.retry_after)
+
+
+@api.exception_handler(RateLimitTimeout)
+def llm_rate_limited(request, exc: RateLimitTimeout):
+    return too_many_requests(request, "The assistant is busy, please retry shortly.", exc.retry_after)
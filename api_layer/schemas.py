@@ -1,16 +1,39 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import List, Optional, Any
+from typing import Any, Dict, List, Literal, Optional
 
 
 class ConversationCreateResponse(BaseModel):
     conversation_id: UUID
     message: str
+    # initial state without messages: the base "delta" responses patch
+    agent_state: Optional[Dict[str, Any]] = None
+
+
+class ConversationMessageItem(BaseModel):
+    seq: int
+    role: str
+    content: str
+
+
+class ConversationMessagesResponse(BaseModel):
+    conversation_id: UUID
+    # ordered by seq; after history compaction the oldest stored message is
+    # a summary (role "system") of the ones before it
+    messages: List[ConversationMessageItem]
+    # pass as `after` for the next page / poll
+    next_after: int
+    has_more: bool
+    # the base "delta" chat responses patch
+    agent_state: Dict[str, Any]
 
 
 class ChatRequest(BaseModel):
     conversation_id: UUID
     message: str
+    # "delta": only the new messages, a JSON patch of the state and the
+    # shortlist when it changed (see ChatDeltaResponse)
+    response_mode: Literal["full", "delta"] = "full"
 
 
 class ProjectItem(BaseModel):
@@ -19,9 +42,12 @@ class ProjectItem(BaseModel):
     city: str
     country: str
     price_usd: float
+    price: Optional[float] = None
+    currency: str = "USD"
     unit_type: Optional[str]
     no_of_bedrooms: Optional[int]
     property_type: Optional[str]
+    distance_km: Optional[float] = None
 
 
 class ChatResponse(BaseModel):
@@ -29,3 +55,61 @@ class ChatResponse(BaseModel):
     reply: str
     shortlisted_projects: List[ProjectItem] = []
     agent_state: Any
+
+
+class ChatDeltaResponse(BaseModel):
+    conversation_id: UUID
+    reply: str
+    # messages added by this turn after the user's message
+    new_messages: List[Dict[str, Any]]
+    # RFC 6902 patch from the previous state to the new one, messages and
+    # candidate_projects excluded
+    state_patch: List[Dict[str, Any]]
+    # None when the shortlist didn't change
+    shortlisted_projects: Optional[List[ProjectItem]] = None
+
+
+class ProjectFilters(BaseModel):
+    city: Optional[str] = None
+    property_type: Optional[str] = None
+    bedrooms: Optional[int] = None
+    unit_size: Optional[str] = None
+    # in `currency` (default USD)
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    currency: Optional[str] = None
+    # landmark / district; results are then ordered by distance
+    near: Optional[str] = None
+    radius_km: Optional[float] = None
+    # next_cursor of the previous page
+    cursor: Optional[str] = None
+    limit: int = Field(20, ge=1, le=100)
+
+
+class ProjectListResponse(BaseModel):
+    items: List[ProjectItem]
+    # None on the last page
+    next_cursor: Optional[str] = None
+
+
+class ProjectDetail(BaseModel):
+    id: int
+    name: str
+    developer_name: str = ""
+    city: str
+    country: str
+    property_type: Optional[str] = None
+    unit_type: Optional[str] = None
+    no_of_bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    price_usd: Optional[float] = None
+    price_aed: Optional[float] = None
+    price_inr: Optional[float] = None
+    price_eur: Optional[float] = None
+    price_gbp: Optional[float] = None
+    area_sqm: Optional[float] = None
+    completion_status: Optional[str] = None
+    completion_date: Optional[str] = None
+    features: str = ""
+    facilities: str = ""
+    description: str = ""
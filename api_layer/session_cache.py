@@ -0,0 +1,525 @@
+"""
+Write-behind cache of live conversations in front of ConversationSession.
+
+- LRU of (session row, AgentState) keyed by conversation id; a hit skips the
+  DB read and the state rebuild. Clean entries unused for
+  SESSION_CACHE_IDLE_TTL seconds are re-read from the DB.
+- Each turn bumps the entry's version and marks it dirty. A background
+  flusher writes dirty entries once they've been dirty for
+  SESSION_CACHE_FLUSH_INTERVAL seconds, so rapid turns coalesce into one DB
+  write and no turn stays unwritten longer than that. Evicted and
+  process-exit entries are flushed synchronously.
+- Write-behind is only safe when the next turn of a conversation can see
+  this worker's unflushed one. So it's on only with SESSION_CACHE_STICKY_ROUTING
+  (a conversation keeps hitting the same worker) or SESSION_CACHE_BACKEND (a
+  Django cache alias shared by all workers: every turn also publishes its
+  version and state there, a worker that sees a newer version than its own
+  reloads from it, and a stale dirty entry is dropped instead of flushed).
+  Otherwise every turn is written through, and the cache only saves reads.
+- DB writes are compare-and-swap on ConversationSession.version
+  (session_store.save_state). A write based on a stale read is refused and
+  the entry dropped. Written through, the refusal reaches the chat endpoint,
+  which replays the turn on the fresh state; written behind, the turns were
+  already answered, so the loss is logged as an error (with the unsaved
+  messages) and counted in the "conflicts" stat.
+
+- A pinned conversation (pin/unpin, e.g. by an open WebSocket) is never
+  evicted or expired, so its turns never touch the DB until it's flushed.
+
+SESSION_CACHE_SIZE=0 disables the cache (every turn reads and writes the DB).
+
+Async views use aget/aput/aadd and aconversation_lock: a hit never leaves
+the event loop and a miss reads the DB with the async ORM; writes, and
+exchanges with a shared backend, run in a worker thread.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from agent.state import AgentState
+from api_layer.session_store import StaleSessionError, aload_state, dump_state, load_state, save_state
+from properties.models import ConversationSession
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionEntry:
+    __slots__ = ("session", "state", "version", "flushed_version", "dirty_since", "last_used", "lock")
+
+    def __init__(self, session: ConversationSession, state: AgentState, version: int = 0) -> None:
+        self.session = session
+        self.state = state
+        self.version = version
+        self.flushed_version = version
+        self.dirty_since: Optional[float] = None
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+
+class SessionCache:
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        backend: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True,
+    ) -> None:
+        # None -> read the setting on use, so tests can override it
+        self._maxsize = maxsize
+        self._flush_interval = flush_interval
+        self._backend = backend
+        self._clock = clock
+        self._background = background
+        self._entries: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._turn_locks: Dict[str, list] = {}  # key -> [lock, number of users]
+        self._pins: Dict[str, int] = {}  # key -> number of holders
+        self._flusher: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stats = {"hits": 0, "misses": 0, "shared_reloads": 0, "flushes": 0, "coalesced": 0, "dropped": 0, "conflicts": 0}
+
+    # ---------- config ----------
+
+    @property
+    def maxsize(self) -> int:
+        return settings.SESSION_CACHE_SIZE if self._maxsize is None else self._maxsize
+
+    @property
+    def flush_interval(self) -> float:
+        if self._flush_interval is not None:
+            return self._flush_interval
+        # Without sticky routing or a shared backend, a turn held back in this
+        # worker's memory is invisible to the worker that gets the next one
+        if not settings.SESSION_CACHE_STICKY_ROUTING and self.shared is None:
+            return 0.0
+        return settings.SESSION_CACHE_FLUSH_INTERVAL
+
+    @property
+    def idle_ttl(self) -> float:
+        return settings.SESSION_CACHE_IDLE_TTL
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    @property
+    def shared(self):
+        alias = settings.SESSION_CACHE_BACKEND if self._backend is None else self._backend
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _shared_key(conversation_id: str) -> str:
+        return f"conversation_state:{conversation_id}"
+
+    # ---------- read / write ----------
+
+    def get(self, conversation_id) -> Tuple[ConversationSession, AgentState]:
+        """
+        Returns (session, state) for a conversation; raises Http404 if it doesn't exist.
+
+        The state is a copy (nested models included) the caller may mutate
+        freely; hand the new state back with put(), which stores a copy too.
+        """
+        key = str(conversation_id)
+        if not self.enabled:
+            session = get_object_or_404(ConversationSession, pk=conversation_id)
+            return session, load_state(session)
+
+        shared = self._read_shared(key)
+        now = self._clock()
+        entry = self._lookup(key, now)
+
+        if entry is not None and (shared is None or shared["version"] <= entry.version):
+            self._count("hits")
+        elif entry is not None:
+            # another worker has moved this conversation on
+            with entry.lock:
+                self._adopt_shared(entry, shared)
+        else:
+            self._count("misses")
+            session = get_object_or_404(ConversationSession, pk=conversation_id)
+            if shared is not None:
+                entry = SessionEntry(session, AgentState(), shared["version"])
+                self._adopt_shared(entry, shared)
+            else:
+                entry = SessionEntry(session, load_state(session))
+            entry.last_used = now
+            self._insert(key, entry)
+
+        with entry.lock:
+            return entry.session, self._copy(entry.state)
+
+    async def aget(self, conversation_id) -> Tuple[ConversationSession, AgentState]:
+        """
+        get() for async views.
+        """
+        key = str(conversation_id)
+        if self.enabled and self.shared is not None:
+            return await sync_to_async(self.get)(conversation_id)
+
+        now = self._clock()
+        entry = self._lookup(key, now) if self.enabled else None
+        if entry is not None:
+            self._count("hits")
+            # entry.state is only ever replaced (by put) and callers get
+            # copies, so no lock is needed (a flush may be holding it while it
+            # writes to the DB)
+            return entry.session, self._copy(entry.state)
+
+        try:
+            session = await ConversationSession.objects.aget(pk=conversation_id)
+        except ConversationSession.DoesNotExist:
+            raise Http404("No ConversationSession matches the given query.")
+        state = await aload_state(session)
+        if not self.enabled:
+            return session, state
+
+        self._count("misses")
+        entry = SessionEntry(session, state)
+        entry.last_used = now
+        await self._ainsert(key, entry)
+        return session, self._copy(state)
+
+    def put(
+        self,
+        session: ConversationSession,
+        state: AgentState,
+        dumped: Optional[Dict[str, Any]] = None,
+        write_through: bool = False,
+    ) -> None:
+        """
+        Records the state after a turn. It reaches the DB within flush_interval
+        (immediately when the interval is 0, the cache is disabled or
+        `write_through` is set).
+
+        Immediate writes raise StaleSessionError when another worker saved the
+        conversation first; the caller can then retry the turn on fresh state.
+        """
+        if not self.enabled:
+            save_state(session, state, dumped)
+            return
+
+        key = str(session.id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # evicted since get(): continue from the last published version
+            shared = self._read_shared(key)
+            entry = SessionEntry(session, self._copy(state), shared["version"] if shared else 0)
+            self._insert(key, entry)
+
+        with entry.lock:
+            if entry.dirty:
+                self._count("coalesced")
+            entry.state = self._copy(state)
+            entry.version += 1
+            if entry.dirty_since is None:
+                entry.dirty_since = self._clock()
+            version = entry.version
+
+        shared = self.shared
+        if shared is not None:
+            shared.set(self._shared_key(key), {"version": version, "state": dumped or dump_state(state)})
+
+        if write_through or self.flush_interval <= 0:
+            self._flush_entry(key, entry, raise_stale=True)
+        else:
+            self._ensure_flusher()
+
+    async def aput(self, session: ConversationSession, state: AgentState, dumped: Optional[Dict[str, Any]] = None) -> None:
+        """
+        put() for async views.
+        """
+        await sync_to_async(self.put)(session, state, dumped)
+
+    def invalidate(self, conversation_id) -> None:
+        """
+        Forgets a conversation without writing it (the next get() reads the DB).
+        """
+        with self._lock:
+            self._entries.pop(str(conversation_id), None)
+
+    @contextmanager
+    def conversation_lock(self, conversation_id) -> Iterator[None]:
+        """
+        Serializes turns of one conversation within this process, so they are
+        applied in arrival order without compare-and-swap retries.
+        """
+        key = str(conversation_id)
+        slot = self._turn_slot(key)
+        try:
+            with slot[0]:
+                yield
+        finally:
+            self._release_turn_slot(key, slot)
+
+    @asynccontextmanager
+    async def aconversation_lock(self, conversation_id, poll: float = 0.01) -> AsyncIterator[None]:
+        """
+        conversation_lock() for async views. Shares the same locks; a turn
+        waiting for one polls instead of blocking the event loop.
+        """
+        key = str(conversation_id)
+        slot = self._turn_slot(key)
+        try:
+            while not slot[0].acquire(blocking=False):
+                await asyncio.sleep(poll)
+            try:
+                yield
+            finally:
+                slot[0].release()
+        finally:
+            self._release_turn_slot(key, slot)
+
+    def _turn_slot(self, key: str) -> list:
+        with self._lock:
+            slot = self._turn_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        return slot
+
+    def _release_turn_slot(self, key: str, slot: list) -> None:
+        with self._lock:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._turn_locks[key]
+
+    def add(self, session: ConversationSession, state: AgentState) -> None:
+        """
+        Caches a conversation that was just written to the DB (e.g. a new one).
+        """
+        if self.enabled:
+            entry = SessionEntry(session, self._copy(state))
+            entry.last_used = self._clock()
+            self._insert(str(session.id), entry)
+
+    async def aadd(self, session: ConversationSession, state: AgentState) -> None:
+        """
+        add() for async views.
+        """
+        if self.enabled:
+            entry = SessionEntry(session, self._copy(state))
+            entry.last_used = self._clock()
+            await self._ainsert(str(session.id), entry)
+
+    def pin(self, conversation_id) -> None:
+        """
+        Keeps a conversation cached until unpin(): it is neither evicted nor
+        expired while idle (e.g. for the life of a WebSocket connection).
+        """
+        key = str(conversation_id)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, conversation_id) -> None:
+        key = str(conversation_id)
+        with self._lock:
+            if self._pins.get(key, 0) > 1:
+                self._pins[key] -= 1
+            else:
+                self._pins.pop(key, None)
+
+    # ---------- flushing ----------
+
+    def flush(self, conversation_id=None) -> int:
+        """
+        Writes dirty entries now – one conversation, or all of them.
+        Returns the number of DB writes.
+        """
+        with self._lock:
+            if conversation_id is not None:
+                key = str(conversation_id)
+                items = [(key, self._entries[key])] if key in self._entries else []
+            else:
+                items = list(self._entries.items())
+        return sum(self._flush_entry(key, entry) for key, entry in items)
+
+    async def aflush(self, conversation_id) -> int:
+        """
+        flush() of one conversation for async views; free when it's clean.
+        """
+        with self._lock:
+            entry = self._entries.get(str(conversation_id))
+        if entry is None or not entry.dirty:
+            return 0
+        return await sync_to_async(self.flush)(conversation_id)
+
+    def flush_due(self) -> int:
+        """
+        Writes the entries that have been dirty for at least flush_interval.
+        """
+        deadline = self._clock() - self.flush_interval
+        with self._lock:
+            items = [
+                (key, e) for key, e in self._entries.items()
+                if e.dirty_since is not None and e.dirty_since <= deadline
+            ]
+        return sum(self._flush_entry(key, entry) for key, entry in items)
+
+    def _flush_entry(self, key: str, entry: SessionEntry, raise_stale: bool = False) -> int:
+        with entry.lock:
+            if not entry.dirty:
+                return 0
+
+            shared = self._read_shared(key)
+            if shared is not None and shared["version"] > entry.version:
+                # a newer state was written by another worker; it includes ours
+                self._drop(key, entry)
+                return 0
+
+            try:
+                save_state(entry.session, entry.state)
+            except StaleSessionError:
+                # another worker wrote this conversation; the DB copy wins
+                self._drop(key, entry)
+                if raise_stale:
+                    raise
+                # the turns were already answered, so they're lost: report them
+                self._count("conflicts")
+                unsaved = entry.state.messages[entry.session.message_count - entry.session.history_offset:]
+                logger.error(
+                    "conversation %s changed elsewhere, %d answered message(s) not saved",
+                    key,
+                    len(unsaved),
+                    extra={"conversation_id": key, "unsaved_messages": unsaved},
+                )
+                return 0
+
+            entry.flushed_version = entry.version
+            entry.dirty_since = None
+            self._count("flushes")
+            return 1
+
+    def _ensure_flusher(self) -> None:
+        if not self._background or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._wakeup.wait(max(self.flush_interval / 2, 0.05)):
+            try:
+                self.flush_due()
+            except Exception:
+                logger.exception("session flush failed")
+            finally:
+                close_old_connections()
+
+    # ---------- helpers ----------
+
+    def _lookup(self, key: str, now: float) -> Optional[SessionEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (
+                entry is not None and not entry.dirty and key not in self._pins
+                and now - entry.last_used > self.idle_ttl
+            ):
+                # idle for long: the row may have been compacted or archived since
+                del self._entries[key]
+                return None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.last_used = now
+            return entry
+
+    def _insert(self, key: str, entry: SessionEntry) -> None:
+        self._flush_evicted(self._push(key, entry))
+
+    async def _ainsert(self, key: str, entry: SessionEntry) -> None:
+        evicted = self._push(key, entry)
+        if evicted:
+            await sync_to_async(self._flush_evicted)(evicted)
+
+    def _push(self, key: str, entry: SessionEntry) -> List[Tuple[str, SessionEntry]]:
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                # least recently used first; pinned entries are passed over
+                victim = next((k for k in self._entries if k not in self._pins), None)
+                if victim is None:
+                    break
+                evicted.append((victim, self._entries.pop(victim)))
+        return evicted
+
+    def _flush_evicted(self, evicted: List[Tuple[str, SessionEntry]]) -> None:
+        for old_key, old_entry in evicted:
+            self._flush_entry(old_key, old_entry)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _drop(self, key: str, entry: SessionEntry) -> None:
+        self._count("dropped")
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def _read_shared(self, key: str) -> Optional[dict]:
+        shared = self.shared
+        return shared.get(self._shared_key(key)) if shared is not None else None
+
+    def _adopt_shared(self, entry: SessionEntry, shared: dict) -> None:
+        self._count("shared_reloads")
+        entry.state = AgentState(**shared["state"])
+        entry.version = entry.flushed_version = shared["version"]
+        entry.dirty_since = None
+        # our row's message_count may lag behind what the other worker stored
+        entry.session.refresh_from_db(fields=["message_count", "history_offset", "version"])
+
+    @staticmethod
+    def _copy(state: AgentState) -> AgentState:
+        # graph nodes mutate the nested models in place (e.g. the intent node
+        # sets buyer_profile.city): a turn must never touch the cached entry.
+        # Message dicts are only ever appended, so the list is copied shallowly.
+        return state.model_copy(update={
+            "messages": list(state.messages),
+            "buyer_profile": state.buyer_profile.model_copy(),
+            "lead_info": state.lead_info.model_copy(),
+            "candidate_projects": [p.model_copy() for p in state.candidate_projects],
+        })
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        """
+        Flushes everything and empties the cache.
+        """
+        self.flush()
+        with self._lock:
+            self._entries.clear()
+            for k in self._stats:
+                self._stats[k] = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+session_cache = SessionCache()
+atexit.register(session_cache.flush)
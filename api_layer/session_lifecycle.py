@@ -0,0 +1,278 @@
+"""
+Housekeeping for ConversationSession (run by `python manage.py session_lifecycle`).
+
+Every step works in small batches, each in its own short transaction, with a
+pause in between, so live chat turns are never blocked for long. Updates are
+compare-and-swap on ConversationSession.version: a session that receives a
+turn meanwhile is simply skipped.
+
+1. archive_idle_sessions  – sessions idle past the TTL move to
+                             ConversationArchive (compressed) and are deleted
+                             with their messages and graph checkpoints
+2. compact_idle_sessions  – for sessions idle a while: long histories are
+                             folded into a summary message, legacy shortlist
+                             snapshots become ids, the state is re-encoded
+                             with the current codec
+3. purge_idempotency_keys – stored chat responses past their TTL are
+                             deleted (api_layer/idempotency.py)
+4. reclaim_space          – SQLite incremental vacuum (or a one-off full
+                             VACUUM), VACUUM ANALYZE on PostgreSQL
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import ormsgpack
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from agent.models import GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite
+from api_layer import state_codec
+from api_layer.session_store import stored_state
+from properties.models import ChatIdempotencyKey, ConversationArchive, ConversationMessage, ConversationSession, Project
+
+
+SUMMARY_ROLE = "system"
+SUMMARY_USER_LINES = 20
+SUMMARY_LINE_CHARS = 160
+
+
+def _batches(qs, batch_size: int, pause: float) -> Iterator[List[ConversationSession]]:
+    """
+    Walks a queryset in primary-key order, `batch_size` rows at a time.
+    """
+    last_pk = None
+    while True:
+        page = qs.order_by("pk")
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+        if pause:
+            time.sleep(pause)
+
+
+def _messages_by_session(sessions) -> Dict[str, List[dict]]:
+    messages = defaultdict(list)
+    rows = (
+        ConversationMessage.objects.filter(session__in=sessions)
+        .order_by("session_id", "seq")
+        .values_list("session_id", "seq", "role", "content")
+    )
+    for session_id, seq, role, content in rows:
+        messages[session_id].append({"seq": seq, "role": role, "content": content})
+    return messages
+
+
+def _unchanged(sessions) -> Q:
+    match = Q(pk__in=[])
+    for s in sessions:
+        match |= Q(pk=s.pk, version=s.version)
+    return match
+
+
+def archive_idle_sessions(cutoff: datetime, batch_size: int = 200, pause: float = 0.05) -> int:
+    """
+    Moves sessions last active before `cutoff` into ConversationArchive.
+    Returns the number archived.
+    """
+    archived = 0
+    qs = ConversationSession.objects.filter(updated_at__lt=cutoff)
+    for batch in _batches(qs, batch_size, pause):
+        messages = _messages_by_session(batch)
+        archives = [
+            ConversationArchive(
+                id=s.id,
+                lead_id=s.lead_id,
+                message_count=s.message_count,
+                payload=state_codec.compress(ormsgpack.packb({
+                    "state": stored_state(s),
+                    "history_offset": s.history_offset,
+                    "messages": [{"role": m["role"], "content": m["content"]} for m in messages[s.id]],
+                })),
+                created_at=s.created_at,
+                last_active_at=s.updated_at,
+            )
+            for s in batch
+        ]
+        ids = [s.id for s in batch]
+
+        with transaction.atomic():
+            ConversationArchive.objects.bulk_create(archives, ignore_conflicts=True)
+            ConversationSession.objects.filter(_unchanged(batch)).delete()
+            # sessions that got a turn meanwhile stay live
+            still_live = ConversationSession.objects.filter(pk__in=ids).values_list("pk", flat=True)
+            ConversationArchive.objects.filter(pk__in=list(still_live)).delete()
+            gone = set(ids) - set(still_live)
+            gone_threads = [str(pk) for pk in gone]
+            for model in (GraphCheckpoint, GraphCheckpointBlob, GraphCheckpointWrite):
+                model.objects.filter(thread_id__in=gone_threads).delete()
+
+        archived += len(gone)
+    return archived
+
+
+def summarize_messages(messages: List[dict]) -> str:
+    """
+    Deterministic stand-in for folded messages: what the buyer asked, most
+    recent last. An earlier summary is carried over.
+    """
+    lines = [f"Summary of {len(messages)} earlier messages."]
+    if messages and messages[0]["role"] == SUMMARY_ROLE:
+        lines.append(messages[0]["content"][: SUMMARY_LINE_CHARS * 2])
+    asked = [m["content"] for m in messages if m["role"] == "user" and m["content"]]
+    if asked:
+        lines.append("The buyer said:")
+        for content in asked[-SUMMARY_USER_LINES:]:
+            text = " ".join(content.split())
+            lines.append("- " + (text if len(text) <= SUMMARY_LINE_CHARS else text[: SUMMARY_LINE_CHARS - 1] + "…"))
+    return "\n".join(lines)
+
+
+def _compact_state(data: dict) -> dict:
+    # legacy rows kept whole ProjectSummary snapshots
+    snapshots = data.pop("candidate_projects", None)
+    if snapshots is not None:
+        data["candidate_project_ids"] = [p["id"] for p in snapshots if p.get("id") is not None]
+    ids = data.get("candidate_project_ids") or []
+    if ids:
+        existing = set(Project.objects.filter(id__in=ids).values_list("id", flat=True))
+        data["candidate_project_ids"] = [pk for pk in ids if pk in existing]
+    return data
+
+
+def compact_idle_sessions(
+    cutoff: datetime,
+    max_messages: int,
+    keep_messages: int,
+    batch_size: int = 200,
+    pause: float = 0.05,
+) -> Dict[str, int]:
+    """
+    Compacts sessions last active before `cutoff` that store more than
+    `max_messages` messages or use an outdated codec.
+    """
+    counts = {"sessions": 0, "folded_messages": 0}
+    keep_messages = max(keep_messages, 1)
+    qs = ConversationSession.objects.filter(updated_at__lt=cutoff).filter(
+        Q(message_count__gt=F("history_offset") + max_messages)
+        | ~Q(state_codec=settings.SESSION_STATE_CODEC)
+    )
+    for batch in _batches(qs, batch_size, pause):
+        messages = _messages_by_session(batch)
+        with transaction.atomic():
+            for s in batch:
+                rows = messages[s.id]
+                folded = rows[:-keep_messages] if len(rows) > max_messages else []
+
+                data = _compact_state(stored_state(s))
+                codec, blob = state_codec.encode(data)
+                updated = ConversationSession.objects.filter(pk=s.pk, version=s.version).update(
+                    state=data if blob is None else {},
+                    state_codec=codec,
+                    state_blob=blob,
+                    history_offset=s.history_offset + max(len(folded) - 1, 0),
+                    version=F("version") + 1,
+                )
+                if not updated:
+                    continue  # got a turn meanwhile
+
+                if folded:
+                    # the last folded row becomes the summary; seqs stay unique
+                    summary = folded[-1]
+                    ConversationMessage.objects.filter(
+                        session=s, seq__in=[m["seq"] for m in folded[:-1]]
+                    ).delete()
+                    ConversationMessage.objects.filter(session=s, seq=summary["seq"]).update(
+                        role=SUMMARY_ROLE, content=summarize_messages(folded)
+                    )
+                    counts["folded_messages"] += len(folded)
+                counts["sessions"] += 1
+    return counts
+
+
+def purge_idempotency_keys(cutoff: datetime, batch_size: int = 200, pause: float = 0.05) -> int:
+    """
+    Deletes Idempotency-Key records completed before `cutoff`.
+    Returns the number deleted.
+    """
+    purged = 0
+    qs = ChatIdempotencyKey.objects.filter(completed_at__lt=cutoff)
+    while True:
+        pks = list(qs.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return purged
+        purged += ChatIdempotencyKey.objects.filter(pk__in=pks).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+def reclaim_space(mode: str = "incremental", pages: int = 1000) -> str:
+    """
+    Returns freed pages to the OS.
+
+    - SQLite, "incremental": `PRAGMA incremental_vacuum` of at most `pages`
+      pages – short, safe next to live traffic. Needs auto_vacuum=INCREMENTAL,
+      which "full" switches on (a one-off, blocking VACUUM).
+    - PostgreSQL: VACUUM (ANALYZE) of the conversation tables (non-blocking).
+    """
+    if mode == "none":
+        return "skipped"
+
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == "sqlite":
+            if mode == "full":
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+                return "full VACUUM done; auto_vacuum is now INCREMENTAL"
+            cursor.execute("PRAGMA auto_vacuum")
+            if cursor.fetchone()[0] != 2:
+                return "auto_vacuum is not INCREMENTAL; run once with --vacuum full"
+            cursor.execute("PRAGMA freelist_count")
+            free_before = cursor.fetchone()[0]
+            # through execute() Python's sqlite3 frees a single page per call;
+            # executescript runs the pragma to completion
+            connection.connection.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            cursor.execute("PRAGMA freelist_count")
+            return f"reclaimed {free_before - cursor.fetchone()[0]} pages"
+
+        if vendor == "postgresql":
+            for model in (ConversationSession, ConversationMessage, ConversationArchive):
+                cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(model._meta.db_table)}")
+            return "VACUUM (ANALYZE) done"
+
+    return f"nothing to do for {vendor}"
+
+
+def run_lifecycle(
+    ttl_days: int,
+    compact_idle_hours: int,
+    max_messages: int,
+    keep_messages: int,
+    batch_size: int = 200,
+    pause: float = 0.05,
+    vacuum: str = "incremental",
+    vacuum_pages: int = 1000,
+    idempotency_ttl_hours: Optional[int] = None,
+) -> Dict[str, object]:
+    if idempotency_ttl_hours is None:
+        idempotency_ttl_hours = settings.IDEMPOTENCY_KEY_TTL_HOURS
+    now = timezone.now()
+    archived = archive_idle_sessions(now - timedelta(days=ttl_days), batch_size, pause)
+    compacted = compact_idle_sessions(
+        now - timedelta(hours=compact_idle_hours), max_messages, keep_messages, batch_size, pause
+    )
+    return {
+        "archived": archived,
+        "compacted": compacted["sessions"],
+        "folded_messages": compacted["folded_messages"],
+        "idempotency_keys": purge_idempotency_keys(now - timedelta(hours=idempotency_ttl_hours), batch_size, pause),
+        "vacuum": reclaim_space(vacuum, vacuum_pages),
+    }
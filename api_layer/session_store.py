@@ -0,0 +1,221 @@
+"""
+Persistence of AgentState for a ConversationSession.
+
+- Chat history is append-only: each turn INSERTs only its new messages
+  into ConversationMessage (indexed by session + seq).
+- The session row keeps the compact working state: buyer profile,
+  shortlisted project ids, selection, lead info, intent/stage, and the
+  number of messages already stored, encoded with the configured codec
+  (api_layer/state_codec.py).
+
+The a* variants are for async views: reads use the async ORM, writes (which
+need a transaction, not available to async code in Django 4.2) run in a
+worker thread.
+"""
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from properties.models import ConversationMessage, ConversationSession
+from agent.state import AgentState, ProjectSummary
+from agent.tools.t2sql_tool import project_sql_tool
+from api_layer import state_codec
+
+
+def dump_state(state: AgentState) -> Dict[str, Any]:
+    """
+    JSON-ready dump of the full state. A chat turn calls this once and reuses
+    the result for storage (compact_state) and for the API response.
+    """
+    return state.model_dump(mode="json")
+
+
+class StaleSessionError(Exception):
+    """
+    The conversation was written by someone else since it was read.
+    """
+
+    def __init__(self, conversation_id) -> None:
+        super().__init__(f"Conversation {conversation_id} was updated concurrently")
+        self.conversation_id = conversation_id
+
+
+def client_state(dumped: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The part of a dumped state that delta responses patch: messages and the
+    shortlist are sent separately.
+    """
+    return {k: v for k, v in dumped.items() if k not in ("messages", "candidate_projects")}
+
+
+def compact_state(state: AgentState, dumped: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The state stored on the session row: everything except the message
+    history, with the shortlist reduced to project ids.
+    """
+    if dumped is None:
+        data = state.model_dump(mode="json", exclude={"messages", "candidate_projects"})
+    else:
+        data = client_state(dumped)
+    data["candidate_project_ids"] = [p.id for p in state.candidate_projects]
+    return data
+
+
+def stored_client_state(session: ConversationSession) -> Dict[str, Any]:
+    """
+    client_state() of a session row, without loading its messages or shortlist.
+    """
+    data = stored_state(session)
+    for key in ("messages", "candidate_projects", "candidate_project_ids"):
+        data.pop(key, None)
+    return client_state(AgentState(**data).model_dump(mode="json"))
+
+
+def stored_state(session: ConversationSession) -> Dict[str, Any]:
+    """
+    The compact state dict of a session row, whatever codec it was written with.
+    """
+    return state_codec.decode(session.state_codec, session.state, session.state_blob)
+
+
+def load_state(session: ConversationSession) -> AgentState:
+    """
+    Rebuilds the full AgentState from the session row and its message rows.
+    """
+    data = stored_state(session)
+
+    # Rows written before the message table existed still carry the full blob
+    messages = data.pop("messages", None)
+    if messages is None:
+        messages = list(session.messages.order_by("seq").values("role", "content"))
+
+    state, candidate_ids = _build_state(data, messages)
+    if candidate_ids is not None:
+        state.candidate_projects = project_sql_tool.summaries_for_ids(candidate_ids, state.buyer_profile)
+    return state
+
+
+async def aload_state(session: ConversationSession) -> AgentState:
+    """
+    load_state() with the async ORM.
+    """
+    data = stored_state(session)
+
+    messages = data.pop("messages", None)
+    if messages is None:
+        messages = [m async for m in session.messages.order_by("seq").values("role", "content")]
+
+    state, candidate_ids = _build_state(data, messages)
+    if candidate_ids:
+        state.candidate_projects = await sync_to_async(project_sql_tool.summaries_for_ids)(
+            candidate_ids, state.buyer_profile
+        )
+    return state
+
+
+def _build_state(data: Dict[str, Any], messages: List[dict]):
+    """
+    AgentState from a stored state dict; also returns the shortlisted ids
+    still to be rebuilt (None when the row kept whole snapshots).
+    """
+    candidates = data.pop("candidate_projects", None)
+    candidate_ids = data.pop("candidate_project_ids", None) or []
+
+    state = AgentState(**data, messages=messages)
+    if candidates is not None:
+        state.candidate_projects = [ProjectSummary(**c) for c in candidates]
+        return state, None
+    return state, candidate_ids
+
+
+def save_state(
+    session: ConversationSession,
+    state: AgentState,
+    dumped: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Appends the messages added since the last save and updates the compact state.
+    Pass `dumped` (from dump_state) when the caller already serialized the state.
+
+    Messages are never rewritten: everything before session.message_count is
+    assumed to be stored already. (After history compaction, state.messages
+    starts with a summary standing in for session.history_offset + 1 messages.)
+
+    The write is a compare-and-swap on session.version: if another worker
+    saved this conversation since `session` was read, nothing is written and
+    StaleSessionError is raised.
+    """
+    start = session.message_count
+    new_messages = state.messages[start - session.history_offset:]
+
+    data = compact_state(state, dumped)
+    codec, blob = state_codec.encode(data)
+    stored = data if blob is None else {}
+
+    try:
+        with transaction.atomic():
+            if new_messages:
+                ConversationMessage.objects.bulk_create([
+                    ConversationMessage(
+                        session=session,
+                        seq=start + offset,
+                        role=m.get("role", ""),
+                        content=m.get("content") or "",
+                    )
+                    for offset, m in enumerate(new_messages)
+                ])
+
+            updated = ConversationSession.objects.filter(pk=session.pk, version=session.version).update(
+                state=stored,
+                state_codec=codec,
+                state_blob=blob,
+                message_count=start + len(new_messages),
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                raise StaleSessionError(session.pk)
+    except IntegrityError as e:
+        # the message seqs were taken by another worker's write
+        raise StaleSessionError(session.pk) from e
+
+    session.state, session.state_codec, session.state_blob = stored, codec, blob
+    session.message_count = start + len(new_messages)
+    session.version += 1
+
+
+async def asave_state(
+    session: ConversationSession,
+    state: AgentState,
+    dumped: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    save_state() for async views (in a worker thread: it's one transaction).
+    """
+    await sync_to_async(save_state)(session, state, dumped)
+
+
+def create_session(state: AgentState) -> ConversationSession:
+    """
+    Creates a ConversationSession for a fresh state (conversation_id is filled in).
+    """
+    with transaction.atomic():
+        session = ConversationSession.objects.create(state={})
+        state.conversation_id = session.id
+        save_state(session, state)
+    return session
+
+
+async def acreate_session(state: AgentState) -> ConversationSession:
+    """
+    create_session() with the async ORM. The row and the first messages are
+    two writes, not one transaction: a failed save leaves an empty session
+    behind, which the lifecycle job archives once it expires.
+    """
+    session = await ConversationSession.objects.acreate(state={})
+    state.conversation_id = session.id
+    await asave_state(session, state)
+    return session
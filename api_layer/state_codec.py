@@ -0,0 +1,123 @@
+"""
+Pluggable encoding of the compact state stored on ConversationSession.
+
+Codecs (ConversationSession.state_codec):
+- "json"          -> plain JSONField `state` (rows written before codecs existed)
+- "msgpack"       -> ormsgpack bytes in `state_blob`
+- "msgpack+zstd"  -> msgpack compressed with zstd; when a trained dictionary
+                     is available the frame records its id, so rows written
+                     with an older dictionary still decode after retraining.
+
+Dictionaries are trained with `python manage.py train_state_dictionary` and
+kept as `state-<dict_id>.zdict` in SESSION_STATE_ZSTD_DICT_DIR.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import ormsgpack
+import zstandard
+from django.conf import settings
+
+
+CODECS = ("json", "msgpack", "msgpack+zstd")
+ZSTD_LEVEL = 3
+
+
+def dictionary_path(dict_id: int) -> Path:
+    return Path(settings.SESSION_STATE_ZSTD_DICT_DIR) / f"state-{dict_id}.zdict"
+
+
+@lru_cache(maxsize=1)
+def load_dictionaries() -> Tuple[Optional[zstandard.ZstdCompressionDict], Dict[int, zstandard.ZstdCompressionDict]]:
+    """
+    Returns (active dictionary or None, {dict_id: dictionary}).
+
+    Every dictionary in the directory is kept for decoding; the most recently
+    written one is used for encoding.
+    """
+    if not settings.SESSION_STATE_ZSTD_DICT_DIR:
+        return None, {}
+    paths = sorted(
+        Path(settings.SESSION_STATE_ZSTD_DICT_DIR).glob("state-*.zdict"),
+        key=lambda p: p.stat().st_mtime,
+    )
+    by_id: Dict[int, zstandard.ZstdCompressionDict] = {}
+    active = None
+    for path in paths:
+        active = zstandard.ZstdCompressionDict(path.read_bytes())
+        by_id[active.dict_id()] = active
+    if active is not None:
+        # compressors are created per call (they aren't thread-safe); this keeps that cheap
+        active.precompute_compress(level=ZSTD_LEVEL)
+    return active, by_id
+
+
+def train_dictionary(samples: Iterable[Dict[str, Any]], dict_size: int = 16 * 1024) -> zstandard.ZstdCompressionDict:
+    """
+    Trains a zstd dictionary on msgpack-encoded sample states.
+    """
+    return zstandard.train_dictionary(dict_size, [ormsgpack.packb(s) for s in samples])
+
+
+def save_dictionary(dictionary: zstandard.ZstdCompressionDict) -> Path:
+    """
+    Writes a dictionary to SESSION_STATE_ZSTD_DICT_DIR and makes it the active one.
+    """
+    if not settings.SESSION_STATE_ZSTD_DICT_DIR:
+        raise ValueError("SESSION_STATE_ZSTD_DICT_DIR is not set")
+    path = dictionary_path(dictionary.dict_id())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dictionary.as_bytes())
+    load_dictionaries.cache_clear()
+    return path
+
+
+def compress(payload: bytes, dictionary: Optional[zstandard.ZstdCompressionDict] = None) -> bytes:
+    if dictionary is None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary).compress(payload)
+
+
+def decompress(payload: bytes) -> bytes:
+    dict_id = zstandard.get_frame_parameters(payload).dict_id
+    if not dict_id:
+        return zstandard.ZstdDecompressor().decompress(payload)
+    dictionary = load_dictionaries()[1].get(dict_id)
+    if dictionary is None:
+        # trained by another process since this one loaded the directory
+        load_dictionaries.cache_clear()
+        dictionary = load_dictionaries()[1].get(dict_id)
+    if dictionary is None:
+        raise ValueError(f"zstd dictionary {dict_id} not found in SESSION_STATE_ZSTD_DICT_DIR")
+    return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(payload)
+
+
+def encode(data: Dict[str, Any], codec: Optional[str] = None) -> Tuple[str, Optional[bytes]]:
+    """
+    Encodes a compact state dict. Returns (codec, blob); blob is None for "json".
+    """
+    codec = codec or settings.SESSION_STATE_CODEC
+    if codec == "json":
+        return codec, None
+    if codec not in CODECS:
+        raise ValueError(f"Unknown state codec: {codec}")
+
+    payload = ormsgpack.packb(data)
+    if codec == "msgpack+zstd":
+        payload = compress(payload, load_dictionaries()[0])
+    return codec, payload
+
+
+def decode(codec: str, state: Optional[Dict[str, Any]], blob: Optional[bytes]) -> Dict[str, Any]:
+    """
+    Decodes whatever a session row holds back into the compact state dict.
+    """
+    if codec == "json" or not blob:
+        return dict(state or {})
+    payload = bytes(blob)
+    if codec == "msgpack+zstd":
+        payload = decompress(payload)
+    elif codec != "msgpack":
+        raise ValueError(f"Unknown state codec: {codec}")
+    return ormsgpack.unpackb(payload)
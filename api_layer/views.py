@@ -1,3 +1,64 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from agent.metrics import REGISTRY, Gauge
+from agent.tools.web_search_tool import web_search_tool
+from api_layer.admission import turn_admission
+from api_layer.profiling import profile_store
+from api_layer.session_cache import session_cache
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TURN_ADMISSION = Gauge("chat_turn_admission", "Chat turn admission counters and current load", ["stat"])
+SESSION_CACHE = Gauge("session_cache", "Session cache counters and size", ["stat"])
+WEB_SEARCH = Gauge("web_search", "Web search tool counters", ["stat"])
+
+
+def _collect_stats() -> None:
+    for gauge, stats in (
+        (TURN_ADMISSION, turn_admission.stats()),
+        (SESSION_CACHE, session_cache.stats()),
+        (WEB_SEARCH, web_search_tool.stats()),
+    ):
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                gauge.set(value, stat=stat)
+
+
+REGISTRY.add_collector(_collect_stats)
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, it requires
+    `Authorization: Bearer <token>`.
+    """
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@require_GET
+@staff_member_required
+def profiles(request):
+    """
+    The stored profiling reports of chat turns, newest first (summaries).
+    """
+    return JsonResponse({"profiles": profile_store.summaries()})
+
+
+@require_GET
+@staff_member_required
+def profile_detail(request, profile_id: str):
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise Http404("No such profile")
+    return JsonResponse(report)
@@ -0,0 +1,154 @@
+"""
+WebSocket chat: ws[s]://<host>/ws/conversations/<conversation_id>
+
+An alternative to POST /api/agents/chat for a browser tab that stays open.
+For the life of the connection the conversation is pinned in the session
+cache: every turn starts from the in-memory AgentState, and turns are saved
+as the cache saves them (write-behind, SESSION_CACHE_FLUSH_INTERVAL after the
+last one, when routing is sticky or the cache is shared) and at disconnect. A reconnect, on any worker, starts from the DB.
+
+Client -> server, one turn per frame (turns run one at a time):
+
+    {"message": "2BHK in Dubai under 300k"}
+
+Server -> client:
+
+    {"type": "ready", "conversation_id": ..., "agent_state": {...}, "shortlisted_projects": [...]}
+    {"type": "token", "text": "Off-plan"}     # streamed free-form replies only
+    {"type": "turn", ...}                      # a "delta" chat response
+    {"type": "error", "status": 429, "detail": ..., "retry_after": 5}
+
+The socket closes with code 4404 when the conversation doesn't exist.
+Turns go through the same path as the REST endpoint (chat_turn): the
+conversation lock, admission control and compare-and-swap saves.
+"""
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+import orjson
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import close_old_connections
+from django.http import Http404
+from ninja.errors import HttpError
+from pydantic import ValidationError
+
+from agent.llm_client import reply_tokens
+from agent.rate_limit import RateLimitTimeout
+from api_layer.admission import TurnQueueFull
+from api_layer.endpoints.chat import chat_turn, to_project_items
+from api_layer.renderers import dumps
+from api_layer.schemas import ChatRequest
+from api_layer.session_cache import session_cache
+from api_layer.session_store import client_state, dump_state
+
+
+logger = logging.getLogger(__name__)
+
+PATH = re.compile(r"^/ws/conversations/(?P<conversation_id>[0-9a-fA-F-]{32,36})/?$")
+CLOSE_NOT_FOUND = 4404
+_DONE = object()
+
+
+async def send_event(send, event: Dict[str, Any]) -> None:
+    await send({"type": "websocket.send", "text": dumps(event).decode()})
+
+
+def error_event(status: int, detail: str, retry_after: Optional[float] = None) -> Dict[str, Any]:
+    event = {"type": "error", "status": status, "detail": detail}
+    if retry_after is not None:
+        event["retry_after"] = retry_after
+    return event
+
+
+async def chat_socket(scope, receive, send) -> None:
+    """
+    ASGI application for the WebSocket chat.
+    """
+    # like an HTTP request: sync ORM calls get a thread of their own
+    async with ThreadSensitiveContext():
+        try:
+            await _serve(scope, receive, send)
+        finally:
+            await sync_to_async(close_old_connections)()
+
+
+async def _serve(scope, receive, send) -> None:
+    if (await receive())["type"] != "websocket.connect":
+        return
+
+    session = state = None
+    match = PATH.match(scope["path"])
+    try:
+        if match:
+            conversation_id = UUID(match["conversation_id"])
+            session, state = await session_cache.aget(conversation_id)
+    except (ValueError, Http404):
+        pass
+    if session is None:
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+
+    await send({"type": "websocket.accept"})
+    session_cache.pin(conversation_id)
+    try:
+        await send_event(send, {
+            "type": "ready",
+            "conversation_id": str(session.id),
+            "agent_state": client_state(dump_state(state)),
+            "shortlisted_projects": [p.model_dump() for p in to_project_items(state.candidate_projects)],
+        })
+        while True:
+            event = await receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            if event["type"] == "websocket.receive":
+                if not await _turn(conversation_id, event, send):
+                    await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+                    break
+    finally:
+        session_cache.unpin(conversation_id)
+        await session_cache.aflush(conversation_id)
+
+
+async def _turn(conversation_id: UUID, event: Dict[str, Any], send) -> bool:
+    """
+    Runs one turn, streaming its reply tokens. False if the conversation is gone.
+    """
+    try:
+        data = orjson.loads(event.get("text") or event.get("bytes") or b"")
+        payload = ChatRequest(conversation_id=conversation_id, message=data["message"], response_mode="delta")
+    except (orjson.JSONDecodeError, TypeError, KeyError, ValidationError):
+        await send_event(send, error_event(400, 'Expected {"message": "..."}.'))
+        return True
+
+    # tokens arrive on the graph's worker thread; a task sends them in order
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    async def forward_tokens() -> None:
+        while (token := await tokens.get()) is not _DONE:
+            await send_event(send, {"type": "token", "text": token})
+
+    forwarder = asyncio.create_task(forward_tokens())
+    sink = reply_tokens.set(lambda text: loop.call_soon_threadsafe(tokens.put_nowait, text))
+    try:
+        result = await chat_turn(payload)
+        reply = {"type": "turn", **result.model_dump(mode="json")}
+    except Http404:
+        return False
+    except (TurnQueueFull, RateLimitTimeout) as e:
+        reply = error_event(429, "The assistant is busy, please retry shortly.", e.retry_after)
+    except HttpError as e:
+        reply = error_event(e.status_code, str(e))
+    except Exception:
+        logger.exception("WebSocket chat turn failed for conversation %s", conversation_id)
+        reply = error_event(500, "Something went wrong, please retry.")
+    finally:
+        reply_tokens.reset(sink)
+        tokens.put_nowait(_DONE)
+        await forwarder
+    await send_event(send, reply)
+    return True
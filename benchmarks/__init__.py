@@ -0,0 +1,15 @@
+"""
+Offline benchmarks of chat turns.
+
+The compiled agent graph is driven end-to-end through scripted conversations
+(benchmarks/flows.py), against a local fake of the OpenRouter API
+(benchmarks/fake_openrouter.py) and a generated catalog. No network access
+and no API key are needed.
+
+Run with `python manage.py benchmark_chat` (see --help), or through pytest:
+`CHAT_BENCHMARK=1 pytest tests/test_benchmarks.py`.
+
+The fake also runs standalone, for load tests of the whole service:
+`python manage.py fake_openrouter` (see --help), with OPENROUTER_BASE_URL
+pointed at it.
+"""
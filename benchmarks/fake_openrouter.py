@@ -0,0 +1,367 @@
+"""
+A local stand-in for OpenRouter's chat completions endpoint.
+
+It speaks the protocol LLMClient uses: POST .../chat/completions, answered
+with a JSON completion, or with server-sent events when the request has
+`"stream": true` (a processing comment, one chunk per word, a final chunk
+with the usage, then `data: [DONE]`). Every answer carries a `usage` block
+(token counts estimated from the text length).
+
+Where answers come from, in order:
+- a cassette (JSONL, one recorded call per line), matched on model + messages
+- in record mode, a cassette miss is forwarded once to the real API and
+  appended to the cassette
+- a responder: `responder(messages) -> str`, e.g. a ScriptResponder or the
+  benchmark script (benchmarks/flows.py)
+Without any of them, the call gets a 404 error.
+
+Faults can be injected:
+- latency: a Latency before the first byte, plus `token_interval` seconds
+  between streamed chunks
+- error_rate: the share of calls answered with `error_status`
+- rate_limit_rpm: calls beyond this pace get 429 with Retry-After
+
+Run it standalone with `python manage.py fake_openrouter`, or in-process
+with FakeOpenRouter / serve_llm().
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+import requests
+
+from agent.rate_limit import RateLimitTimeout, TokenBucket
+
+
+Responder = Callable[[List[Dict[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def usage_for(messages: List[Dict[str, str]], content: str) -> Dict[str, int]:
+    prompt = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    completion = estimate_tokens(content)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class Latency:
+    """
+    A latency distribution, in seconds. Specs:
+      "0.2"                   fixed
+      "uniform:0.1:0.5"       between the bounds
+      "normal:0.3:0.1"        mean, standard deviation (never below 0)
+      "lognormal:0.3:0.5"     median, sigma: a long tail, like real providers
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = None) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, "Latency"], seed: Optional[int] = None) -> "Latency":
+        if isinstance(spec, Latency):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", float(spec))
+        kind, _, params = spec.partition(":")
+        if not params:
+            return cls("fixed", float(kind))
+        values = [float(v) for v in params.split(":")]
+        if len(values) != 2:
+            raise ValueError(f"Latency {spec!r}: expected {kind}:<a>:<b>")
+        return cls(kind, *values, seed=seed)
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return self.rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(self.a, self.b))
+        return self.a * math.exp(self.rng.gauss(0.0, self.b)) if self.a > 0 else 0.0
+
+
+class ScriptResponder:
+    """
+    Answers from rules, the first match wins. A rule matches when each of
+    its "system" / "user" substrings occurs in the first system message /
+    the last user message. A dict or list "reply" is sent as JSON.
+
+        [{"system": "extracts buyer intent", "user": "Dubai", "reply": {"intent": "prefs", "city": "Dubai"}},
+         {"reply": "Happy to help!"}]
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]) -> None:
+        self.rules = list(rules)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScriptResponder":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __call__(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        for rule in self.rules:
+            if rule.get("system", "") in system and rule.get("user", "") in user:
+                reply = rule["reply"]
+                return reply if isinstance(reply, str) else json.dumps(reply)
+        return None
+
+
+class Cassette:
+    """
+    Recorded calls, one JSON object per line: {key, model, messages, content, usage}.
+    A call matches on its model and messages (not on temperature or streaming).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def key(model: Optional[str], messages: List[Dict[str, str]]) -> str:
+        return hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode()).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model: Optional[str], messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        return self._entries.get(self.key(model, messages))
+
+    def add(self, model: Optional[str], messages: List[Dict[str, str]], content: str, usage: Dict[str, Any]) -> None:
+        entry = {"key": self.key(model, messages), "model": model, "messages": messages, "content": content, "usage": usage}
+        with self._lock:
+            if entry["key"] in self._entries:
+                return
+            self._entries[entry["key"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+class FakeOpenRouter:
+    def __init__(
+        self,
+        responder: Optional[Responder] = None,
+        latency: Union[str, float, Latency] = 0.0,
+        *,
+        cassette: Optional[Cassette] = None,
+        record_upstream: Optional[str] = None,
+        upstream_api_key: Optional[str] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        rate_limit_rpm: float = 0.0,
+        token_interval: float = 0.0,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.responder = responder
+        self.latency = Latency.parse(latency, seed)
+        self.cassette = cassette
+        self.record_upstream = record_upstream.rstrip("/") if record_upstream else None
+        self.upstream_api_key = upstream_api_key
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.limiter = TokenBucket.per_minute(rate_limit_rpm)
+        self.token_interval = token_interval
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.stats = {"replayed": 0, "recorded": 0, "scripted": 0, "missing": 0, "errors": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes: without this, each
+            # response waits ~40 ms for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self.send_error_json(404, f"No route for {self.path}")
+                fake.handle(self, body)
+
+            def send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def send_error_json(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+                # OpenRouter's error shape
+                self.send_json(status, {"error": {"code": status, "message": message}}, headers)
+
+            def send_event_stream(self, events: Iterator[str]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in events:
+                    data = event.encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self.server.server_port}/api/v1"
+        self.url = self.base_url + "/chat/completions"
+        self._thread: Optional[threading.Thread] = None
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def start(self) -> "FakeOpenRouter":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def answer(self, model: Optional[str], messages: List[Dict[str, str]], headers) -> Optional[Dict[str, Any]]:
+        """
+        {content, usage} for the call, or None when nothing can answer it.
+        """
+        if self.cassette is not None:
+            entry = self.cassette.get(model, messages)
+            if entry is not None:
+                self._count("replayed")
+                return entry
+            if self.record_upstream:
+                entry = self.record(model, messages, headers)
+                self._count("recorded")
+                return entry
+        if self.responder is not None:
+            content = self.responder(messages)
+            if content is not None:
+                self._count("scripted")
+                return {"content": content, "usage": usage_for(messages, content)}
+        self._count("missing")
+        return None
+
+    def record(self, model: Optional[str], messages: List[Dict[str, str]], headers) -> Dict[str, Any]:
+        api_key = self.upstream_api_key or headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        response = requests.post(
+            self.record_upstream + "/chat/completions",
+            json={"model": model, "messages": messages},
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            timeout=60,
+        )
+        response.raise_for_status()
+        data = response.json()
+        content = data["choices"][0]["message"]["content"]
+        usage = data.get("usage") or usage_for(messages, content)
+        self.cassette.add(model, messages, content, usage)
+        return {"content": content, "usage": usage}
+
+    def handle(self, handler, body: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            failed = self.error_rate > 0 and self.rng.random() < self.error_rate
+
+        try:
+            self.limiter.acquire(timeout=0)
+        except RateLimitTimeout as e:
+            self._count("rate_limited")
+            return handler.send_error_json(429, "Rate limit exceeded", {"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+        time.sleep(self.latency.sample())
+        if failed:
+            self._count("errors")
+            return handler.send_error_json(self.error_status, "Injected upstream error")
+
+        model, messages = body.get("model"), body.get("messages") or []
+        try:
+            answer = self.answer(model, messages, handler.headers)
+        except requests.RequestException as e:
+            return handler.send_error_json(502, f"Recording failed: {e}")
+        if answer is None:
+            return handler.send_error_json(404, "No recorded or scripted response for this request")
+
+        completion_id = f"gen-fake-{call}"
+        if body.get("stream"):
+            return handler.send_event_stream(self.events(completion_id, model, answer))
+        handler.send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer["content"]}, "finish_reason": "stop"}],
+            "usage": answer["usage"],
+        })
+
+    def events(self, completion_id: str, model: Optional[str], answer: Dict[str, Any]) -> Iterator[str]:
+        def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None, **extra) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            # raw UTF-8, as OpenRouter sends it (no \u escapes)
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        yield ": OPENROUTER PROCESSING\n\n"
+        words = answer["content"].split(" ")
+        for i, word in enumerate(words):
+            if i and self.token_interval:
+                time.sleep(self.token_interval)
+            yield chunk({"role": "assistant", "content": word if i == len(words) - 1 else word + " "})
+        yield chunk({}, "stop", usage=answer["usage"])
+        yield "data: [DONE]\n\n"
+
+
+@contextmanager
+def serve_llm(responder: Optional[Responder] = None, latency: Union[str, float, Latency] = 0.0, **options) -> Iterator[FakeOpenRouter]:
+    """
+    Points the agent's LLM client at a FakeOpenRouter, unthrottled, for the
+    duration of the block. `options` go to FakeOpenRouter.
+    """
+    from agent.langgraph_graph import llm
+
+    fake = FakeOpenRouter(responder, latency, **options).start()
+    base_url, limiter = llm.base_url, llm.limiter
+    llm.base_url, llm.limiter = fake.url, TokenBucket(0)
+    try:
+        yield fake
+    finally:
+        llm.base_url, llm.limiter = base_url, limiter
+        fake.close()
@@ -0,0 +1,151 @@
+"""
+Scripted conversations and a generated catalog for the benchmarks.
+
+Each flow is a short conversation; every turn scripts what the LLM answers
+(intent classification, the booking/selection extraction, the free-form
+reply) and the stage the turn must end in. The catalog is generated from a
+fixed seed, so every run searches the same projects.
+"""
+import json
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from agent.tools.project_info_tool import invalidate_project_cards
+from properties.geo import grid_cell
+from properties.models import Project
+
+
+@dataclass(frozen=True)
+class Turn:
+    message: str
+    stage: str  # the stage the turn must end in
+    intent: Dict = field(default_factory=dict)
+    extract: Optional[Dict] = None  # booking / project selection extraction
+    reply: str = "Happy to help! Tell me what you are looking for: city, size and budget."
+
+
+SEARCH = Turn(
+    "Looking for a 2BHK apartment in Dubai, budget up to 400k USD",
+    "recommendations",
+    {"intent": "prefs", "city": "Dubai", "unit_size": "2BHK", "bedrooms": 2, "property_type": "apartment",
+     "budget_max": "400k USD", "currency": "USD"},
+)
+
+FLOWS: Dict[str, List[Turn]] = {
+    # preferences gathered over several turns, then the search
+    "prefs": [
+        Turn("Hi, I want to buy a home in Dubai", "asking_prefs", {"intent": "prefs", "city": "Dubai"}),
+        Turn("A 2 bedroom apartment", "asking_prefs",
+             {"intent": "prefs", "unit_size": "2BHK", "bedrooms": 2, "property_type": "apartment"}),
+        Turn("My budget is 400k USD", "recommendations", {"intent": "prefs", "budget_max": "400k USD", "currency": "USD"}),
+    ],
+    "clarify": [
+        Turn("I'm interested in buying a villa", "asking_prefs", {"intent": "prefs", "property_type": "villa"}),
+    ],
+    "search": [SEARCH],
+    "detail": [
+        SEARCH,
+        Turn("Tell me more about the first one", "detail_complete", {"intent": "detail"},
+             extract={"project_index": 1, "project_name": None}),
+    ],
+    "booking": [
+        SEARCH,
+        Turn("Book a visit to the first one. I'm Sam Lee, sam.lee@example.com", "booking_confirmed",
+             {"intent": "book", "lead_first_name": "Sam", "lead_last_name": "Lee", "lead_email": "sam.lee@example.com"},
+             extract={"project_index": 1, "project_name": None, "email": "sam.lee@example.com", "first_name": "Sam"}),
+    ],
+    "generic": [
+        Turn("What is the process for a foreigner to buy property?", "generic", {"intent": "generic"},
+             reply="Foreign buyers can purchase freehold property in designated areas. " * 4),
+    ],
+}
+
+
+def _script() -> Dict[str, Turn]:
+    script: Dict[str, Turn] = {}
+    for turns in FLOWS.values():
+        for turn in turns:
+            if script.setdefault(turn.message, turn) != turn:
+                raise ValueError(f"Conflicting scripts for {turn.message!r}")
+    return script
+
+
+SCRIPT = _script()
+
+
+def respond(messages: List[Dict[str, str]]) -> str:
+    """
+    The scripted LLM: answers from the turn of the last user message, by
+    the prompt being answered (told apart by its system prompt).
+    """
+    system = messages[0]["content"] if messages[0]["role"] == "system" else ""
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    turn = SCRIPT.get(user)
+    if turn is None:
+        return Turn("", "generic").reply
+    if "extracts buyer intent" in system:
+        return json.dumps(turn.intent)
+    if "extraction assistant" in system:
+        return json.dumps(turn.extract or {})
+    return turn.reply
+
+
+def filler_history(length: int) -> List[Dict[str, str]]:
+    """
+    `length` earlier messages (alternating user/assistant), for long conversations.
+    """
+    return [
+        {"role": "user", "content": f"Earlier question number {i} about areas, fees and handover dates?"}
+        if i % 2 == 0 else
+        {"role": "assistant", "content": f"Earlier answer number {i}: " + "details on the market and the buying process. " * 6}
+        for i in range(length)
+    ]
+
+
+CITIES: Tuple[Tuple[str, str, float, float], ...] = (
+    ("Dubai", "UAE", 25.08, 55.14),
+    ("Abu Dhabi", "UAE", 24.45, 54.38),
+    ("Mumbai", "India", 19.07, 72.88),
+    ("London", "UK", 51.51, -0.13),
+    ("Lisbon", "Portugal", 38.72, -9.14),
+)
+
+
+def seed_catalog(size: int, seed: int = 7) -> None:
+    """
+    Replaces the catalog with `size` generated projects, a fifth of them in
+    each city, with 1-4 bedrooms in turn (so a search for a 2BHK in Dubai
+    matches about one project in twenty).
+    """
+    rng = random.Random(seed)
+    Project.objects.all().delete()
+    projects = []
+    for i in range(size):
+        city, country, lat, lng = CITIES[i % len(CITIES)]
+        bedrooms = 1 + (i // len(CITIES)) % 4
+        project = Project(
+            name=f"{city} Residence {i + 1}",
+            city=city,
+            country=country,
+            developer_name=f"Developer {i % 17}",
+            no_of_bedrooms=bedrooms,
+            bathrooms=bedrooms,
+            unit_type=f"{bedrooms}BHK",
+            completion_status=rng.choice(["off_plan", "available", "completed"]),
+            price_usd=Decimal(rng.randrange(150_000, 1_500_000, 1_000)),
+            area_sqm=Decimal(40 + 35 * bedrooms),
+            property_type=rng.choice(["apartment", "apartment", "villa"]),
+            features="Balcony, built-in wardrobes, smart home",
+            facilities="Pool, gym, kids play area, covered parking",
+            description=f"Residential project number {i + 1} in {city}, close to schools and transport.",
+            latitude=lat + rng.uniform(-0.1, 0.1),
+            longitude=lng + rng.uniform(-0.1, 0.1),
+        )
+        # bulk_create skips save(): fill the derived columns here
+        project.refresh_local_prices()
+        project.geo_cell = grid_cell(project.latitude, project.longitude)
+        projects.append(project)
+    created = Project.objects.bulk_create(projects, batch_size=500)
+    invalidate_project_cards(p.id for p in created)
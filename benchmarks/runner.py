@@ -0,0 +1,213 @@
+"""
+Runs the benchmark flows and compares results against a baseline.
+
+For every (catalog size, conversation length, flow), each flow is replayed
+`warmup + repeat` times from a fresh conversation. The warmup runs fill the
+caches (project cards, prompt building), so the numbers are steady-state
+turns. Per turn:
+
+- wall_ms: p50 / mean / max over the timed runs, LLM round trips included
+  (to the local fake, plus its configured latency)
+- db_queries: the most any timed run made
+- alloc_kb: peak traced memory during the turn, from one extra run under
+  tracemalloc (kept apart from the timed runs, which it would slow down)
+"""
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db import connection
+
+from agent.langgraph_graph import build_graph
+from agent.state import AgentState
+from agent.tracing import TurnTrace
+from api_layer.endpoints.conversations import GREETING
+from benchmarks.fake_openrouter import serve_llm
+from benchmarks.flows import FLOWS, Turn, filler_history, respond, seed_catalog
+
+
+class FlowError(Exception):
+    """
+    A turn ended in another stage than its script expects.
+    """
+
+
+@dataclass
+class Config:
+    catalog_sizes: Sequence[int] = (100, 1000, 5000)
+    histories: Sequence[int] = (0, 50, 200)
+    flows: Sequence[str] = tuple(FLOWS)
+    repeat: int = 10
+    warmup: int = 1
+    llm_latency_ms: float = 0.0
+
+
+@dataclass
+class Thresholds:
+    """
+    A turn regresses when it is slower (or allocates more) by more than the
+    relative tolerance AND the absolute floor, or makes more DB queries.
+    """
+    wall: float = 0.5
+    wall_floor_ms: float = 5.0
+    alloc: float = 0.25
+    alloc_floor_kb: float = 64.0
+    db_queries: int = 0
+
+
+@dataclass
+class TurnSample:
+    stage: str
+    wall_ms: float
+    db_queries: int
+    alloc_kb: Optional[float] = None
+
+
+def run_flow(app, turns: Sequence[Turn], history: int, trace_allocations: bool = False) -> List[TurnSample]:
+    state = AgentState(
+        messages=[{"role": "assistant", "content": GREETING}, *filler_history(history)],
+        stage="greeting",
+    )
+    samples = []
+    for turn in turns:
+        state.messages.append({"role": "user", "content": turn.message})
+        queries = TurnTrace("benchmark")
+        if trace_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            state = AgentState.model_construct(**app.invoke(state))
+        wall = time.perf_counter() - started
+
+        sample = TurnSample(state.stage, round(wall * 1000, 3), queries.db_queries)
+        if trace_allocations:
+            sample.alloc_kb = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+        if state.stage != turn.stage:
+            raise FlowError(f"{turn.message!r} ended in stage {state.stage!r}, expected {turn.stage!r}")
+        samples.append(sample)
+    return samples
+
+
+def measure(app, turns: Sequence[Turn], history: int, config: Config) -> List[Dict[str, Any]]:
+    for _ in range(config.warmup):
+        run_flow(app, turns, history)
+    runs = [run_flow(app, turns, history) for _ in range(config.repeat)]
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        traced = run_flow(app, turns, history, trace_allocations=True)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    results = []
+    for i, turn in enumerate(turns):
+        walls = [run[i].wall_ms for run in runs] or [traced[i].wall_ms]
+        results.append({
+            "message": turn.message,
+            "stage": traced[i].stage,
+            "wall_ms": {
+                "p50": round(statistics.median(walls), 3),
+                "mean": round(statistics.fmean(walls), 3),
+                "max": round(max(walls), 3),
+            },
+            "db_queries": max([run[i].db_queries for run in runs] or [traced[i].db_queries]),
+            "alloc_kb": traced[i].alloc_kb,
+        })
+    return results
+
+
+def run_benchmark(config: Config, progress=None) -> Dict[str, Any]:
+    """
+    Seeds each catalog size in turn, in the current database: run it against
+    a test database (the management command and pytest both do).
+    """
+    unknown = set(config.flows) - set(FLOWS)
+    if unknown:
+        raise ValueError(f"Unknown flows: {', '.join(sorted(unknown))}")
+
+    app = build_graph().compile()
+    results = []
+    with serve_llm(respond, latency=config.llm_latency_ms / 1000) as fake:
+        for catalog_size in config.catalog_sizes:
+            seed_catalog(catalog_size)
+            for history in config.histories:
+                for flow in config.flows:
+                    turns = measure(app, FLOWS[flow], history, config)
+                    results.append({"flow": flow, "catalog_size": catalog_size, "history": history, "turns": turns})
+                    if progress:
+                        progress(results[-1])
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": connection.vendor,
+            "llm_calls": fake.calls,
+            "config": asdict(config),
+        },
+        "results": results,
+    }
+
+
+def _turns_by_key(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {
+        f"{r['flow']} turn {i} (catalog {r['catalog_size']}, history {r['history']})": turn
+        for r in report["results"]
+        for i, turn in enumerate(r["turns"], start=1)
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], thresholds: Thresholds = Thresholds()) -> List[str]:
+    """
+    The regressions of `report` against `baseline`, one line each. Turns
+    missing from the baseline are not compared.
+    """
+    base_turns = _turns_by_key(baseline)
+    regressions = []
+    for key, turn in _turns_by_key(report).items():
+        base = base_turns.get(key)
+        if base is None:
+            continue
+        wall, base_wall = turn["wall_ms"]["p50"], base["wall_ms"]["p50"]
+        if wall > base_wall * (1 + thresholds.wall) and wall - base_wall > thresholds.wall_floor_ms:
+            regressions.append(f"{key}: p50 {wall:.2f} ms, baseline {base_wall:.2f} ms")
+        if turn["db_queries"] > base["db_queries"] + thresholds.db_queries:
+            regressions.append(f"{key}: {turn['db_queries']} DB queries, baseline {base['db_queries']}")
+        alloc, base_alloc = turn.get("alloc_kb"), base.get("alloc_kb")
+        if alloc is not None and base_alloc is not None:
+            if alloc > base_alloc * (1 + thresholds.alloc) and alloc - base_alloc > thresholds.alloc_floor_kb:
+                regressions.append(f"{key}: {alloc:.0f} KB allocated, baseline {base_alloc:.0f} KB")
+    return regressions
+
+
+def summary_lines(report: Dict[str, Any]) -> Iterable[str]:
+    yield f"{'flow':<8} {'catalog':>7} {'history':>7} {'turn':>4} {'p50 ms':>8} {'max ms':>8} {'queries':>7} {'alloc KB':>9}  stage"
+    for r in report["results"]:
+        for i, turn in enumerate(r["turns"], start=1):
+            yield (
+                f"{r['flow']:<8} {r['catalog_size']:>7} {r['history']:>7} {i:>4} "
+                f"{turn['wall_ms']['p50']:>8.2f} {turn['wall_ms']['max']:>8.2f} {turn['db_queries']:>7} "
+                f"{turn['alloc_kb']:>9.1f}  {turn['stage']}"
+            )
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
@@ -1,4 +1,16 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
+from django.conf import settings
+
+# The agent graph builds an LLMClient at import time; tests never call OpenRouter
+if not settings.OPENROUTER_API_KEY:
+    settings.OPENROUTER_API_KEY = "test-key"
+settings.SECRET_KEY = os.getenv("SECRET_KEY") or "test-secret-key"
 
 # This ensures Django is set up before tests run
 pytest_plugins = [
@@ -14,3 +26,67 @@ def enable_db_access_for_all_tests(db):
     This saves us from needing @pytest.mark.django_db on each test.
     """
     pass
+
+
+@pytest.fixture(autouse=True)
+def session_cache_write_through(settings):
+    """
+    Chat turns reach the DB immediately in tests (no background flusher), and
+    no cached conversation outlives its test's DB.
+    """
+    from api_layer.session_cache import session_cache
+
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 0
+    session_cache.clear()
+    yield
+    session_cache.clear()
+
+
+class StubSearchServer:
+    """
+    Local stand-in for the search provider: POST {"query": ...} -> {"summary": ...}.
+    Set `mode` to "ok", "empty" or "error", and `delay` to slow responses down.
+    """
+
+    def __init__(self):
+        self.mode = "ok"
+        self.delay = 0.0
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body["query"])
+                time.sleep(stub.delay)
+                if stub.mode == "error":
+                    payload, status = b'{"error": "boom"}', 500
+                elif stub.mode == "empty":
+                    payload, status = b'{"summary": ""}', 200
+                else:
+                    payload, status = json.dumps({"summary": f"About {body['query']}"}).encode(), 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/search"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def web_search_stub():
+    server = StubSearchServer()
+    yield server
+    server.close()
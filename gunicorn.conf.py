@@ -0,0 +1,30 @@
+"""
+Gunicorn config for production: `gunicorn silver_land_ai.asgi:application`
+(picked up automatically from the working directory).
+
+Each worker is one uvicorn event loop. Chat turns mostly wait on the LLM, so
+a single worker serves many of them at once (see tests/test_async_chat.py);
+add workers for CPU, not for concurrency. Environment overrides:
+
+    WEB_CONCURRENCY   number of worker processes (default: 2 x CPUs + 1, max 8)
+    PORT              port to bind on 0.0.0.0 (default: 8000)
+    GUNICORN_TIMEOUT  seconds before a silent worker is restarted (default: 120)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# a turn may wait up to 30s per LLM call
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then, so slow leaks can't pile up
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
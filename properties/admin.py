@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Lead, Booking, ConversationSession
+from .models import Project, Lead, Booking, ConversationArchive, ConversationSession, ConversationMessage
 
 
 @admin.register(Project)
@@ -20,6 +20,23 @@ class BookingAdmin(admin.ModelAdmin):
     list_filter = ("status", "city")
 
 
+class ConversationMessageInline(admin.TabularInline):
+    model = ConversationMessage
+    fields = ("seq", "role", "content", "created_at")
+    readonly_fields = fields
+    ordering = ("seq",)
+    extra = 0
+    can_delete = False
+
+
 @admin.register(ConversationSession)
 class ConversationSessionAdmin(admin.ModelAdmin):
-    list_display = ("id", "lead", "created_at", "updated_at")
+    list_display = ("id", "lead", "message_count", "state_codec", "created_at", "updated_at")
+    inlines = [ConversationMessageInline]
+
+
+@admin.register(ConversationArchive)
+class ConversationArchiveAdmin(admin.ModelAdmin):
+    list_display = ("id", "lead_id", "message_count", "last_active_at", "archived_at")
+    readonly_fields = ("id", "lead_id", "message_count", "created_at", "last_active_at", "archived_at")
+    exclude = ("payload",)
@@ -0,0 +1,165 @@
+import json
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from django.conf import settings
+
+
+BASE_CURRENCY = "USD"
+
+# Every supported currency has its own precomputed, indexed column on Project.
+PRICE_FIELDS = {
+    "USD": "price_usd",
+    "AED": "price_aed",
+    "INR": "price_inr",
+    "EUR": "price_eur",
+    "GBP": "price_gbp",
+}
+SUPPORTED_CURRENCIES = tuple(PRICE_FIELDS)
+
+FX_RATES_PATH = Path(__file__).resolve().parent / "data" / "fx_rates.json"
+
+CURRENCY_ALIASES = {
+    "$": "USD", "usd": "USD", "us$": "USD", "dollar": "USD", "dollars": "USD",
+    "aed": "AED", "dhs": "AED", "dh": "AED", "dirham": "AED", "dirhams": "AED",
+    "₹": "INR", "inr": "INR", "rs": "INR", "rs.": "INR", "rupee": "INR", "rupees": "INR",
+    "€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pound": "GBP", "pounds": "GBP",
+}
+
+UNIT_MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+    "m": 1_000_000, "mn": 1_000_000, "mil": 1_000_000, "million": 1_000_000, "millions": 1_000_000,
+    "b": 1_000_000_000, "bn": 1_000_000_000, "billion": 1_000_000_000,
+}
+
+# Units that only make sense for Indian rupees
+INR_UNITS = {"l", "lac", "lacs", "lakh", "lakhs", "cr", "crore", "crores"}
+
+_AMOUNT_RE = re.compile(
+    r"(?P<num>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>" + "|".join(sorted(UNIT_MULTIPLIERS, key=len, reverse=True)) + r")?(?![a-z])"
+)
+_CURRENCY_RE = re.compile(
+    r"(?<![a-z])("
+    + "|".join(re.escape(a) for a in sorted(CURRENCY_ALIASES, key=len, reverse=True))
+    + r")(?![a-z])"
+)
+
+
+def normalize_currency(value: Optional[str]) -> Optional[str]:
+    """
+    Maps a currency code, symbol or name ("aed", "₹", "euros") to a supported ISO code.
+    """
+    if not isinstance(value, str):
+        return None
+    key = value.strip().lower()
+    if key.upper() in PRICE_FIELDS:
+        return key.upper()
+    return CURRENCY_ALIASES.get(key)
+
+
+class UnsupportedCurrency(ValueError):
+    """
+    A currency with no precomputed price column (e.g. "JPY").
+    """
+    def __init__(self, currency: str) -> None:
+        super().__init__(f"Unsupported currency: {currency}")
+        self.currency = currency
+
+
+def resolve_currency(value: Optional[str]) -> str:
+    """
+    normalize_currency() for searches: USD when no currency is given, and
+    UnsupportedCurrency for one that isn't supported (instead of searching
+    its amounts as if they were USD).
+    """
+    if value is None or not str(value).strip():
+        return BASE_CURRENCY
+    currency = normalize_currency(value)
+    if currency is None:
+        raise UnsupportedCurrency(str(value).strip())
+    return currency
+
+
+def parse_amount(value: Union[str, int, float, None]) -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Deterministically parses a money amount such as "50 lakhs", "300k",
+    "AED 1.2 million", "$350,000" or "2.5 cr".
+
+    Returns (amount, currency) where currency is a supported ISO code, or None
+    if no currency is mentioned. Lakh/crore amounts default to INR.
+    Returns None if no amount can be found.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return (int(value), None) if value >= 0 else None
+
+    text = value.strip().lower()
+    match = _AMOUNT_RE.search(text)
+    if not match:
+        return None
+
+    number = Decimal(match.group("num").replace(",", ""))
+    unit = match.group("unit")
+    if unit:
+        number *= UNIT_MULTIPLIERS[unit]
+
+    currency = None
+    currency_match = _CURRENCY_RE.search(text)
+    if currency_match:
+        currency = CURRENCY_ALIASES[currency_match.group(1)]
+    elif unit in INR_UNITS:
+        currency = "INR"
+
+    return int(number.to_integral_value(ROUND_HALF_UP)), currency
+
+
+@lru_cache(maxsize=1)
+def load_fx_rates() -> Dict[str, Decimal]:
+    """
+    Loads the offline FX table: units of each currency per 1 USD.
+    """
+    path = Path(getattr(settings, "FX_RATES_PATH", "") or FX_RATES_PATH)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("base", BASE_CURRENCY) != BASE_CURRENCY:
+        raise ValueError(f"FX table base must be {BASE_CURRENCY}")
+
+    rates = {code.upper(): Decimal(str(rate)) for code, rate in data["rates"].items()}
+    missing = set(SUPPORTED_CURRENCIES) - set(rates)
+    if missing:
+        raise ValueError(f"FX table is missing rates for: {', '.join(sorted(missing))}")
+    return rates
+
+
+def convert_from_usd(amount_usd, currency: str) -> Optional[Decimal]:
+    """
+    Converts a USD amount into `currency`, rounded to cents.
+    """
+    if amount_usd is None:
+        return None
+    rate = load_fx_rates()[currency]
+    value = Decimal(str(amount_usd)) * rate
+    return value.quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+def price_field_for(currency: Optional[str]) -> str:
+    """
+    Name of the precomputed Project price column for `currency` (USD if unknown).
+    """
+    return PRICE_FIELDS.get(currency or BASE_CURRENCY, PRICE_FIELDS[BASE_CURRENCY])
+
+
+def format_money(amount, currency: Optional[str]) -> str:
+    """
+    "1,101,750 AED" style formatting used in chat replies.
+    """
+    return f"{float(amount):,.0f} {currency or BASE_CURRENCY}"
@@ -0,0 +1,145 @@
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Size of one cell of the uniform spatial grid, in degrees (~5.5 km at the equator).
+GRID_CELL_DEG = 0.05
+
+# Above this many cells a bounding box is too large for the grid to help,
+# so we only keep the plain latitude/longitude range filter.
+MAX_GRID_CELLS = 400
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer.json"
+
+
+def grid_cell(latitude: float, longitude: float) -> str:
+    """
+    Returns the key of the grid cell that contains the given point, e.g. "502:1102".
+    """
+    row = math.floor(latitude / GRID_CELL_DEG)
+    col = math.floor(longitude / GRID_CELL_DEG)
+    return f"{row}:{col}"
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Returns (min_lat, max_lat, min_lng, max_lng) of a box that fully contains
+    the circle of radius_km around the point.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-6:
+        dlng = 180.0
+    else:
+        dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(-90.0, latitude - dlat),
+        min(90.0, latitude + dlat),
+        longitude - dlng,
+        longitude + dlng,
+    )
+
+
+def grid_cells_for_box(min_lat: float, max_lat: float, min_lng: float, max_lng: float) -> Optional[List[str]]:
+    """
+    Returns all grid cell keys overlapping the box, or None if the box
+    covers too many cells to be worth an IN (...) lookup.
+    """
+    row_min = math.floor(min_lat / GRID_CELL_DEG)
+    row_max = math.floor(max_lat / GRID_CELL_DEG)
+    col_min = math.floor(min_lng / GRID_CELL_DEG)
+    col_max = math.floor(max_lng / GRID_CELL_DEG)
+
+    if (row_max - row_min + 1) * (col_max - col_min + 1) > MAX_GRID_CELLS:
+        return None
+
+    return [
+        f"{row}:{col}"
+        for row in range(row_min, row_max + 1)
+        for col in range(col_min, col_max + 1)
+    ]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Great-circle distance between two points, in kilometres.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distances_km(
+    latitude: float,
+    longitude: float,
+    points: Iterable[Tuple[int, float, float]],
+) -> Dict[int, float]:
+    """
+    Batch haversine for (id, lat, lng) rows against a single origin.
+
+    The origin terms are computed once, so each row only costs a handful of
+    trig calls. Returns {id: distance_km}.
+    """
+    phi1 = math.radians(latitude)
+    cos_phi1 = math.cos(phi1)
+    lmb1 = math.radians(longitude)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+
+    result: Dict[int, float] = {}
+    for pk, lat, lng in points:
+        phi2 = radians(lat)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin((radians(lng) - lmb1) / 2) ** 2
+        result[pk] = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+    return result
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace("-", " ").split())
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer() -> Dict[str, dict]:
+    """
+    Loads the bundled landmark/district gazetteer, indexed by normalized name and alias.
+    """
+    path = Path(getattr(settings, "GEO_GAZETTEER_PATH", "") or GAZETTEER_PATH)
+    with open(path, encoding="utf-8") as f:
+        places = json.load(f)
+
+    index: Dict[str, dict] = {}
+    for place in places:
+        for name in [place["name"], *place.get("aliases", [])]:
+            index[_normalize(name)] = place
+    return index
+
+
+def find_place(name: Optional[str]) -> Optional[dict]:
+    """
+    Looks up a landmark or district by name or alias (case-insensitive).
+
+    Returns the gazetteer entry (name, kind, city, country, lat, lng) or None.
+    """
+    if not name:
+        return None
+
+    index = load_gazetteer()
+    key = _normalize(name)
+    if key in index:
+        return index[key]
+
+    # Tolerate extra words around a known name ("near dubai marina area"),
+    # preferring the longest alias so districts win over their city.
+    matches = [alias for alias in index if len(alias) > 3 and alias in key]
+    if not matches:
+        return None
+    return index[max(matches, key=len)]
@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_layer.batch_chat import parse_items, run_batch, write_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Run many chat turns from a JSONL file ({conversation_id or ref, message} per line), "
+        "conversations in parallel, and write one JSONL result per turn"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input",
+            type=str,
+            help="JSONL file of turns, or - for stdin",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="-",
+            help="Where to write the JSONL results (default: stdout)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Conversations run in parallel",
+        )
+
+    def handle(self, *args, **options):
+        if options["input"] == "-":
+            items, errors = parse_items(sys.stdin)
+        else:
+            try:
+                with open(options["input"], encoding="utf-8") as f:
+                    items, errors = parse_items(f)
+            except OSError as e:
+                raise CommandError(f"Cannot read {options['input']}: {e}")
+
+        out = self.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8")
+        try:
+            counts = write_results(errors, out)
+            batch = write_results(run_batch(items, workers=options["workers"]), out)
+        finally:
+            if out is not self.stdout:
+                out.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            f"{batch['ok']} turns ran, {batch['failed']} failed, "
+            f"{counts['failed']} invalid lines skipped."
+        ))
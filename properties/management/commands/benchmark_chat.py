@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# The fake LLM needs no key, but the agent's client refuses to start without one
+if not settings.OPENROUTER_API_KEY:
+    settings.OPENROUTER_API_KEY = "offline-benchmark"
+
+from benchmarks.flows import FLOWS
+from benchmarks.runner import Config, Thresholds, compare, load, run_benchmark, save, summary_lines
+
+
+def int_list(value: str):
+    return tuple(int(v) for v in value.split(",") if v.strip())
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark chat turns offline (fake LLM, generated catalog, throwaway test database): "
+        "wall time, DB queries and allocations per turn, optionally checked against a baseline"
+    )
+
+    def add_arguments(self, parser):
+        defaults = Config()
+        parser.add_argument("--catalog-sizes", type=int_list, default=defaults.catalog_sizes,
+                            help="Comma-separated catalog sizes (default: 100,1000,5000)")
+        parser.add_argument("--histories", type=int_list, default=defaults.histories,
+                            help="Comma-separated numbers of earlier messages (default: 0,50,200)")
+        parser.add_argument("--flows", type=lambda v: tuple(v.split(",")), default=tuple(FLOWS),
+                            help=f"Comma-separated flows (default: {','.join(FLOWS)})")
+        parser.add_argument("--repeat", type=int, default=defaults.repeat, help="Timed runs per flow")
+        parser.add_argument("--warmup", type=int, default=defaults.warmup, help="Untimed runs per flow first")
+        parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms,
+                            help="Latency of each fake LLM call")
+        parser.add_argument("--output", type=str, help="Write the results to this JSON file")
+        parser.add_argument("--baseline", type=str, help="Compare against this results file; fail on regressions")
+        parser.add_argument("--wall-tolerance", type=float, default=Thresholds.wall,
+                            help="Allowed relative p50 slowdown (default: 0.5)")
+        parser.add_argument("--alloc-tolerance", type=float, default=Thresholds.alloc,
+                            help="Allowed relative allocation growth (default: 0.25)")
+
+    def handle(self, *args, **options):
+        config = Config(
+            catalog_sizes=options["catalog_sizes"],
+            histories=options["histories"],
+            flows=options["flows"],
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            llm_latency_ms=options["llm_latency_ms"],
+        )
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = load(options["baseline"])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['baseline']}: {e}")
+
+        # The benchmark replaces the catalog: never in the real database
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = run_benchmark(config, progress=lambda r: self.stderr.write(
+                f"{r['flow']} (catalog {r['catalog_size']}, history {r['history']}) done"
+            ))
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for line in summary_lines(report):
+            self.stdout.write(line)
+        if options["output"]:
+            save(report, options["output"])
+
+        if baseline is not None:
+            thresholds = Thresholds(wall=options["wall_tolerance"], alloc=options["alloc_tolerance"])
+            regressions = compare(report, baseline, thresholds)
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(self.style.ERROR(line))
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stderr.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
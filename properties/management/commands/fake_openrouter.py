@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.fake_openrouter import Cassette, FakeOpenRouter, Latency, ScriptResponder
+from benchmarks.flows import respond
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local OpenRouter-compatible chat completions API (scripted, replayed or recorded "
+        "answers, injected latency, errors and rate limits). Point OPENROUTER_BASE_URL at it."
+    )
+    # runs without the app (and its OPENROUTER_API_KEY)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8090)
+        parser.add_argument(
+            "--script", type=str,
+            help="JSON rules file (see ScriptResponder); default: the benchmark conversations",
+        )
+        parser.add_argument("--cassette", type=str, help="JSONL file of recorded calls to replay")
+        parser.add_argument(
+            "--record", action="store_true",
+            help="Forward calls missing from the cassette to the real API once, and append them",
+        )
+        parser.add_argument("--upstream", type=str, default="https://openrouter.ai/api/v1",
+                            help="API root used by --record")
+        parser.add_argument("--latency", type=str, default="0",
+                            help='Seconds before answering: "0.2", "uniform:0.1:0.5", "normal:0.3:0.1", "lognormal:0.3:0.5"')
+        parser.add_argument("--token-interval", type=float, default=0.0,
+                            help="Seconds between streamed chunks")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls that fail")
+        parser.add_argument("--error-status", type=int, default=500, help="Status of failed calls")
+        parser.add_argument("--rate-limit-rpm", type=float, default=0.0,
+                            help="Calls per minute before answering 429 (0 = unlimited)")
+        parser.add_argument("--seed", type=int, help="Seed for latency and errors (repeatable runs)")
+
+    def handle(self, *args, **options):
+        if options["record"] and not options["cassette"]:
+            raise CommandError("--record needs --cassette")
+        try:
+            responder = ScriptResponder.from_file(options["script"]) if options["script"] else respond
+            latency = Latency.parse(options["latency"], options["seed"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        cassette = Cassette(options["cassette"]) if options["cassette"] else None
+
+        fake = FakeOpenRouter(
+            responder,
+            latency,
+            cassette=cassette,
+            record_upstream=options["upstream"] if options["record"] else None,
+            upstream_api_key=settings.OPENROUTER_API_KEY,
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            rate_limit_rpm=options["rate_limit_rpm"],
+            token_interval=options["token_interval"],
+            seed=options["seed"],
+            host=options["host"],
+            port=options["port"],
+        )
+        self.stderr.write(self.style.SUCCESS(
+            f"Fake OpenRouter on {fake.base_url}"
+            + (f", {len(cassette)} recorded calls" if cassette is not None else "")
+            + ". Set OPENROUTER_BASE_URL to it."
+        ))
+        try:
+            fake.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.server.server_close()
+            self.stderr.write(f"Served {fake.calls} calls: {fake.stats}")
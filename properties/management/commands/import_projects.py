@@ -52,6 +52,8 @@ class Command(BaseCommand):
                     features = row.get("features") or ""
                     facilities = row.get("facilities") or ""
                     description = row.get("Project description") or row.get("description") or ""
+                    latitude = row.get("latitude") or row.get("Latitude") or row.get("lat")
+                    longitude = row.get("longitude") or row.get("Longitude") or row.get("lng")
 
                     # Convert numeric fields safely
                     def to_int(val):
@@ -70,6 +72,10 @@ class Command(BaseCommand):
                     bathrooms = to_int(bathrooms)
                     price_usd = to_float(price_usd)
                     area_sqm = to_float(area_sqm)
+                    latitude = to_float(latitude)
+                    longitude = to_float(longitude)
+                    if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                        latitude = longitude = None
 
                     # Convert completion_status into our choices
                     status_normalized = None
@@ -110,6 +116,8 @@ class Command(BaseCommand):
                             "features": features or "",
                             "facilities": facilities or "",
                             "description": description or "",
+                            "latitude": latitude,
+                            "longitude": longitude,
                         },
                     )
 
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from agent.tools.project_info_tool import invalidate_project_cards
+from properties.currency import PRICE_FIELDS, load_fx_rates
+from properties.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-currency Project price columns after the FX-rate table changes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of projects updated per transaction",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        local_fields = [f for f in PRICE_FIELDS.values() if f != "price_usd"]
+        # bulk_update skips auto_now: set it, so cached cards and catalog ETags change
+        fields = [*local_fields, "updated_at"]
+        now = timezone.now()
+
+        # Pick up a freshly edited rates file in this process
+        load_fx_rates.cache_clear()
+        try:
+            load_fx_rates()
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not load FX rates: {e}")
+
+        updated = 0
+        batch = []
+        qs = Project.objects.only("id", "price_usd", "updated_at", *local_fields).order_by("id")
+        for project in qs.iterator(chunk_size=batch_size):
+            project.refresh_local_prices()
+            project.updated_at = now
+            batch.append(project)
+            if len(batch) >= batch_size:
+                updated += self._flush(batch, fields)
+                batch = []
+        if batch:
+            updated += self._flush(batch, fields)
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed local prices for {updated} projects."))
+
+    def _flush(self, batch, fields):
+        with transaction.atomic():
+            Project.objects.bulk_update(batch, fields)
+        invalidate_project_cards(p.id for p in batch)
+        return len(batch)
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api_layer.session_lifecycle import run_lifecycle
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive idle conversations, compact long histories and reclaim DB space "
+        "(small batches, safe to run next to live traffic, e.g. hourly from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ttl-days",
+            type=int,
+            default=settings.SESSION_TTL_DAYS,
+            help="Archive conversations idle for this many days",
+        )
+        parser.add_argument(
+            "--compact-idle-hours",
+            type=int,
+            default=settings.SESSION_COMPACT_IDLE_HOURS,
+            help="Only compact conversations idle for this many hours",
+        )
+        parser.add_argument(
+            "--max-messages",
+            type=int,
+            default=settings.SESSION_COMPACT_MAX_MESSAGES,
+            help="Compact histories longer than this",
+        )
+        parser.add_argument(
+            "--keep-messages",
+            type=int,
+            default=settings.SESSION_COMPACT_KEEP_MESSAGES,
+            help="Most recent messages kept verbatim when compacting",
+        )
+        parser.add_argument(
+            "--idempotency-ttl-hours",
+            type=int,
+            default=settings.IDEMPOTENCY_KEY_TTL_HOURS,
+            help="Delete stored Idempotency-Key responses older than this",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Conversations handled per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--vacuum",
+            choices=["none", "incremental", "full"],
+            default="incremental",
+            help="'full' blocks the database; run it once off-peak to enable incremental vacuum on SQLite",
+        )
+        parser.add_argument(
+            "--vacuum-pages",
+            type=int,
+            default=1000,
+            help="Max pages freed per incremental vacuum",
+        )
+
+    def handle(self, *args, **options):
+        result = run_lifecycle(
+            ttl_days=options["ttl_days"],
+            compact_idle_hours=options["compact_idle_hours"],
+            max_messages=options["max_messages"],
+            keep_messages=options["keep_messages"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            vacuum=options["vacuum"],
+            vacuum_pages=options["vacuum_pages"],
+            idempotency_ttl_hours=options["idempotency_ttl_hours"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {result['archived']} conversations, compacted {result['compacted']} "
+            f"({result['folded_messages']} messages folded), purged {result['idempotency_keys']} "
+            f"idempotency keys. Vacuum: {result['vacuum']}."
+        ))
@@ -0,0 +1,43 @@
+import zstandard
+from django.core.management.base import BaseCommand, CommandError
+
+from api_layer import state_codec
+from api_layer.session_store import stored_state
+from properties.models import ConversationSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Train a zstd dictionary on recent conversation states "
+        "(used by the msgpack+zstd session state codec)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=1000,
+            help="Number of most recent conversations to train on",
+        )
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=16 * 1024,
+            help="Dictionary size in bytes",
+        )
+
+    def handle(self, *args, **options):
+        sessions = ConversationSession.objects.only("state", "state_codec", "state_blob").order_by("-updated_at")
+        samples = [stored_state(s) for s in sessions[: options["samples"]].iterator()]
+        if not samples:
+            raise CommandError("No conversations to train on.")
+
+        try:
+            dictionary = state_codec.train_dictionary(samples, options["size"])
+            path = state_codec.save_dictionary(dictionary)
+        except (zstandard.ZstdError, ValueError, OSError) as e:
+            raise CommandError(f"Could not train dictionary: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained dictionary {dictionary.dict_id()} on {len(samples)} conversations -> {path}"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_alter_booking_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['latitude', 'longitude'], name='project_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:03
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# Frozen here: later changes to properties.currency (or to the rates file)
+# must not change what this migration does. refresh_fx_prices updates the
+# columns to the current rates.
+LOCAL_PRICE_FIELDS = {
+    "AED": "price_aed",
+    "INR": "price_inr",
+    "EUR": "price_eur",
+    "GBP": "price_gbp",
+}
+# properties/data/fx_rates.json as of 2026-10-01, units per 1 USD
+FX_RATES = {
+    "AED": Decimal("3.6725"),
+    "INR": Decimal("83.25"),
+    "EUR": Decimal("0.92"),
+    "GBP": Decimal("0.79"),
+}
+
+
+def backfill_local_prices(apps, schema_editor):
+    Project = apps.get_model("properties", "Project")
+    local_fields = list(LOCAL_PRICE_FIELDS.values())
+
+    batch = []
+    for project in Project.objects.exclude(price_usd=None).only("id", "price_usd").iterator(chunk_size=500):
+        for currency, field in LOCAL_PRICE_FIELDS.items():
+            value = Decimal(str(project.price_usd)) * FX_RATES[currency]
+            setattr(project, field, value.quantize(Decimal("0.01"), ROUND_HALF_UP))
+        batch.append(project)
+        if len(batch) >= 500:
+            Project.objects.bulk_update(batch, local_fields)
+            batch = []
+    if batch:
+        Project.objects.bulk_update(batch, local_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_project_geo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='price_aed',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='price_eur',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='price_gbp',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='price_inr',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='price_usd',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.RunPython(backfill_local_prices, migrations.RunPython.noop),
+    ]
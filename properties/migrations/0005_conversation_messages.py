@@ -0,0 +1,110 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen here, like 0004: price columns of the buyer's currency
+PRICE_FIELDS = {
+    "USD": "price_usd",
+    "AED": "price_aed",
+    "INR": "price_inr",
+    "EUR": "price_eur",
+    "GBP": "price_gbp",
+}
+
+
+def split_messages_out_of_state(apps, schema_editor):
+    ConversationSession = apps.get_model("properties", "ConversationSession")
+    ConversationMessage = apps.get_model("properties", "ConversationMessage")
+
+    for session in ConversationSession.objects.iterator(chunk_size=200):
+        state = dict(session.state or {})
+        messages = state.pop("messages", None) or []
+        candidates = state.pop("candidate_projects", None) or []
+        state["candidate_project_ids"] = [c["id"] for c in candidates if isinstance(c, dict) and "id" in c]
+
+        ConversationMessage.objects.bulk_create([
+            ConversationMessage(
+                session_id=session.pk,
+                seq=seq,
+                role=m.get("role", ""),
+                content=m.get("content") or "",
+            )
+            for seq, m in enumerate(messages)
+        ])
+        ConversationSession.objects.filter(pk=session.pk).update(state=state, message_count=len(messages))
+
+
+def rebuild_candidates(Project, project_ids, profile):
+    # the shortlist as the state stored it before this migration (minus
+    # distances, recomputed by the next search); deleted projects are dropped
+    currency = str((profile or {}).get("currency") or "USD").upper()
+    if currency not in PRICE_FIELDS:
+        currency = "USD"
+    projects = Project.objects.in_bulk(project_ids)
+    candidates = []
+    for pk in project_ids:
+        p = projects.get(pk)
+        if p is None:
+            continue
+        price = getattr(p, PRICE_FIELDS[currency])
+        candidates.append({
+            "id": p.id,
+            "name": p.name,
+            "city": p.city,
+            "country": p.country,
+            "price_usd": float(p.price_usd or 0),
+            "price": float(price) if price is not None else None,
+            "currency": currency,
+            "unit_type": p.unit_type,
+            "no_of_bedrooms": p.no_of_bedrooms,
+            "property_type": p.property_type,
+            "distance_km": None,
+        })
+    return candidates
+
+
+def merge_messages_into_state(apps, schema_editor):
+    ConversationSession = apps.get_model("properties", "ConversationSession")
+    ConversationMessage = apps.get_model("properties", "ConversationMessage")
+    Project = apps.get_model("properties", "Project")
+
+    for session in ConversationSession.objects.iterator(chunk_size=200):
+        state = dict(session.state or {})
+        candidate_ids = state.pop("candidate_project_ids", None) or []
+        state["candidate_projects"] = rebuild_candidates(Project, candidate_ids, state.get("buyer_profile"))
+        state["messages"] = list(
+            ConversationMessage.objects.filter(session_id=session.pk).order_by("seq").values("role", "content")
+        )
+        ConversationSession.objects.filter(pk=session.pk).update(state=state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0004_project_local_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationsession',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ConversationMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('role', models.CharField(max_length=20)),
+                ('content', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='properties.conversationsession')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='conversationmessage',
+            constraint=models.UniqueConstraint(fields=('session', 'seq'), name='conversation_message_session_seq'),
+        ),
+        migrations.RunPython(split_messages_out_of_state, merge_messages_into_state),
+    ]
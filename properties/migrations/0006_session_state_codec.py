@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_conversation_messages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationsession',
+            name='state_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversationsession',
+            name='state_codec',
+            field=models.CharField(default='json', max_length=16),
+        ),
+    ]
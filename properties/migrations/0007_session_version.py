@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_session_state_codec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationsession',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_session_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('lead_id', models.BigIntegerField(blank=True, null=True)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField()),
+                ('last_active_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversationsession',
+            name='history_offset',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='conversationsession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_session_lifecycle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('claimed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to='properties.conversationsession')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='chatidempotencykey',
+            constraint=models.UniqueConstraint(fields=('session', 'key'), name='chat_idempotency_session_key'),
+        ),
+    ]
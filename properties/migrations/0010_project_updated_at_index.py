@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_chat_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
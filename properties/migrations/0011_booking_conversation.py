@@ -0,0 +1,22 @@
+# Generated by Django 4.2.26 on 2026-10-19 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_project_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='conversation_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('conversation_id', 'project'), name='booking_once_per_conversation'),
+        ),
+    ]
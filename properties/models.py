@@ -1,6 +1,10 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 
+from properties.currency import PRICE_FIELDS, convert_from_usd
+from properties.geo import grid_cell
+
 
 class Project(models.Model):
     name = models.CharField(max_length=255)
@@ -20,7 +24,13 @@ class Project(models.Model):
         choices=COMPLETION_STATUS_CHOICES,
         blank=True,
     )
-    price_usd = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    price_usd = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, db_index=True)
+    # price_usd converted with the offline FX table, so budgets can be filtered in the
+    # buyer's currency without per-row conversion (see properties/currency.py)
+    price_aed = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
+    price_inr = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
+    price_eur = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
+    price_gbp = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True, editable=False)
     area_sqm = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     PROPERTY_TYPE_CHOICES = [
         ("apartment", "Apartment"),
@@ -32,8 +42,33 @@ class Project(models.Model):
     features = models.TextField(blank=True)
     facilities = models.TextField(blank=True)
     description = models.TextField(blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # uniform grid cell key ("row:col"), derived from latitude/longitude on save
+    geo_cell = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # catalog version (MAX)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="project_lat_lng_idx"),
+        ]
+
+    def refresh_local_prices(self):
+        """
+        Recomputes the per-currency price columns from price_usd.
+        """
+        for currency, field in PRICE_FIELDS.items():
+            if field != "price_usd":
+                setattr(self, field, convert_from_usd(self.price_usd, currency))
+
+    def save(self, *args, **kwargs):
+        self.refresh_local_prices()
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = grid_cell(self.latitude, self.longitude)
+        else:
+            self.geo_cell = ""
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.name} ({self.city}, {self.country})"
@@ -63,10 +98,15 @@ class Booking(models.Model):
     city = models.CharField(max_length=255)
     preferred_date = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default="pending")
+    # set when booked from a chat: a replayed turn finds the booking instead of repeating it
+    conversation_id = models.UUIDField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
       db_table = "visit_bookings"
+      constraints = [
+          models.UniqueConstraint(fields=["conversation_id", "project"], name="booking_once_per_conversation"),
+      ]
 
     def __str__(self):
         return f"Booking #{self.id} - {self.lead} -> {self.project}"
@@ -75,9 +115,81 @@ class Booking(models.Model):
 class ConversationSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     lead = models.ForeignKey(Lead, null=True, blank=True, on_delete=models.SET_NULL)
+    # compact working state only (profile, shortlist ids, stage, ...);
+    # the chat history lives in ConversationMessage
     state = models.JSONField(default=dict, blank=True)
+    # "json" keeps the state above; other codecs store it encoded in state_blob
+    # (see api_layer/state_codec.py)
+    state_codec = models.CharField(max_length=16, default="json")
+    state_blob = models.BinaryField(null=True, blank=True, editable=False)
+    message_count = models.PositiveIntegerField(default=0)
+    # messages folded into a summary by history compaction: the stored rows
+    # hold message_count - history_offset messages
+    history_offset = models.PositiveIntegerField(default=0)
+    # bumped by every state write; writes are compare-and-swap on it
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # idle-session scans
 
     def __str__(self):
         return f"Conversation {self.id}"
+
+
+class ConversationMessage(models.Model):
+    """
+    One chat message. Rows are append-only: a turn INSERTs its new messages
+    instead of rewriting the whole history.
+    """
+    session = models.ForeignKey(ConversationSession, on_delete=models.CASCADE, related_name="messages")
+    seq = models.PositiveIntegerField()  # 0-based position in the conversation
+    role = models.CharField(max_length=20)
+    content = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "seq"], name="conversation_message_session_seq"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.seq} ({self.role})"
+
+
+class ChatIdempotencyKey(models.Model):
+    """
+    An `Idempotency-Key` sent with a chat turn, and the turn's response once
+    it completed (see api_layer/idempotency.py).
+    """
+    session = models.ForeignKey(ConversationSession, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    # sha256 of the request body: a key can't be reused for another message
+    fingerprint = models.CharField(max_length=64)
+    response = models.JSONField(null=True, blank=True)  # None while in flight
+    claimed_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "key"], name="chat_idempotency_session_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} {self.key}"
+
+
+class ConversationArchive(models.Model):
+    """
+    An expired conversation, moved out of ConversationSession by
+    `python manage.py session_lifecycle`. `payload` is zstd-compressed msgpack
+    of {"state": ..., "messages": [...]}.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    lead_id = models.BigIntegerField(null=True, blank=True)
+    message_count = models.PositiveIntegerField(default=0)
+    payload = models.BinaryField()
+    created_at = models.DateTimeField()
+    last_active_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived conversation {self.id}"
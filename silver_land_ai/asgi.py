@@ -3,6 +3,14 @@ ASGI config for silver_land_ai project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The API views are async, so this is the entry point to deploy:
+
+    uvicorn silver_land_ai.asgi:application           # development
+    gunicorn silver_land_ai.asgi:application          # production, see gunicorn.conf.py
+
+WebSocket connections go to the WebSocket chat (api_layer/websocket.py),
+everything else to Django.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +21,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'silver_land_ai.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api_layer.websocket import chat_socket  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await chat_socket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -26,7 +26,124 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "")
+# API root of OpenRouter, or of a compatible stand-in such as
+# `python manage.py fake_openrouter` (e.g. http://127.0.0.1:8090/api/v1)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# Outbound pacing of LLM calls, per process (agent/rate_limit.py): set to the
+# account's OpenRouter limit divided by the number of worker processes.
+# 0 = unlimited; the burst defaults to one second's worth of calls.
+OPENROUTER_RATE_LIMIT_RPM = float(os.getenv("OPENROUTER_RATE_LIMIT_RPM", "0"))
+OPENROUTER_RATE_LIMIT_BURST = float(os.getenv("OPENROUTER_RATE_LIMIT_BURST", "0"))
 WEB_SEARCH_API_URL = os.getenv("WEB_SEARCH_API_URL", "")
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "8"))
+WEB_SEARCH_POOL_SIZE = int(os.getenv("WEB_SEARCH_POOL_SIZE", "10"))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "1024"))
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "3600"))      # found summaries
+WEB_SEARCH_NEGATIVE_TTL = float(os.getenv("WEB_SEARCH_NEGATIVE_TTL", "120"))  # empty results / errors
+WEB_SEARCH_BREAKER_THRESHOLD = int(os.getenv("WEB_SEARCH_BREAKER_THRESHOLD", "5"))
+WEB_SEARCH_BREAKER_RESET = float(os.getenv("WEB_SEARCH_BREAKER_RESET", "30"))
+
+# Background web lookups for shortlisted projects with sparse details
+WEB_PREFETCH_WORKERS = int(os.getenv("WEB_PREFETCH_WORKERS", "4"))
+WEB_PREFETCH_MAX_PENDING = int(os.getenv("WEB_PREFETCH_MAX_PENDING", "64"))
+WEB_PREFETCH_WAIT = float(os.getenv("WEB_PREFETCH_WAIT", "2"))  # max wait on an in-flight lookup
+
+# Default radius for "near X" searches when the buyer doesn't give one
+GEO_DEFAULT_RADIUS_KM = float(os.getenv("GEO_DEFAULT_RADIUS_KM", "5"))
+
+# Offline FX table (units per 1 USD); defaults to properties/data/fx_rates.json.
+# Run `python manage.py refresh_fx_prices` after changing it.
+FX_RATES_PATH = os.getenv("FX_RATES_PATH", "")
+
+# Prerendered project detail cards (agent/tools/project_info_tool.py)
+PROJECT_CARD_CACHE_TIMEOUT = int(os.getenv("PROJECT_CARD_CACHE_TIMEOUT", "3600"))
+# Django cache alias shared by all processes (e.g. Redis). Then a card hit needs
+# no DB query; without it, cards sit in each process's default cache and every
+# lookup checks the project's updated_at.
+PROJECT_CARD_CACHE_BACKEND = os.getenv("PROJECT_CARD_CACHE_BACKEND", "")
+
+# Trained zstd dictionaries (`python manage.py train_state_dictionary`); empty = no dictionary
+SESSION_STATE_ZSTD_DICT_DIR = os.getenv("SESSION_STATE_ZSTD_DICT_DIR", "")
+# Encoding of ConversationSession state: "json", "msgpack" or "msgpack+zstd".
+# Rows are always readable whatever codec they were written with. Without a
+# dictionary zstd saves little over msgpack (json 10000 / msgpack 7015 /
+# msgpack+zstd 5994 bytes on real sessions) and rows can't be read in SQL or
+# the admin, so plain JSON stays the default until a dictionary is configured.
+SESSION_STATE_CODEC = os.getenv("SESSION_STATE_CODEC", "msgpack+zstd" if SESSION_STATE_ZSTD_DICT_DIR else "json")
+
+# Write-behind cache of live conversations (api_layer/session_cache.py).
+# SESSION_CACHE_SIZE=0 disables it; SESSION_CACHE_FLUSH_INTERVAL=0 writes every turn.
+# Turns are only written behind with sticky routing or a shared backend;
+# otherwise every turn is written through, whatever the flush interval.
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_CACHE_FLUSH_INTERVAL = float(os.getenv("SESSION_CACHE_FLUSH_INTERVAL", "2"))
+# Set when the load balancer keeps each conversation on one worker
+SESSION_CACHE_STICKY_ROUTING = os.getenv("SESSION_CACHE_STICKY_ROUTING", "false").lower() == "true"
+# Django cache alias shared by all workers; needed for write-behind when routing isn't sticky
+SESSION_CACHE_BACKEND = os.getenv("SESSION_CACHE_BACKEND", "")
+# Clean cached conversations idle this long are re-read (they may have been compacted)
+SESSION_CACHE_IDLE_TTL = float(os.getenv("SESSION_CACHE_IDLE_TTL", "600"))
+# Times a chat turn is replayed when another worker saved the conversation first
+SESSION_CAS_RETRIES = int(os.getenv("SESSION_CAS_RETRIES", "2"))
+
+# Admission control for chat turns, per process (api_layer/admission.py):
+# at most LLM_MAX_IN_FLIGHT_TURNS graph runs at a time (0 = unlimited), up to
+# LLM_TURN_QUEUE_SIZE more waiting at most LLM_TURN_QUEUE_TIMEOUT seconds;
+# beyond that the chat endpoint answers 429 with Retry-After.
+LLM_MAX_IN_FLIGHT_TURNS = int(os.getenv("LLM_MAX_IN_FLIGHT_TURNS", "32"))
+LLM_TURN_QUEUE_SIZE = int(os.getenv("LLM_TURN_QUEUE_SIZE", "64"))
+LLM_TURN_QUEUE_TIMEOUT = float(os.getenv("LLM_TURN_QUEUE_TIMEOUT", "15"))
+
+# Idempotency-Key on /api/agents/chat (api_layer/idempotency.py): how long a
+# retry waits for the original request, when a claim counts as abandoned,
+# and how long stored responses are kept.
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+IDEMPOTENCY_CLAIM_TIMEOUT = float(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT", "120"))
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Compression of JSON API responses (api_layer/compression.py): zstd or gzip
+# as the client accepts, for bodies of at least RESPONSE_COMPRESSION_MIN_BYTES
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_COMPRESSION_ZSTD_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Bearer token required by /metrics (empty: open, e.g. behind the private network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Opt-in profiling of chat turns (api_layer/profiling.py): requests sending
+# `X-Profile: <PROFILE_TOKEN>`, plus a random PROFILE_SAMPLE_RATE share of
+# all turns. Both off by default. Reports are listed to staff at /admin/profiles/.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")  # or "sample" (stack sampling)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+
+# One JSON line per graph run on the "agent.trace" logger (agent/tracing.py)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "agent.trace": {
+            "handlers": ["console"],
+            "level": os.getenv("AGENT_TRACE_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Session lifecycle (`python manage.py session_lifecycle`)
+SESSION_TTL_DAYS = int(os.getenv("SESSION_TTL_DAYS", "30"))                  # idle -> archived
+SESSION_COMPACT_IDLE_HOURS = int(os.getenv("SESSION_COMPACT_IDLE_HOURS", "24"))
+SESSION_COMPACT_MAX_MESSAGES = int(os.getenv("SESSION_COMPACT_MAX_MESSAGES", "200"))
+SESSION_COMPACT_KEEP_MESSAGES = int(os.getenv("SESSION_COMPACT_KEEP_MESSAGES", "50"))
+
+# Persist LangGraph checkpoints per conversation (agent/checkpointer.py)
+LANGGRAPH_CHECKPOINTS = os.getenv("LANGGRAPH_CHECKPOINTS", "false").lower() == "true"
+# Checkpoints kept per conversation when pruning after a turn (0 = never prune)
+LANGGRAPH_CHECKPOINTS_KEEP = int(os.getenv("LANGGRAPH_CHECKPOINTS_KEEP", "10"))
 
 
 
@@ -66,6 +183,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api_layer.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
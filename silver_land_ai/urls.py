@@ -17,14 +17,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from api_layer.router import api
-from api_layer.endpoints import conversations, chat
+from api_layer.views import metrics, profile_detail, profiles
+from api_layer.endpoints import conversations, chat, projects
 from ui.views import chat_ui
 
 api.add_router("/conversations", conversations.router)
 api.add_router("/agents", chat.router)
+api.add_router("/projects", projects.router)
 
 urlpatterns = [
+    path("admin/profiles/", profiles, name="profiles"),
+    path("admin/profiles/<str:profile_id>", profile_detail, name="profile_detail"),
     path("admin/", admin.site.urls),
     path("api/", api.urls),
+    path("metrics", metrics, name="metrics"),
      path("", chat_ui, name="chat_ui")
 ]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from agent import langgraph_graph
+from agent.rate_limit import RateLimitTimeout, TokenBucket
+from api_layer.admission import TurnAdmission, TurnQueueFull, turn_admission, turn_priority
+
+
+async def hold(admission: TurnAdmission, seconds: float, priority: int = 3, order=None, name=None):
+    async with admission.admit(priority):
+        if order is not None:
+            order.append(name)
+        await asyncio.sleep(seconds)
+
+
+def test_queued_turns_go_by_stage_priority():
+    async def scenario():
+        admission = TurnAdmission(max_in_flight=1, max_queue=10, max_wait=5)
+        order = []
+        first = asyncio.create_task(hold(admission, 0.05, order=order, name="first"))
+        await asyncio.sleep(0.01)
+        queued = [
+            asyncio.create_task(hold(admission, 0, turn_priority(stage), order, stage))
+            for stage in ("generic", "recommendations", "booking_need_contact", "asking_prefs")
+        ]
+        await asyncio.gather(first, *queued)
+        return order, admission.stats()
+
+    order, stats = asyncio.run(scenario())
+
+    assert order == ["first", "booking_need_contact", "recommendations", "asking_prefs", "generic"]
+    assert stats["admitted"] == 5 and stats["queued"] == 4
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_a_confirmed_booking_is_not_a_booking_in_progress():
+    assert turn_priority("booking_need_project") == 0
+    assert turn_priority("booking_confirmed") == turn_priority("generic") == turn_priority(None)
+
+
+def test_full_queue_and_long_waits_are_refused():
+    async def scenario():
+        admission = TurnAdmission(max_in_flight=1, max_queue=1, max_wait=0.05)
+        running = asyncio.create_task(hold(admission, 0.2))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(hold(admission, 0))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(TurnQueueFull) as full:
+            await hold(admission, 0)
+        with pytest.raises(TurnQueueFull):
+            await waiting  # waited longer than max_wait
+        await running
+        return full.value, admission.stats()
+
+    full, stats = asyncio.run(scenario())
+
+    assert full.retry_after >= 1
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_waiter_on_another_event_loop_is_woken():
+    # over WSGI every request runs its async view in a loop of its own
+    admission = TurnAdmission(max_in_flight=1, max_queue=1, max_wait=5)
+    admitted = threading.Event()
+
+    async def holder():
+        async with admission.admit():
+            waiter = threading.Thread(target=lambda: asyncio.run(hold(admission, 0)) or admitted.set())
+            waiter.start()
+            while not admission.stats()["waiting"]:
+                await asyncio.sleep(0.01)
+        return waiter
+
+    waiter = asyncio.run(holder())
+    waiter.join(2)
+
+    assert admitted.is_set()
+
+
+@pytest.mark.django_db
+def test_chat_is_refused_with_retry_after_when_overloaded(client, settings, monkeypatch):
+    from tests.test_chat_api import chat, start_conversation
+
+    settings.LLM_MAX_IN_FLIGHT_TURNS = 1
+    settings.LLM_TURN_QUEUE_SIZE = 0
+    monkeypatch.setattr(langgraph_graph.llm, "chat", lambda messages: json.dumps({"intent": "generic"}))
+    conversation_id = start_conversation(client)
+    monkeypatch.setattr(turn_admission, "_in_flight", 1)  # another turn holds the only slot
+
+    resp = chat(client, conversation_id, "hi")
+
+    assert resp.status_code == 429
+    assert int(resp["Retry-After"]) >= 1
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_paces_calls_after_a_burst():
+    t = FakeTime()
+    bucket = TokenBucket.per_minute(120, burst=2, clock=t.clock, sleep=t.sleep)  # 2 per second
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits == [0.0, 0.0, 0.5, 0.5]
+    t.now += 10  # refills up to the burst only
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_token_bucket_timeout_gives_the_token_back():
+    t = FakeTime()
+    bucket = TokenBucket(1, capacity=1, clock=t.clock, sleep=t.sleep)
+    bucket.acquire()
+
+    with pytest.raises(RateLimitTimeout) as exc:
+        bucket.acquire(timeout=0.5)
+    assert exc.value.retry_after == pytest.approx(1.0)
+    assert bucket.acquire() == pytest.approx(1.0)  # not 2.0
+    assert TokenBucket(0).acquire() == 0.0
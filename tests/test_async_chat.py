@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from agent import langgraph_graph
+from api_layer.session_cache import session_cache
+from properties.models import ConversationMessage
+from silver_land_ai.asgi import application
+
+
+LLM_LATENCY = 0.1  # seconds per LLM call; a "generic" turn makes two
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    """
+    Stub LLM with injected latency: classifies every message as small talk.
+    """
+    calls = []
+
+    def chat(messages):
+        calls.append(messages)
+        time.sleep(LLM_LATENCY)
+        if "extracts buyer intent" in messages[0]["content"]:
+            return json.dumps({"intent": "generic"})
+        return "Happy to help!"
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", chat)
+    return calls
+
+
+async def run_turns(n: int):
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        # conversations are created one by one: SQLite takes one writer at a time
+        ids = []
+        for _ in range(n):
+            resp = await client.post("/api/conversations")
+            ids.append(resp.json()["conversation_id"])
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/agents/chat", json={"conversation_id": cid, "message": "hi"})
+            for cid in ids
+        ])
+        return ids, responses, time.perf_counter() - started
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_turns_overlap_their_llm_waits(settings, monkeypatch, slow_llm):
+    # turns are written behind (at teardown), so the concurrent phase reads
+    # and writes nothing but the cache
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 60
+    settings.SESSION_CACHE_STICKY_ROUTING = True
+    monkeypatch.setattr(session_cache, "_background", False)
+    n = 20
+
+    ids, responses, elapsed = asyncio.run(run_turns(n))
+
+    assert [r.status_code for r in responses] == [200] * n
+    assert all(r.json()["reply"] == "Happy to help!" for r in responses)
+    assert len(slow_llm) == 2 * n
+
+    serial = n * 2 * LLM_LATENCY
+    assert elapsed < serial / 4, f"{n} turns in {elapsed:.2f}s; one at a time would take {serial:.2f}s"
+
+    session_cache.flush()
+    assert ConversationMessage.objects.filter(session_id__in=ids).count() == 3 * n
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_chat_reads_uncached_conversations_from_db(slow_llm):
+    async def scenario():
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            cid = (await client.post("/api/conversations")).json()["conversation_id"]
+            session_cache.invalidate(cid)
+            resp = await client.post("/api/agents/chat", json={"conversation_id": cid, "message": "hi"})
+            missing = await client.post(
+                "/api/agents/chat",
+                json={"conversation_id": "00000000-0000-0000-0000-000000000000", "message": "hi"},
+            )
+            return resp, missing
+
+    resp, missing = asyncio.run(scenario())
+
+    assert resp.status_code == 200
+    assert [m["role"] for m in resp.json()["agent_state"]["messages"]] == ["assistant", "user", "assistant"]
+    assert session_cache.stats()["misses"] == 1
+    assert missing.status_code == 404
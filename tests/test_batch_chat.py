@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+
+import pytest
+from django.core.management import call_command
+
+from agent import langgraph_graph
+from agent.state import AgentState
+from api_layer import batch_chat
+from api_layer.batch_chat import parse_items, run_batch
+from api_layer.session_store import create_session, load_state
+from properties.models import ConversationMessage, ConversationSession
+
+
+@pytest.fixture
+def echo_llm(monkeypatch):
+    """
+    Stub LLM: small talk that echoes the latest user message; "boom" fails.
+    """
+    def chat(messages):
+        if "extracts buyer intent" in messages[0]["content"]:
+            return json.dumps({"intent": "generic"})
+        last = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        if "boom" in last:
+            raise RuntimeError("LLM unavailable")
+        return f"re: {last}"
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", chat)
+
+
+def run(tmp_path, lines, workers=1):
+    # one worker: the in-memory test DB locks whole tables across threads
+    source = tmp_path / "turns.jsonl"
+    source.write_text("\n".join(lines) + "\n")
+    output = tmp_path / "results.jsonl"
+    call_command("batch_chat", str(source), output=str(output), workers=workers)
+    return [json.loads(line) for line in output.read_text().splitlines()]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_keeps_each_conversations_turns_in_order(tmp_path, echo_llm):
+    existing = create_session(AgentState(messages=[{"role": "assistant", "content": "Hello"}]))
+    lines = []
+    for i in range(3):
+        lines.append(json.dumps({"ref": "a", "message": f"a{i}"}))
+        lines.append(json.dumps({"ref": "b", "message": f"b{i}"}))
+        lines.append(json.dumps({"conversation_id": str(existing.id), "message": f"c{i}"}))
+
+    results = run(tmp_path, lines)
+
+    assert sorted(r["line"] for r in results) == list(range(1, 10))
+    assert all("error" not in r for r in results)
+    by_line = {r["line"]: r for r in results}
+    assert by_line[1]["reply"] == "re: a0" and by_line[7]["reply"] == "re: a2"
+    assert by_line[3]["conversation_id"] == str(existing.id)
+
+    # one conversation per ref, each saved with its turns in input order
+    a_id, b_id = by_line[1]["conversation_id"], by_line[2]["conversation_id"]
+    assert a_id != b_id and by_line[4]["conversation_id"] == a_id
+    for cid, prefix in ((a_id, "a"), (b_id, "b"), (str(existing.id), "c")):
+        session = ConversationSession.objects.get(pk=cid)
+        contents = [m["content"] for m in load_state(session).messages]
+        assert contents[1:] == [x for i in range(3) for x in (f"{prefix}{i}", f"re: {prefix}{i}")]
+        assert session.version == 2  # created, then one save for the whole batch
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_reports_failed_turns_and_invalid_lines(tmp_path, echo_llm):
+    lines = [
+        json.dumps({"ref": "x", "message": "hi"}),
+        json.dumps({"ref": "x", "message": "boom"}),
+        json.dumps({"ref": "x", "message": "never runs"}),
+        "not json",
+        json.dumps({"message": "no conversation"}),
+        json.dumps({"conversation_id": "00000000-0000-0000-0000-000000000000", "message": "hi"}),
+    ]
+
+    results = {r["line"]: r for r in run(tmp_path, lines)}
+
+    assert results[1]["reply"] == "re: hi"
+    assert results[2]["error"].startswith("Turn failed")
+    assert results[3]["error"].startswith("Skipped")
+    assert results[4]["error"] == "Invalid JSON."
+    assert "required" in results[5]["error"]
+    assert results[6]["error"] == "Conversation not found."
+
+    # the turn before the failure was saved
+    stored = ConversationMessage.objects.filter(session_id=results[1]["conversation_id"]).order_by("seq")
+    assert [m.content for m in stored] == [stored[0].content, "hi", "re: hi"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_a_turn_failing_midway_leaves_no_partial_state(tmp_path, monkeypatch):
+    from agent.tools.t2sql_tool import project_sql_tool
+
+    def chat(messages):
+        if "extracts buyer intent" in messages[0]["content"]:
+            last = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+            if "Dubai" in last:
+                return json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k"})
+            return json.dumps({"intent": "generic"})
+        return "re: hi"
+
+    def broken_search(profile):
+        raise RuntimeError("search down")
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", chat)
+    # the intent node fills in the profile, then the search fails
+    monkeypatch.setattr(project_sql_tool, "search_projects_by_profile", broken_search)
+
+    results = {r["line"]: r for r in run(tmp_path, [
+        json.dumps({"ref": "x", "message": "hi"}),
+        json.dumps({"ref": "x", "message": "2BHK in Dubai under 300k"}),
+    ])}
+
+    assert results[2]["error"] == "Turn failed: search down"
+    state = load_state(ConversationSession.objects.get(pk=results[1]["conversation_id"]))
+    assert state.buyer_profile.city is None
+    assert [m["content"] for m in state.messages][1:] == ["hi", "re: hi"]
+
+
+def test_conversations_run_in_parallel_each_in_order(monkeypatch):
+    running, seen = [0], []
+    lock = threading.Lock()
+    peak = [0]
+
+    def run_group(group):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+            seen.append([item.message for item in group])
+        return [{"line": item.line} for item in group]
+
+    monkeypatch.setattr(batch_chat, "run_group", run_group)
+    items, errors = parse_items(
+        json.dumps({"ref": f"r{i % 4}", "message": f"{i % 4}-{i // 4}"}) for i in range(12)
+    )
+
+    results = list(run_batch(items, workers=4))
+
+    assert not errors and len(results) == 12
+    assert peak[0] == 4
+    assert sorted(seen) == [[f"{r}-{t}" for t in range(3)] for r in range(4)]
+
+
+def test_a_failing_conversation_does_not_abort_the_batch(monkeypatch):
+    def run_group(group):
+        if group[0].ref == "bad":
+            raise RuntimeError("database is locked")
+        return [{"line": item.line} for item in group]
+
+    monkeypatch.setattr(batch_chat, "run_group", run_group)
+    items, _ = parse_items([
+        json.dumps({"ref": "bad", "message": "hi"}),
+        json.dumps({"ref": "good", "message": "hi"}),
+        json.dumps({"ref": "bad", "message": "again"}),
+    ])
+
+    results = {r["line"]: r for r in run_batch(items, workers=2)}
+
+    assert results[2] == {"line": 2}
+    assert results[1]["error"] == results[3]["error"] == "Conversation failed: database is locked"
+    assert results[1]["ref"] == "bad"
+
+
+@pytest.fixture
+def shared_session_cache(settings):
+    """
+    Local stand-in for a session cache shared by all workers, written behind.
+    """
+    settings.CACHES = {
+        **settings.CACHES,
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "batch-tests"},
+    }
+    settings.SESSION_CACHE_BACKEND = "shared"
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 60
+    yield
+    from django.core.cache import caches
+    caches["shared"].clear()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_continues_from_turns_published_by_a_web_worker(tmp_path, echo_llm, shared_session_cache):
+    from api_layer.session_cache import SessionCache
+
+    session = create_session(AgentState(messages=[{"role": "assistant", "content": "Hello"}]))
+
+    # a web worker answered a turn and hasn't written it yet
+    web = SessionCache(background=False)
+    web_session, state = web.get(session.id)
+    state.messages += [{"role": "user", "content": "web"}, {"role": "assistant", "content": "re: web"}]
+    web.put(web_session, state)
+
+    results = run(tmp_path, [json.dumps({"conversation_id": str(session.id), "message": "batch"})])
+
+    assert "error" not in results[0]
+    stored = ConversationMessage.objects.filter(session=session).order_by("seq")
+    assert [m.content for m in stored][1:] == ["web", "re: web", "batch", "re: batch"]
+    # the web worker's copy is superseded by the batch's save, not written
+    assert web.flush() == 0
+    assert web.stats()["conflicts"] == 0
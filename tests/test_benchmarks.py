@@ -0,0 +1,68 @@
+import copy
+import os
+from pathlib import Path
+
+import pytest
+
+from benchmarks.flows import FLOWS
+from benchmarks.runner import Config, Thresholds, compare, load, run_benchmark, save
+from properties.models import Booking
+
+BASELINE = Path(__file__).resolve().parent.parent / "benchmarks" / "baseline.json"
+
+
+@pytest.mark.django_db
+def test_every_flow_runs_to_its_scripted_stages():
+    report = run_benchmark(Config(catalog_sizes=(40,), histories=(0, 30), repeat=1, warmup=1))
+
+    assert {(r["flow"], r["history"]) for r in report["results"]} == {(f, h) for f in FLOWS for h in (0, 30)}
+    by_flow = {r["flow"]: r["turns"] for r in report["results"] if r["history"] == 30}
+    for flow, turns in by_flow.items():
+        assert [t["stage"] for t in turns] == [t.stage for t in FLOWS[flow]]
+        assert all(t["wall_ms"]["p50"] > 0 and t["alloc_kb"] > 0 for t in turns)
+
+    assert by_flow["search"][0]["db_queries"] > 0
+    # the search prerendered the cards: only the version check (process-local card cache)
+    assert by_flow["detail"][1]["db_queries"] == 1
+    assert by_flow["clarify"][0]["db_queries"] == 0
+    # 2 histories x (warmup + timed + traced run)
+    assert Booking.objects.count() == 2 * 3
+    # 13 LLM calls per pass over the flows: one per turn, plus an extraction
+    # or a reply in detail, booking and generic turns
+    assert report["meta"]["llm_calls"] == 2 * 3 * 13
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"results": [{
+        "flow": "search", "catalog_size": 100, "history": 0,
+        "turns": [{"stage": "recommendations", "wall_ms": {"p50": 10.0}, "db_queries": 5, "alloc_kb": 80.0}],
+    }]}
+    noisy = copy.deepcopy(baseline)
+    noisy["results"][0]["turns"][0].update(wall_ms={"p50": 14.0}, alloc_kb=120.0)  # within the floors
+    assert compare(noisy, baseline) == []
+
+    slower = copy.deepcopy(baseline)
+    slower["results"][0]["turns"][0].update(wall_ms={"p50": 25.0}, db_queries=6, alloc_kb=400.0)
+    assert compare(slower, baseline) == [
+        "search turn 1 (catalog 100, history 0): p50 25.00 ms, baseline 10.00 ms",
+        "search turn 1 (catalog 100, history 0): 6 DB queries, baseline 5",
+        "search turn 1 (catalog 100, history 0): 400 KB allocated, baseline 80 KB",
+    ]
+    assert compare(slower, baseline, Thresholds(wall=2.0, alloc=5.0, db_queries=1)) == []
+
+    other_catalog = copy.deepcopy(slower)
+    other_catalog["results"][0]["catalog_size"] = 500
+    assert compare(other_catalog, baseline) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not os.getenv("CHAT_BENCHMARK"), reason="full benchmark: set CHAT_BENCHMARK=1")
+def test_benchmark_against_baseline():
+    """
+    The full benchmark. Results go to CHAT_BENCHMARK_OUTPUT when set.
+    """
+    report = run_benchmark(Config())
+    if os.getenv("CHAT_BENCHMARK_OUTPUT"):
+        save(report, os.environ["CHAT_BENCHMARK_OUTPUT"])
+
+    assert compare(report, load(str(BASELINE))) == []
@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 from decimal import Decimal
 
@@ -59,3 +61,19 @@ def test_create_lead_and_booking_creates_records():
     # There should be one lead and one booking in DB
     assert Lead.objects.count() == 1
     assert Booking.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_a_conversation_books_a_project_once():
+    project = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("300000.00"))
+    conversation_id = uuid.uuid4()
+    lead_info = LeadInfo(first_name="Asha", email="asha@example.com")
+
+    first = create_lead_and_booking(lead_info, BuyerProfile(), project.id, conversation_id=conversation_id)
+    again = create_lead_and_booking(lead_info, BuyerProfile(), project.id, conversation_id=conversation_id)
+
+    assert again.pk == first.pk
+    assert Lead.objects.count() == 1
+    # without a conversation, every call books
+    create_lead_and_booking(lead_info, BuyerProfile(), project.id)
+    assert Booking.objects.count() == 2
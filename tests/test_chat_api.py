@@ -0,0 +1,312 @@
+import json
+
+import jsonpatch
+import pytest
+from decimal import Decimal
+
+from properties.models import Booking, ChatIdempotencyKey, ConversationMessage, ConversationSession, Project
+from agent import langgraph_graph
+from agent.state import LeadInfo, ProjectSummary
+from api_layer.session_store import load_state, save_state, stored_state
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Replaces the OpenRouter call: returns queued replies in order.
+    """
+    replies = []
+    monkeypatch.setattr(langgraph_graph.llm, "chat", lambda messages: replies.pop(0))
+    return replies
+
+
+def start_conversation(client):
+    resp = client.post("/api/conversations")
+    assert resp.status_code == 200
+    return resp.json()["conversation_id"]
+
+
+def chat(client, conversation_id, message, response_mode="full", **extra):
+    return client.post(
+        "/api/agents/chat",
+        data=json.dumps({"conversation_id": conversation_id, "message": message, "response_mode": response_mode}),
+        content_type="application/json",
+        **extra,
+    )
+
+
+@pytest.mark.django_db
+def test_chat_turn_appends_messages(client, fake_llm):
+    Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("280000.00")
+    )
+    conversation_id = start_conversation(client)
+
+    fake_llm.append(json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k"}))
+    resp = chat(client, conversation_id, "2BHK in Dubai under 300k")
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert "Marina Heights" in data["reply"]
+    assert data["shortlisted_projects"][0]["name"] == "Marina Heights"
+    assert len(data["agent_state"]["messages"]) == 3
+
+    session = ConversationSession.objects.get(pk=conversation_id)
+    assert session.message_count == 3
+    assert ConversationMessage.objects.filter(session=session).count() == 3
+    assert stored_state(session)["buyer_profile"]["budget_max"] == 300000
+
+
+@pytest.mark.django_db
+def test_delta_mode_returns_new_messages_and_state_patch(client, fake_llm):
+    Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("280000.00")
+    )
+    created = client.post("/api/conversations").json()
+    conversation_id, client_copy = created["conversation_id"], created["agent_state"]
+
+    fake_llm.append(json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k"}))
+    first = chat(client, conversation_id, "2BHK in Dubai under 300k", response_mode="delta").json()
+
+    assert "agent_state" not in first
+    assert [m["role"] for m in first["new_messages"]] == ["assistant"]
+    assert first["new_messages"][0]["content"] == first["reply"]
+    assert first["shortlisted_projects"][0]["name"] == "Marina Heights"
+    client_copy = jsonpatch.apply_patch(client_copy, first["state_patch"])
+    assert client_copy["buyer_profile"]["city"] == "Dubai"
+
+    # the shortlist is only sent again when it changes
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+    second = chat(client, conversation_id, "thanks", response_mode="delta").json()
+    assert second["shortlisted_projects"] is None
+    assert second["new_messages"] == [{"role": "assistant", "content": "Happy to help!"}]
+    client_copy = jsonpatch.apply_patch(client_copy, second["state_patch"])
+
+    # the client's patched copy matches the full state
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Bye!"])
+    full = chat(client, conversation_id, "bye").json()["agent_state"]
+    assert client_copy == {k: v for k, v in full.items() if k not in ("messages", "candidate_projects")}
+
+
+def save_turn_from_other_worker(conversation_id, text):
+    session = ConversationSession.objects.get(pk=conversation_id)
+    state = load_state(session)
+    state.messages += [{"role": "user", "content": text}, {"role": "assistant", "content": f"re: {text}"}]
+    save_state(session, state)
+
+
+@pytest.mark.django_db
+def test_concurrent_turn_is_replayed_on_fresh_state(client, monkeypatch):
+    conversation_id = start_conversation(client)
+    calls = []
+
+    def llm_chat(messages):
+        calls.append(messages)
+        if len(calls) == 1:
+            # another worker finishes a turn while this one waits on the LLM
+            save_turn_from_other_worker(conversation_id, "other")
+        return json.dumps({"intent": "generic"}) if len(calls) % 2 else "Sure!"
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", llm_chat)
+    resp = chat(client, conversation_id, "mine")
+
+    assert resp.status_code == 200
+    assert len(calls) == 4  # the turn ran twice
+    session = ConversationSession.objects.get(pk=conversation_id)
+    assert list(session.messages.order_by("seq").values_list("content", flat=True))[1:] == [
+        "other", "re: other", "mine", "Sure!"
+    ]
+
+
+@pytest.mark.django_db
+def test_replayed_booking_turn_books_once(client, monkeypatch):
+    project = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("280000.00"))
+    conversation_id = start_conversation(client)
+    session = ConversationSession.objects.get(pk=conversation_id)
+    state = load_state(session)
+    state.candidate_projects = [
+        ProjectSummary(id=project.id, name=project.name, city="Dubai", country="UAE", price_usd=280000.0)
+    ]
+    state.selected_project_id = project.id
+    state.lead_info = LeadInfo(first_name="Asha", email="asha@example.com")
+    save_state(session, state)
+    calls = []
+
+    def llm_chat(messages):
+        calls.append(messages)
+        if len(calls) == 2:
+            # another worker saves while this turn is booking
+            save_turn_from_other_worker(conversation_id, "other")
+        return json.dumps({"intent": "book"}) if len(calls) % 2 else "{}"
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", llm_chat)
+    resp = chat(client, conversation_id, "book it")
+
+    assert resp.status_code == 200
+    assert len(calls) == 4  # the turn ran twice
+    assert "Marina Heights" in resp.json()["reply"]
+    assert Booking.objects.filter(conversation_id=conversation_id).count() == 1
+
+
+@pytest.mark.django_db
+def test_conflict_without_retries_left_is_409(client, monkeypatch, settings):
+    settings.SESSION_CAS_RETRIES = 0
+    conversation_id = start_conversation(client)
+
+    def llm_chat(messages):
+        save_turn_from_other_worker(conversation_id, "other")
+        return json.dumps({"intent": "generic"})
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", llm_chat)
+    resp = chat(client, conversation_id, "mine")
+
+    assert resp.status_code == 409
+
+
+def keyed_chat(client, conversation_id, message, key):
+    return chat(client, conversation_id, message, HTTP_IDEMPOTENCY_KEY=key)
+
+
+@pytest.mark.django_db
+def test_retry_with_idempotency_key_replays_the_response(client, fake_llm):
+    conversation_id = start_conversation(client)
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+
+    first = keyed_chat(client, conversation_id, "hi", "key-1")
+    retry = keyed_chat(client, conversation_id, "hi", "key-1")
+
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first
+    assert not fake_llm  # the graph ran once
+    assert ConversationSession.objects.get(pk=conversation_id).message_count == 3
+
+    # the same key with another message is refused
+    assert keyed_chat(client, conversation_id, "hello", "key-1").status_code == 422
+
+
+@pytest.mark.django_db
+def test_retry_waits_for_the_request_in_flight(client, fake_llm, monkeypatch, settings):
+    from api_layer import idempotency
+
+    conversation_id = start_conversation(client)
+    request_fingerprint = idempotency.fingerprint({"conversation_id": conversation_id, "message": "hi", "response_mode": "full"})
+    ChatIdempotencyKey.objects.create(session_id=conversation_id, key="key-1", fingerprint=request_fingerprint)
+    stored = {"conversation_id": conversation_id, "reply": "Stored!", "shortlisted_projects": [], "agent_state": {}}
+    claim = idempotency.claim
+    attempts = []
+
+    def claim_while_original_finishes(*args):
+        result = claim(*args)
+        if not attempts:
+            # the original request completes while the retry polls
+            ChatIdempotencyKey.objects.filter(key="key-1").update(response=stored)
+        attempts.append(result[0])
+        return result
+
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0)
+    monkeypatch.setattr(idempotency, "claim", claim_while_original_finishes)
+    resp = keyed_chat(client, conversation_id, "hi", "key-1")
+
+    assert attempts == [idempotency.IN_FLIGHT, idempotency.DONE]
+    assert resp.json()["reply"] == "Stored!"  # not a new turn
+
+    monkeypatch.setattr(idempotency, "claim", claim)
+    ChatIdempotencyKey.objects.filter(key="key-1").update(response=None)
+    settings.IDEMPOTENCY_WAIT_SECONDS = 0
+    assert keyed_chat(client, conversation_id, "hi", "key-1").status_code == 409
+
+
+@pytest.mark.django_db
+def test_failed_turn_releases_its_idempotency_key(client, fake_llm, monkeypatch):
+    conversation_id = start_conversation(client)
+
+    def llm_down(messages):
+        raise ConnectionError("LLM unavailable")
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", llm_down)
+    with pytest.raises(ConnectionError):
+        keyed_chat(client, conversation_id, "hi", "key-1")
+    assert not ChatIdempotencyKey.objects.exists()
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", lambda messages: fake_llm.pop(0))
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+    assert keyed_chat(client, conversation_id, "hi", "key-1").json()["reply"] == "Happy to help!"
+
+
+def history(client, conversation_id, etag=None, **params):
+    headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+    return client.get(f"/api/conversations/{conversation_id}/messages", params, **headers)
+
+
+@pytest.mark.django_db
+def test_history_pages_and_revalidates(client, fake_llm):
+    conversation_id = start_conversation(client)
+    for text in ("one", "two"):
+        fake_llm.extend([json.dumps({"intent": "generic"}), f"re: {text}"])
+        chat(client, conversation_id, text)
+
+    first_resp = history(client, conversation_id, limit=3)
+    first = first_resp.json()
+    assert [m["seq"] for m in first["messages"]] == [0, 1, 2]
+    assert first["has_more"] and first["next_after"] == 2
+    # same version, another page: the first page's tag doesn't match it
+    rest_resp = history(client, conversation_id, etag=first_resp["ETag"], after=first["next_after"])
+    assert rest_resp.status_code == 200
+    assert rest_resp["ETag"] != first_resp["ETag"]
+    rest = rest_resp.json()
+    assert [m["content"] for m in rest["messages"]] == ["two", "re: two"]
+    assert not rest["has_more"]
+    assert rest["agent_state"]["stage"] == "generic"
+    assert "messages" not in rest["agent_state"]
+
+    # polling: nothing new -> 304, until the next turn
+    poll = history(client, conversation_id, after=4)
+    assert poll.json()["messages"] == []
+    assert history(client, conversation_id, after=4, etag=poll["ETag"]).status_code == 304
+    fake_llm.extend([json.dumps({"intent": "generic"}), "re: three"])
+    chat(client, conversation_id, "three")
+    fresh = history(client, conversation_id, after=4, etag=poll["ETag"])
+    assert [m["seq"] for m in fresh.json()["messages"]] == [5, 6]
+
+    assert history(client, "00000000-0000-0000-0000-000000000000").status_code == 404
+
+
+@pytest.mark.django_db
+def test_history_includes_turns_still_in_the_write_behind_cache(client, fake_llm, settings, monkeypatch):
+    from api_layer.session_cache import session_cache
+
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 60
+    settings.SESSION_CACHE_STICKY_ROUTING = True
+    monkeypatch.setattr(session_cache, "_background", False)
+    conversation_id = start_conversation(client)
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+    chat(client, conversation_id, "hi")
+    assert ConversationSession.objects.get(pk=conversation_id).message_count == 1  # not flushed yet
+
+    messages = history(client, conversation_id).json()["messages"]
+
+    assert [m["content"] for m in messages][1:] == ["hi", "Happy to help!"]
+
+
+@pytest.mark.django_db
+def test_failed_turn_leaves_the_cached_state_untouched(client, fake_llm, monkeypatch):
+    from agent.tools.t2sql_tool import project_sql_tool
+    from api_layer.session_cache import session_cache
+
+    conversation_id = start_conversation(client)
+
+    def broken_search(profile):
+        raise RuntimeError("db down")
+
+    # the intent node fills in the profile in place, then the search fails
+    monkeypatch.setattr(project_sql_tool, "search_projects_by_profile", broken_search)
+    fake_llm.append(json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k", "currency": "EUR"}))
+    with pytest.raises(RuntimeError):
+        chat(client, conversation_id, "2BHK in Dubai under 300k euros")
+
+    _, cached = session_cache.get(conversation_id)
+    assert cached.buyer_profile.city is None
+    assert cached.buyer_profile.currency is None
+    assert len(cached.messages) == 1
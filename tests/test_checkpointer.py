@@ -0,0 +1,178 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from decimal import Decimal
+
+from agent import langgraph_graph
+from agent.checkpointer import DjangoCheckpointSaver
+from agent.langgraph_graph import build_graph
+from agent.models import GraphCheckpoint, GraphCheckpointBlob
+from agent.state import AgentState
+from api_layer.endpoints.chat import checkpointed_app, checkpointer, run_graph
+from api_layer.session_store import load_state
+from properties.models import ConversationSession, Project
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    replies = []
+    monkeypatch.setattr(langgraph_graph.llm, "chat", lambda messages: replies.pop(0))
+    return replies
+
+
+# LangGraph saves checkpoints from a background thread, which needs committed
+# data (and no open test transaction) on SQLite – hence transaction=True below.
+def turn(app, message: str, thread_id: str = "1") -> AgentState:
+    # the rest of the state comes from the thread's latest checkpoint
+    new_message = {"messages": [{"role": "user", "content": message}]}
+    return AgentState(**app.invoke(new_message, {"configurable": {"thread_id": thread_id}}))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_checkpoints_roundtrip_and_store_deltas(fake_llm):
+    Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("280000.00")
+    )
+    saver = DjangoCheckpointSaver()
+    app = build_graph().compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "1"}}
+
+    fake_llm.append(json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k"}))
+    turn(app, "2BHK in Dubai under 300k")
+
+    saved = app.get_state(config).values
+    assert saved["buyer_profile"].city == "Dubai"
+    assert saved["candidate_projects"][0].name == "Marina Heights"
+
+    checkpoints = GraphCheckpoint.objects.filter(thread_id="1").count()
+    blobs = GraphCheckpointBlob.objects.filter(thread_id="1").count()
+    channels = len(AgentState.model_fields)
+    # Full snapshots would store every channel in every checkpoint
+    assert blobs < checkpoints * channels
+
+    history = list(saver.list(config))
+    assert len(history) == checkpoints
+    assert history[0].parent_config is not None
+
+    fake_llm.append(json.dumps({"intent": "generic"}))
+    fake_llm.append("Happy to help!")
+    state = turn(app, "thanks")
+    assert state.buyer_profile.city == "Dubai"
+    messages = app.get_state(config).values["messages"]
+    assert [m["content"] for m in messages if m["role"] == "user"] == ["2BHK in Dubai under 300k", "thanks"]
+    assert messages[-1]["content"] == "Happy to help!"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_messages_blobs_store_only_appended_messages(fake_llm):
+    saver = DjangoCheckpointSaver()
+    app = build_graph().compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "grow"}}
+
+    written = []
+    for i in range(6):
+        seen = set(GraphCheckpointBlob.objects.filter(thread_id="grow").values_list("pk", flat=True))
+        fake_llm.extend([json.dumps({"intent": "generic"}), f"Reply {i}"])
+        turn(app, f"message {i}", thread_id="grow")
+        new = GraphCheckpointBlob.objects.filter(thread_id="grow", channel="messages").exclude(pk__in=seen)
+        written.append(sum(len(bytes(blob.value)) for blob in new))
+        saver.prune("grow", keep_last=1)
+
+    # a turn writes the same bytes whatever the history length
+    assert written[-1] == written[1]
+    messages = app.get_state(config).values["messages"]
+    assert [m["content"] for m in messages] == [
+        text for i in range(6) for text in (f"message {i}", f"Reply {i}")
+    ]
+
+    # a new process (no known base) writes the list in full once, then appends
+    fresh = build_graph().compile(checkpointer=DjangoCheckpointSaver())
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Reply 6"])
+    turn(fresh, "message 6", thread_id="grow")
+    assert [m["content"] for m in fresh.get_state(config).values["messages"]][-2:] == ["message 6", "Reply 6"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_prune_keeps_latest_checkpoint_usable(fake_llm):
+    saver = DjangoCheckpointSaver()
+    app = build_graph().compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "7"}}
+
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Hello!"])
+    turn(app, "hi", thread_id="7")
+    before = app.get_state(config).values
+
+    blobs_before = GraphCheckpointBlob.objects.filter(thread_id="7").count()
+    deleted = saver.prune("7", keep_last=1)
+
+    assert deleted > 0
+    assert GraphCheckpoint.objects.filter(thread_id="7").count() == 1
+    assert GraphCheckpointBlob.objects.filter(thread_id="7").count() < blobs_before
+    assert app.get_state(config).values == before
+
+    saver.delete_thread("7")
+    assert not GraphCheckpoint.objects.filter(thread_id="7").exists()
+    assert not GraphCheckpointBlob.objects.filter(thread_id="7").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_invoke(fake_llm):
+    saver = DjangoCheckpointSaver()
+    app = build_graph().compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "async"}}
+
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Hello!"])
+    state = AgentState(messages=[{"role": "user", "content": "hi"}])
+    asyncio.run(app.ainvoke(state.model_dump(), config))
+
+    snapshot = asyncio.run(app.aget_state(config))
+    assert snapshot.values["messages"][-1]["content"] == "Hello!"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_chat_endpoint_writes_checkpoints(client, fake_llm, settings, monkeypatch):
+    settings.LANGGRAPH_CHECKPOINTS = True
+    settings.LANGGRAPH_CHECKPOINTS_KEEP = 2
+    restarts = []
+    monkeypatch.setattr(checkpointer, "delete_thread", restarts.append)
+
+    conversation_id = client.post("/api/conversations").json()["conversation_id"]
+    for _ in range(2):
+        fake_llm.extend([json.dumps({"intent": "generic"}), "Hello!"])
+        resp = client.post(
+            "/api/agents/chat",
+            data=json.dumps({"conversation_id": conversation_id, "message": "hi"}),
+            content_type="application/json",
+        )
+        assert resp.status_code == 200
+
+    thread_id = str(conversation_id)
+    assert GraphCheckpoint.objects.filter(thread_id=thread_id).count() == 2
+
+    # the second turn started from the first one's checkpoint: it wrote only
+    # its new messages and the channels it changed
+    assert restarts == []
+    stored = ConversationSession.objects.get(pk=conversation_id)
+    saved = checkpointed_app.get_state({"configurable": {"thread_id": thread_id}}).values
+    assert saved["messages"] == load_state(stored).messages
+    blobs = GraphCheckpointBlob.objects.filter(thread_id=thread_id)
+    assert blobs.filter(channel="buyer_profile").count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_checkpoints_restart_when_the_conversation_moved_on(fake_llm, settings):
+    settings.LANGGRAPH_CHECKPOINTS = True
+    conversation_id = uuid.uuid4()
+    state = AgentState(conversation_id=conversation_id, messages=[{"role": "user", "content": "hi"}])
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Hello!"])
+    state = run_graph(conversation_id, state)
+
+    # another worker saved a different turn meanwhile, which this one replays on
+    state.messages += [{"role": "user", "content": "hello?"}, {"role": "assistant", "content": "Hi again"}]
+    state.messages.append({"role": "user", "content": "thanks"})
+    fake_llm.extend([json.dumps({"intent": "generic"}), "Welcome!"])
+    result = run_graph(conversation_id, state)
+
+    assert [m["content"] for m in result.messages] == ["hi", "Hello!", "hello?", "Hi again", "thanks", "Welcome!"]
@@ -0,0 +1,106 @@
+import pytest
+from decimal import Decimal
+
+from django.core.management import call_command
+
+from properties.currency import UnsupportedCurrency, format_money, normalize_currency, parse_amount, resolve_currency
+from properties.models import Project
+from agent.state import BuyerProfile
+from agent.tools.t2sql_tool import project_sql_tool
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("300000 USD", (300000, "USD")),
+        ("$350,000", (350000, "USD")),
+        ("300k", (300000, None)),
+        ("50 lakhs", (5000000, "INR")),
+        ("2.5 cr", (25000000, "INR")),
+        ("1.2 million AED", (1200000, "AED")),
+        ("AED 1.5m", (1500000, "AED")),
+        ("€ 400k", (400000, "EUR")),
+        ("0.5 million pounds", (500000, "GBP")),
+        (450000, (450000, None)),
+        ("no idea", None),
+        (None, None),
+    ],
+)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def test_normalize_currency_and_format():
+    assert normalize_currency("aed") == "AED"
+    assert normalize_currency("rupees") == "INR"
+    assert normalize_currency("SGD") is None
+    assert format_money(1101750, "AED") == "1,101,750 AED"
+
+
+@pytest.mark.django_db
+def test_project_save_fills_local_price_columns():
+    p = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("300000.00"))
+    p.refresh_from_db()
+    assert p.price_aed == Decimal("1101750.00")
+    assert p.price_inr == Decimal("24975000.00")
+
+    p.price_usd = None
+    p.save()
+    p.refresh_from_db()
+    assert p.price_aed is None
+
+
+@pytest.mark.django_db
+def test_search_filters_in_buyer_currency():
+    cheap = Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("250000.00")
+    )
+    Project.objects.create(
+        name="Palm View", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("450000.00")
+    )
+
+    # 1.0M AED ~= 272k USD
+    profile = BuyerProfile(city="Dubai", bedrooms=2, budget_max=1_000_000, currency="AED")
+    results = project_sql_tool.search_projects_by_profile(profile)
+
+    assert [r.id for r in results] == [cheap.id]
+    assert results[0].currency == "AED"
+    assert results[0].price == pytest.approx(918125.0)
+
+
+@pytest.mark.django_db
+def test_budget_in_unsupported_currency_is_reported_not_searched_as_usd():
+    from agent.langgraph_graph import t2sql_node
+    from agent.state import AgentState
+
+    Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("250000.00"))
+    assert resolve_currency(None) == "USD"
+    assert resolve_currency("euros") == "EUR"
+
+    profile = BuyerProfile(city="Dubai", bedrooms=2, budget_max=40_000_000, currency="JPY")
+    with pytest.raises(UnsupportedCurrency):
+        project_sql_tool.search_projects_by_profile(profile)
+
+    state = t2sql_node(AgentState(messages=[{"role": "user", "content": "2BHK in Dubai under 40M yen"}], buyer_profile=profile))
+    assert state.candidate_projects == []
+    assert state.stage == "asking_prefs"
+    assert "can't search prices in JPY" in state.messages[-1]["content"]
+    assert state.buyer_profile.budget_max is None and state.buyer_profile.currency is None
+
+
+@pytest.mark.django_db
+def test_refresh_fx_prices_command(settings, tmp_path):
+    p = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("100.00"))
+
+    rates = tmp_path / "fx.json"
+    rates.write_text('{"base": "USD", "rates": {"USD": 1, "AED": 4, "INR": 80, "EUR": 1, "GBP": 0.5}}')
+    settings.FX_RATES_PATH = str(rates)
+    try:
+        call_command("refresh_fx_prices", "--batch-size", "1")
+        p.refresh_from_db()
+        assert p.price_aed == Decimal("400.00")
+        assert p.price_gbp == Decimal("50.00")
+    finally:
+        settings.FX_RATES_PATH = ""
+        from properties.currency import load_fx_rates
+        load_fx_rates.cache_clear()
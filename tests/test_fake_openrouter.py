@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+from agent.llm_client import LLMClient
+from benchmarks.fake_openrouter import Cassette, FakeOpenRouter, Latency, ScriptResponder
+
+RULES = [
+    {"system": "extracts buyer intent", "reply": {"intent": "generic"}},
+    {"user": "weather", "reply": "Sunny all year round in Dubai."},
+    {"user": "price", "reply": "Prix : 1 200 000 € – مرحبا 🏠"},
+]
+HI = [{"role": "system", "content": "You extracts buyer intent"}, {"role": "user", "content": "hi"}]
+WEATHER = [{"role": "user", "content": "How is the weather?"}]
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(*args, **kwargs):
+        servers.append(FakeOpenRouter(*args, **kwargs).start())
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def client_for(settings, fake):
+    settings.OPENROUTER_BASE_URL = fake.base_url
+    return LLMClient()
+
+
+def test_chat_and_streaming_through_the_settings_base_url(settings, serve):
+    client = client_for(settings, serve(ScriptResponder(RULES)))
+    assert client.base_url.startswith("http://127.0.0.1:")
+
+    assert client.chat(HI) == '{"intent": "generic"}'
+    tokens = []
+    assert client.chat_stream(WEATHER, tokens.append) == "Sunny all year round in Dubai."
+    assert tokens == ["Sunny ", "all ", "year ", "round ", "in ", "Dubai."]
+
+    with pytest.raises(requests.HTTPError) as e:
+        client.chat([{"role": "user", "content": "unscripted"}])
+    assert e.value.response.status_code == 404
+
+
+def test_streamed_non_ascii_tokens_arrive_intact(settings, serve):
+    client = client_for(settings, serve(ScriptResponder(RULES)))
+    tokens = []
+
+    reply = client.chat_stream([{"role": "user", "content": "What's the price?"}], tokens.append)
+
+    assert reply == "Prix : 1 200 000 € – مرحبا 🏠"
+    assert tokens[-2:] == ["مرحبا ", "🏠"]
+
+
+def test_record_once_then_replay(settings, serve, tmp_path):
+    upstream = serve(ScriptResponder(RULES))
+    path = str(tmp_path / "calls.jsonl")
+
+    recorder = client_for(settings, serve(cassette=Cassette(path), record_upstream=upstream.base_url))
+    assert recorder.chat(WEATHER) == "Sunny all year round in Dubai."
+    assert recorder.chat(WEATHER) == "Sunny all year round in Dubai."
+    assert upstream.calls == 1
+
+    # a later replay-only run, without the upstream
+    replay = serve(cassette=Cassette(path))
+    client = client_for(settings, replay)
+    tokens = []
+    assert client.chat_stream(WEATHER, tokens.append) == "Sunny all year round in Dubai."
+    assert replay.stats["replayed"] == 1
+    with pytest.raises(requests.HTTPError):
+        client.chat(HI)
+
+
+def test_injected_errors_and_rate_limits(settings, serve):
+    failing = client_for(settings, serve(ScriptResponder(RULES), error_rate=1.0, error_status=503))
+    with pytest.raises(requests.HTTPError) as e:
+        failing.chat(WEATHER)
+    assert e.value.response.status_code == 503
+
+    limited = client_for(settings, serve(ScriptResponder(RULES), rate_limit_rpm=6))
+    limited.chat(WEATHER)
+    with pytest.raises(requests.HTTPError) as e:
+        limited.chat(WEATHER)
+    assert e.value.response.status_code == 429
+    assert e.value.response.headers["Retry-After"] == "10"
+    assert e.value.response.json()["error"]["code"] == 429
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("0.25", 0.25, 0.25),
+    ("uniform:0.1:0.2", 0.1, 0.2),
+    ("normal:0.05:0.5", 0.0, 10.0),
+    ("lognormal:0.3:0.5", 0.0, 10.0),
+])
+def test_latency_distributions(spec, low, high):
+    latency = Latency.parse(spec, seed=1)
+    samples = [latency.sample() for _ in range(200)]
+    assert all(low <= s <= high for s in samples)
+    again = Latency.parse(spec, seed=1)
+    assert [again.sample() for _ in range(3)] == samples[:3]
+
+
+def test_bad_latency_spec():
+    with pytest.raises(ValueError):
+        Latency.parse("pareto:1:2")
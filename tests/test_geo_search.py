@@ -0,0 +1,70 @@
+import pytest
+from decimal import Decimal
+
+from properties.geo import find_place, grid_cell, haversine_km
+from properties.models import Project
+from agent.state import BuyerProfile
+from agent.tools.t2sql_tool import project_sql_tool
+
+
+def make_project(name, lat, lng, price="300000.00"):
+    return Project.objects.create(
+        name=name,
+        city="Dubai",
+        country="UAE",
+        no_of_bedrooms=2,
+        property_type="apartment",
+        unit_type="2BHK",
+        price_usd=Decimal(price),
+        latitude=lat,
+        longitude=lng,
+    )
+
+
+def test_find_place_and_haversine():
+    place = find_place("near dubai marina")
+    assert place["name"] == "Dubai Marina"
+    assert place["city"] == "Dubai"
+    assert find_place("JBR")["name"] == "Jumeirah Beach Residence"
+    assert find_place("Atlantis of the Moon") is None
+
+    # Dubai Marina -> Burj Khalifa is roughly 20 km
+    burj = find_place("Burj Khalifa")
+    d = haversine_km(place["lat"], place["lng"], burj["lat"], burj["lng"])
+    assert 18 < d < 23
+
+
+@pytest.mark.django_db
+def test_project_save_sets_grid_cell():
+    p = make_project("Marina Gate", 25.0860, 55.1470)
+    assert p.geo_cell == grid_cell(25.0860, 55.1470)
+
+    p.latitude = None
+    p.save()
+    assert p.geo_cell == ""
+
+
+@pytest.mark.django_db
+def test_search_by_profile_near_location_orders_by_distance():
+    far_cheap = make_project("Creek Vista", 25.2000, 55.3450, price="150000.00")
+    near = make_project("Marina Gate", 25.0860, 55.1470, price="320000.00")
+    nearest = make_project("Marina Promenade", 25.0810, 55.1410, price="290000.00")
+    Project.objects.create(name="No Coords Tower", city="Dubai", country="UAE", no_of_bedrooms=2)
+
+    profile = BuyerProfile(city="Dubai", bedrooms=2, near_location="Dubai Marina", radius_km=5)
+    results = project_sql_tool.search_projects_by_profile(profile)
+
+    assert [r.id for r in results] == [nearest.id, near.id]
+    assert results[0].distance_km < results[1].distance_km <= 5
+    assert far_cheap.id not in {r.id for r in results}
+
+
+@pytest.mark.django_db
+def test_search_projects_near_point():
+    inside = make_project("Marina Gate", 25.0860, 55.1470)
+    make_project("Downtown Views", 25.1950, 55.2780)
+
+    results = project_sql_tool.search_projects_near(25.0805, 55.1403, radius_km=2)
+
+    assert [r.id for r in results] == [inside.id]
+    assert results[0].distance_km is not None
@@ -0,0 +1,62 @@
+import pytest
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from properties.models import Project
+from agent import langgraph_graph
+from agent.prefetch import WebInfoPrefetcher
+from agent.state import AgentState, BuyerProfile
+from agent.tools.web_search_tool import WebSearchTool
+
+
+def test_prefetch_dedupes_in_flight_lookups(web_search_stub):
+    web_search_stub.delay = 0.2
+    prefetcher = WebInfoPrefetcher(tool=WebSearchTool(api_url=web_search_stub.url), max_workers=2)
+
+    first = prefetcher.prefetch("Marina Heights", "Dubai")
+    second = prefetcher.prefetch("Marina Heights", "Dubai")
+    assert first is second
+
+    assert prefetcher.get("Marina Heights", "Dubai", wait=5) == "About Marina Heights Dubai"
+    # Now cached: nothing new is scheduled and no further requests are made
+    assert prefetcher.prefetch("Marina Heights", "Dubai") is None
+    assert web_search_stub.requests == ["Marina Heights Dubai"]
+
+
+def test_prefetch_is_noop_without_web_search():
+    prefetcher = WebInfoPrefetcher(tool=WebSearchTool(api_url=""))
+    assert prefetcher.prefetch("Marina Heights", "Dubai") is None
+    assert prefetcher.get("Marina Heights", "Dubai") is None
+
+
+@pytest.mark.django_db
+def test_shortlist_prefetches_sparse_projects_for_detail_turn(web_search_stub, monkeypatch):
+    cache.clear()
+    prefetcher = WebInfoPrefetcher(tool=WebSearchTool(api_url=web_search_stub.url), max_workers=2)
+    monkeypatch.setattr(langgraph_graph, "web_info_prefetcher", prefetcher)
+
+    sparse = Project.objects.create(
+        name="Creek Vista", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("250000.00")
+    )
+    Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2,
+        price_usd=Decimal("300000.00"), description="A premium waterfront apartment.",
+    )
+
+    state = AgentState(buyer_profile=BuyerProfile(city="Dubai", bedrooms=2, budget_max=400000))
+    state = langgraph_graph.t2sql_node(state)
+    assert len(state.candidate_projects) == 2
+
+    # Only the sparse project was looked up in the background
+    assert prefetcher.get("Creek Vista", "Dubai", wait=5) == "About Creek Vista Dubai"
+    assert web_search_stub.requests == ["Creek Vista Dubai"]
+
+    state.selected_project_id = sparse.id
+    state.messages.append({"role": "user", "content": "tell me more"})
+    state = langgraph_graph.project_detail_node(state)
+
+    reply = state.messages[-1]["content"]
+    assert "From external sources" in reply
+    assert "About Creek Vista Dubai" in reply
+    assert web_search_stub.requests == ["Creek Vista Dubai"]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from agent import langgraph_graph
+from api_layer.profiling import profile_store
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def chat(messages):
+        if "intent" in messages[0]["content"]:
+            return json.dumps({"intent": "generic"})
+        return "Happy to help!"
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", chat)
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    profile_store.clear()
+    yield
+    profile_store.clear()
+
+
+def chat(client, conversation_id, **headers):
+    return client.post(
+        "/api/agents/chat",
+        data=json.dumps({"conversation_id": conversation_id, "message": "hi"}),
+        content_type="application/json",
+        **headers,
+    )
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_header_triggers_a_profile_served_to_staff(client, admin_client, settings, fake_llm, mode):
+    settings.PROFILE_TOKEN = "let-me-profile"
+    settings.PROFILE_MODE = mode
+    settings.PROFILE_SAMPLE_INTERVAL = 0.0005
+    conversation_id = client.post("/api/conversations").json()["conversation_id"]
+
+    assert "X-Profile-Id" not in chat(client, conversation_id)
+    assert "X-Profile-Id" not in chat(client, conversation_id, HTTP_X_PROFILE="wrong")
+    resp = chat(client, conversation_id, HTTP_X_PROFILE="let-me-profile")
+    assert resp.status_code == 200
+    profile_id = resp["X-Profile-Id"]
+
+    [summary] = admin_client.get("/admin/profiles/").json()["profiles"]
+    assert summary["id"] == profile_id
+    assert summary["conversation_id"] == conversation_id
+    assert summary["trigger"] == "header" and summary["mode"] == mode
+
+    report = admin_client.get(f"/admin/profiles/{profile_id}").json()
+    assert len(report["cpu"]) <= settings.PROFILE_TOP_N
+    assert report["peak_kb"] > 0 and report["memory"]
+    if mode == "cprofile":
+        assert any(row["function"].endswith("(invoke)") for row in report["cpu"])
+
+
+def test_sampling_rate_and_bounded_store(client, settings, fake_llm):
+    settings.PROFILE_SAMPLE_RATE = 1.0
+    settings.PROFILE_STORE_SIZE = 2
+    conversation_id = client.post("/api/conversations").json()["conversation_id"]
+
+    ids = [chat(client, conversation_id)["X-Profile-Id"] for _ in range(3)]
+
+    assert [s["id"] for s in profile_store.summaries()] == ids[:0:-1]
+    assert profile_store.get(ids[0]) is None
+
+
+def test_profiles_are_staff_only(client, django_user_model):
+    assert client.get("/admin/profiles/").status_code == 302
+    client.force_login(django_user_model.objects.create_user("agent", password="x"))
+    assert client.get("/admin/profiles/").status_code == 302
@@ -0,0 +1,41 @@
+import pytest
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from properties.models import Project
+from agent.state import AgentState, ProjectSummary
+from agent.langgraph_graph import project_detail_node
+from agent.tools.project_info_tool import warm_project_cards
+
+
+@pytest.mark.django_db
+def test_detail_turn_is_served_from_card_cache(django_assert_num_queries, settings):
+    settings.PROJECT_CARD_CACHE_BACKEND = "default"  # stands in for a cache all processes share
+    cache.clear()
+    project = Project.objects.create(
+        name="Marina Heights",
+        city="Dubai",
+        country="UAE",
+        price_usd=Decimal("300000.00"),
+        features="Sea view",
+    )
+    warm_project_cards([project.id])
+
+    state = AgentState(
+        messages=[{"role": "user", "content": "tell me about the first one"}],
+        candidate_projects=[
+            ProjectSummary(id=project.id, name=project.name, city="Dubai", country="UAE", price_usd=300000.0)
+        ],
+        selected_project_id=project.id,
+    )
+    state.buyer_profile.currency = "AED"
+
+    with django_assert_num_queries(0):
+        state = project_detail_node(state)
+
+    reply = state.messages[-1]["content"]
+    assert state.stage == "detail_complete"
+    assert "**Marina Heights** – Full Details:" in reply
+    assert "1,101,750 AED" in reply
+    assert "Would you like to book a visit?" in reply
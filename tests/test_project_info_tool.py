@@ -42,3 +42,68 @@ def test_get_project_details_returns_expected_fields():
     assert "Sea view" in (details["features"] or "")
     assert "Pool" in (details["facilities"] or "")
     assert "waterfront" in (details["description"] or "")
+
+
+@pytest.mark.django_db
+def test_project_card_cache_hit_needs_no_queries(django_assert_num_queries, settings):
+    from django.core.cache import cache
+    from agent.tools.project_info_tool import get_project_card, warm_project_cards
+
+    settings.PROJECT_CARD_CACHE_BACKEND = "default"  # stands in for a cache all processes share
+    cache.clear()
+    p1 = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("300000.00"))
+    p2 = Project.objects.create(name="Palm View", city="Dubai", country="UAE", price_usd=Decimal("450000.00"))
+
+    with django_assert_num_queries(1):
+        warm_project_cards([p1.id, p2.id])
+
+    with django_assert_num_queries(0):
+        card = get_project_card(p2.id)
+    assert card["details"]["name"] == "Palm View"
+    assert "**Palm View** – Full Details:" in card["markdown"]["USD"]
+    assert "AED" in card["markdown"]["AED"]
+
+    # Saving the project invalidates its card
+    p2.name = "Palm View Residences"
+    p2.save()
+    with django_assert_num_queries(1):
+        card = get_project_card(p2.id)
+    assert card["details"]["name"] == "Palm View Residences"
+
+    assert get_project_card(999999) is None
+
+
+@pytest.mark.django_db
+def test_shared_card_version_is_not_moved_back_by_a_stale_read(settings):
+    from django.core.cache import cache
+    from agent.tools.project_info_tool import _store_cards, get_project_card
+
+    settings.PROJECT_CARD_CACHE_BACKEND = "default"
+    cache.clear()
+    project = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("300000.00"))
+    stale = Project.objects.get(pk=project.pk)  # read by a lookup just before the save below
+
+    project.name = "Marina Heights II"
+    project.save()
+    _store_cards([stale])
+
+    assert get_project_card(project.id)["details"]["name"] == "Marina Heights II"
+
+
+@pytest.mark.django_db
+def test_process_local_cards_follow_updated_at(django_assert_num_queries):
+    from django.core.cache import cache
+    from django.utils import timezone
+    from agent.tools.project_info_tool import get_project_card, project_version
+
+    cache.clear()
+    project = Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", price_usd=Decimal("300000.00"))
+    get_project_card(project.id)
+    with django_assert_num_queries(1):  # the version check
+        assert get_project_card(project.id)["details"]["name"] == "Marina Heights"
+
+    # saved by another process: no signal reaches this process's cache
+    version = project_version(project.id)
+    Project.objects.filter(pk=project.pk).update(name="Marina Heights II", updated_at=timezone.now())
+    assert get_project_card(project.id)["details"]["name"] == "Marina Heights II"
+    assert project_version(project.id) != version
@@ -0,0 +1,108 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from properties.models import Project
+
+
+def make_project(name, price, city="Dubai", lat=None, lng=None):
+    return Project.objects.create(
+        name=name,
+        city=city,
+        country="UAE",
+        no_of_bedrooms=2,
+        property_type="apartment",
+        unit_type="2BHK",
+        price_usd=None if price is None else Decimal(price),
+        latitude=lat,
+        longitude=lng,
+    )
+
+
+def names(resp):
+    return [p["name"] for p in resp.json()["items"]]
+
+
+@pytest.mark.django_db
+def test_search_pages_through_results_by_price(client):
+    for name, price in [("C", "300000"), ("A", "100000"), ("On request", None), ("B", "200000"), ("B2", "200000")]:
+        make_project(name, price)
+    make_project("Elsewhere", "50000", city="Abu Dhabi")
+
+    seen, cursor = [], None
+    while True:
+        params = {"city": "dubai", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        data = client.get("/api/projects", params).json()
+        seen += [p["name"] for p in data["items"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ["A", "B", "B2", "C", "On request"]
+
+    aed = client.get("/api/projects", {"city": "Dubai", "currency": "aed", "budget_max": 400000}).json()["items"]
+    assert [p["name"] for p in aed] == ["A", "On request"]  # no price passes budget_max
+    assert aed[0]["currency"] == "AED" and aed[0]["price"] > aed[0]["price_usd"]
+
+    assert client.get("/api/projects", {"cursor": "garbage"}).status_code == 400
+    assert client.get("/api/projects", {"currency": "doubloons"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_near_search_orders_by_distance(client):
+    make_project("Creek Vista", "150000", lat=25.2000, lng=55.3450)
+    make_project("Marina Gate", "320000", lat=25.0860, lng=55.1470)
+    make_project("Marina Crown", "300000", lat=25.0870, lng=55.1420)
+
+    first = client.get("/api/projects", {"near": "Dubai Marina", "radius_km": 5, "limit": 1}).json()
+    second = client.get(
+        "/api/projects", {"near": "Dubai Marina", "radius_km": 5, "limit": 1, "cursor": first["next_cursor"]}
+    ).json()
+
+    found = first["items"] + second["items"]
+    assert {p["name"] for p in found} == {"Marina Gate", "Marina Crown"}  # Creek Vista is ~20 km away
+    assert found[0]["distance_km"] <= found[1]["distance_km"]
+    assert second["next_cursor"] is None
+    assert client.get("/api/projects", {"near": "Atlantis of the Moon"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_search_revalidates_with_catalog_etag(client):
+    project = make_project("A", "100000")
+
+    first = client.get("/api/projects", {"city": "Dubai"})
+    etag, last_modified = first["ETag"], first["Last-Modified"]
+
+    assert client.get("/api/projects", {"city": "Dubai"}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get("/api/projects", {"city": "Dubai"}, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    project.price_usd = Decimal("90000")
+    project.save()
+    changed = client.get("/api/projects", {"city": "Dubai"}, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed["ETag"] != etag
+
+    etag = changed["ETag"]
+    project.delete()
+    assert client.get("/api/projects", {"city": "Dubai"}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_detail_revalidation_skips_the_db(client, django_assert_num_queries, settings):
+    settings.PROJECT_CARD_CACHE_BACKEND = "default"  # stands in for a cache all processes share
+    cache.clear()
+    project = make_project("Marina Heights", "280000")
+
+    resp = client.get(f"/api/projects/{project.id}")
+    assert resp.status_code == 200
+    assert resp.json()["name"] == "Marina Heights"
+    assert resp.json()["price_aed"] > 1_000_000
+
+    with django_assert_num_queries(0):
+        again = client.get(f"/api/projects/{project.id}", HTTP_IF_NONE_MATCH=resp["ETag"])
+    assert again.status_code == 304
+
+    project.name = "Marina Heights II"
+    project.save()
+    assert client.get(f"/api/projects/{project.id}", HTTP_IF_NONE_MATCH=resp["ETag"]).status_code == 200
+    assert client.get("/api/projects/999999").status_code == 404
@@ -0,0 +1,142 @@
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+import zstandard
+from ninja.renderers import JSONRenderer
+
+from agent.state import AgentState, ProjectSummary
+from api_layer.compression import negotiate_encoding
+from api_layer.renderers import ORJSONRenderer
+from api_layer.schemas import ChatResponse, ProjectItem
+from api_layer.session_store import create_session, dump_state
+
+
+def long_conversation_response(n_messages: int = 200) -> dict:
+    """
+    The body of a full-mode chat response late in a long conversation.
+    """
+    rng = random.Random(0)
+    words = "villa apartment marina budget bedrooms Dubai beach view payment plan handover off-plan price".split()
+    projects = [
+        ProjectSummary(
+            id=i, name=f"Project {i}", city="Dubai", country="UAE", price_usd=250000 + i * 1000,
+            unit_type="2BHK", no_of_bedrooms=2, property_type="apartment",
+        )
+        for i in range(10)
+    ]
+    state = AgentState(
+        messages=[
+            {"role": "user" if i % 2 else "assistant", "content": " ".join(rng.choices(words, k=rng.randint(10, 60)))}
+            for i in range(n_messages)
+        ],
+        candidate_projects=projects,
+        stage="recommendations",
+    )
+    return ChatResponse(
+        conversation_id=uuid.uuid4(),
+        reply="Here are some options.",
+        shortlisted_projects=[ProjectItem(**p.model_dump()) for p in projects],
+        agent_state=dump_state(state),
+    ).model_dump()
+
+
+def test_orjson_renderer_matches_the_default_json():
+    data = {
+        "id": uuid.uuid4(),
+        "price": Decimal("280000.50"),
+        "at": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        "counts": {1: "one"},
+        "text": "Dubaï 👋",
+        "nested": [ProjectItem(id=1, name="A", city="Dubai", country="UAE", price_usd=1.5, unit_type=None,
+                               no_of_bedrooms=None, property_type=None)],
+    }
+
+    fast = ORJSONRenderer().render(None, data, response_status=200)
+    default = JSONRenderer().render(None, data, response_status=200)
+
+    assert json.loads(fast) == json.loads(default)
+    assert json.loads(fast)["at"] == "2025-01-02T03:04:05.678Z"  # Django's datetime format
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("gzip, deflate, br", "gzip"),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("zstd;q=0.5, gzip", "gzip"),
+    ("zstd;q=0, *", "gzip"),
+    ("identity", None),
+    ("GZIP;q=0.8", "gzip"),
+])
+def test_accept_encoding_negotiation(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.fixture
+def long_session():
+    messages = [{"role": "user" if i % 2 else "assistant", "content": f"message {i} " * 20} for i in range(60)]
+    return create_session(AgentState(messages=messages))
+
+
+@pytest.mark.django_db
+def test_api_responses_are_compressed_as_negotiated(client, long_session):
+    url = f"/api/conversations/{long_session.id}/messages"
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain
+    assert "Accept-Encoding" in plain["Vary"]
+
+    zstd = client.get(url, HTTP_ACCEPT_ENCODING="gzip, zstd")
+    assert zstd["Content-Encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompress(zstd.content) == plain.content
+    assert len(zstd.content) < len(plain.content) / 4
+
+    gz = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert gz["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.content) == plain.content
+
+    # the weakened ETag still revalidates
+    assert zstd["ETag"] == "W/" + plain["ETag"]
+    assert client.get(url, HTTP_ACCEPT_ENCODING="zstd", HTTP_IF_NONE_MATCH=zstd["ETag"]).status_code == 304
+
+
+@pytest.mark.django_db
+def test_small_responses_are_sent_as_is(client, settings, long_session):
+    url = f"/api/conversations/{long_session.id}/messages?limit=1"
+    assert "Content-Encoding" not in client.get(url, HTTP_ACCEPT_ENCODING="zstd")
+
+    settings.RESPONSE_COMPRESSION_MIN_BYTES = 0
+    assert client.get(url, HTTP_ACCEPT_ENCODING="zstd")["Content-Encoding"] == "zstd"
+
+
+def test_benchmark_long_conversation_encoding():
+    data = long_conversation_response()
+    rounds = 50
+
+    timings = {}
+    for name, renderer in (("json", JSONRenderer()), ("orjson", ORJSONRenderer())):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = renderer.render(None, data, response_status=200)
+        timings[name] = (time.perf_counter() - started) / rounds
+    body = ORJSONRenderer().render(None, data, response_status=200)
+
+    compressors = {
+        "gzip": lambda b: gzip.compress(b, compresslevel=6),
+        "zstd": zstandard.ZstdCompressor(level=3).compress,
+    }
+    sizes = {"raw": len(body)}
+    for name, compress in compressors.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            compressed = compress(body)
+        timings[name] = (time.perf_counter() - started) / rounds
+        sizes[name] = len(compressed)
+
+    assert timings["orjson"] < timings["json"] / 2
+    assert sizes["zstd"] < sizes["raw"] / 3 and sizes["gzip"] < sizes["raw"] / 3
+    assert timings["zstd"] < timings["gzip"]
@@ -0,0 +1,192 @@
+import pytest
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+
+from agent.state import AgentState
+from api_layer.session_cache import SessionCache
+from api_layer.session_store import create_session, dump_state
+from properties.models import ConversationMessage, ConversationSession
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def shared_backend(settings):
+    """
+    Local stand-in for a cache shared by all workers (e.g. Redis in production).
+    """
+    settings.CACHES = {
+        **settings.CACHES,
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "session-tests"},
+    }
+    yield "shared"
+    from django.core.cache import caches
+    caches["shared"].clear()
+
+
+def new_conversation(cache: SessionCache) -> ConversationSession:
+    state = AgentState(messages=[{"role": "assistant", "content": "Hello!"}])
+    session = create_session(state)
+    cache.add(session, state)
+    return session
+
+
+def turn(cache: SessionCache, conversation_id, text: str) -> None:
+    session, state = cache.get(conversation_id)
+    state.messages.append({"role": "user", "content": text})
+    state.messages.append({"role": "assistant", "content": f"re: {text}"})
+    cache.put(session, state, dump_state(state))
+
+
+def stored_messages(session) -> list:
+    return list(ConversationMessage.objects.filter(session=session).order_by("seq").values_list("content", flat=True))
+
+
+def test_hit_needs_no_queries():
+    cache = SessionCache(maxsize=10, flush_interval=0, backend="")
+    session = new_conversation(cache)
+
+    with CaptureQueriesContext(connection) as ctx:
+        _, state = cache.get(session.id)
+    assert len(ctx.captured_queries) == 0
+    assert state.messages[0]["content"] == "Hello!"
+
+    # callers get a copy: appending to it doesn't touch the cached state
+    state.messages.append({"role": "user", "content": "hi"})
+    assert len(cache.get(session.id)[1].messages) == 1
+
+
+def test_rapid_turns_coalesce_into_one_write():
+    clock = FakeClock()
+    cache = SessionCache(maxsize=10, flush_interval=5, backend="", clock=clock, background=False)
+    session = new_conversation(cache)
+
+    for text in ("a", "b", "c"):
+        turn(cache, session.id, text)
+        clock.now += 1
+    assert stored_messages(session) == ["Hello!"]
+
+    assert cache.flush_due() == 0  # first turn is only 3s old
+    clock.now += 2
+    assert cache.flush_due() == 1
+
+    assert stored_messages(session) == ["Hello!", "a", "re: a", "b", "re: b", "c", "re: c"]
+    assert ConversationSession.objects.get(pk=session.id).message_count == 7
+    assert cache.stats()["coalesced"] == 2
+    assert cache.flush_due() == 0
+
+
+def test_eviction_flushes_dirty_entries():
+    cache = SessionCache(maxsize=1, flush_interval=60, backend="", background=False)
+    first = new_conversation(cache)
+    turn(cache, first.id, "hello")
+
+    new_conversation(cache)  # evicts `first`
+
+    assert len(cache) == 1
+    assert stored_messages(first) == ["Hello!", "hello", "re: hello"]
+
+
+def test_miss_and_unknown_conversation_fall_back_to_db():
+    cache = SessionCache(maxsize=10, flush_interval=0, backend="")
+    session = create_session(AgentState(messages=[{"role": "assistant", "content": "Hello!"}]))
+
+    _, state = cache.get(session.id)
+    assert state.messages[0]["content"] == "Hello!"
+    assert cache.stats()["misses"] == 1
+
+    with pytest.raises(Http404):
+        cache.get("00000000-0000-0000-0000-000000000000")
+
+
+def test_shared_backend_hands_conversation_between_workers(shared_backend):
+    worker_a = SessionCache(maxsize=10, flush_interval=60, backend=shared_backend, background=False)
+    worker_b = SessionCache(maxsize=10, flush_interval=60, backend=shared_backend, background=False)
+    session = new_conversation(worker_a)
+
+    turn(worker_a, session.id, "one")  # not flushed yet
+    turn(worker_b, session.id, "two")  # lands on another worker
+
+    _, state = worker_b.get(session.id)
+    assert [m["content"] for m in state.messages] == ["Hello!", "one", "re: one", "two", "re: two"]
+
+    # worker A's copy is stale: it's dropped on flush and reloaded on the next get
+    assert worker_a.flush() == 0
+    assert worker_b.flush() == 1
+    assert stored_messages(session) == ["Hello!", "one", "re: one", "two", "re: two"]
+
+    turn(worker_a, session.id, "three")
+    assert worker_a.flush() == 1
+    assert stored_messages(session)[-2:] == ["three", "re: three"]
+
+
+def test_flush_conflicts_are_reported(caplog):
+    cache = SessionCache(maxsize=10, flush_interval=60, backend="", background=False)
+    session = new_conversation(cache)
+    turn(cache, session.id, "mine")  # answered, not flushed yet
+
+    other = SessionCache(maxsize=10, flush_interval=0, backend="")
+    turn(other, session.id, "other")
+
+    with caplog.at_level("ERROR", logger="api_layer.session_cache"):
+        assert cache.flush() == 0
+    assert cache.stats()["conflicts"] == 1
+    record = next(r for r in caplog.records if r.name == "api_layer.session_cache")
+    assert [m["content"] for m in record.unsaved_messages] == ["mine", "re: mine"]
+    assert stored_messages(session) == ["Hello!", "other", "re: other"]
+
+
+def test_turns_are_written_through_unless_routing_is_sticky(settings):
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 2
+    settings.SESSION_CACHE_STICKY_ROUTING = False
+    worker_a = SessionCache(maxsize=10, backend="", background=False)
+    worker_b = SessionCache(maxsize=10, backend="", background=False)
+    session = new_conversation(worker_a)
+
+    turn(worker_a, session.id, "one")
+    assert stored_messages(session) == ["Hello!", "one", "re: one"]
+    turn(worker_b, session.id, "two")  # lands on another worker, which reads the DB
+    assert stored_messages(session) == ["Hello!", "one", "re: one", "two", "re: two"]
+
+    settings.SESSION_CACHE_STICKY_ROUTING = True
+    assert worker_a.flush_interval == 2
+
+
+def test_disabled_cache_writes_through(settings):
+    settings.SESSION_CACHE_SIZE = 0
+    cache = SessionCache(backend="")
+    session = create_session(AgentState(messages=[{"role": "assistant", "content": "Hello!"}]))
+
+    turn(cache, session.id, "hi")
+
+    assert len(cache) == 0
+    assert stored_messages(session) == ["Hello!", "hi", "re: hi"]
+
+
+def test_pinned_conversations_are_neither_evicted_nor_expired(settings):
+    settings.SESSION_CACHE_IDLE_TTL = 60
+    clock = FakeClock()
+    cache = SessionCache(maxsize=1, flush_interval=0, backend="", clock=clock)
+    pinned = new_conversation(cache)
+    cache.pin(pinned.id)
+
+    other = new_conversation(cache)  # evicted at once: the pinned entry stays
+    assert len(cache) == 1
+    clock.now += 120
+    with CaptureQueriesContext(connection) as ctx:
+        cache.get(pinned.id)
+    assert len(ctx.captured_queries) == 0
+    assert cache.stats()["hits"] == 1
+
+    cache.unpin(pinned.id)
+    cache.get(other.id)  # evicts the formerly pinned entry
+    clock.now += 1
+    cache.get(pinned.id)
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import ormsgpack
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from agent.models import GraphCheckpoint
+from agent.state import AgentState
+from api_layer import state_codec
+from api_layer.session_lifecycle import archive_idle_sessions, compact_idle_sessions, purge_idempotency_keys, reclaim_space
+from api_layer.session_store import create_session, load_state, save_state, stored_state
+from properties.models import ChatIdempotencyKey, ConversationArchive, ConversationMessage, ConversationSession, Project
+
+
+def conversation(n_messages: int, idle: timedelta) -> ConversationSession:
+    messages = [
+        {"role": "user" if i % 2 else "assistant", "content": f"message {i}"}
+        for i in range(n_messages)
+    ]
+    session = create_session(AgentState(messages=messages, stage="recommendations"))
+    ConversationSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - idle)
+    return ConversationSession.objects.get(pk=session.pk)
+
+
+@pytest.mark.django_db
+def test_idle_sessions_are_archived_with_their_history():
+    old = conversation(4, idle=timedelta(days=40))
+    live = conversation(4, idle=timedelta(hours=1))
+    GraphCheckpoint.objects.create(
+        thread_id=str(old.id), checkpoint_id="1", checkpoint_type="msgpack", checkpoint=b"", metadata_type="msgpack", metadata=b""
+    )
+
+    archived = archive_idle_sessions(timezone.now() - timedelta(days=30), batch_size=1, pause=0)
+
+    assert archived == 1
+    assert not ConversationSession.objects.filter(pk=old.pk).exists()
+    assert not ConversationMessage.objects.filter(session_id=old.pk).exists()
+    assert not GraphCheckpoint.objects.filter(thread_id=str(old.id)).exists()
+    assert ConversationSession.objects.filter(pk=live.pk).exists()
+
+    archive = ConversationArchive.objects.get(pk=old.pk)
+    payload = ormsgpack.unpackb(state_codec.decompress(bytes(archive.payload)))
+    assert [m["content"] for m in payload["messages"]] == [f"message {i}" for i in range(4)]
+    assert payload["state"]["stage"] == "recommendations"
+    assert archive.message_count == 4
+
+
+@pytest.mark.django_db
+def test_long_histories_are_folded_into_a_summary():
+    session = conversation(10, idle=timedelta(days=2))
+
+    counts = compact_idle_sessions(timezone.now() - timedelta(days=1), max_messages=6, keep_messages=3, pause=0)
+
+    assert counts == {"sessions": 1, "folded_messages": 7}
+    session.refresh_from_db()
+    assert session.history_offset == 6
+    state = load_state(session)
+    assert [m["role"] for m in state.messages][0] == "system"
+    assert "message 5" in state.messages[0]["content"]
+    assert [m["content"] for m in state.messages[1:]] == ["message 7", "message 8", "message 9"]
+
+    # later turns keep appending after the original seqs
+    state.messages += [{"role": "user", "content": "back again"}, {"role": "assistant", "content": "welcome"}]
+    save_state(session, state)
+    assert session.message_count == 12
+    assert list(session.messages.order_by("seq").values_list("seq", flat=True)) == [6, 7, 8, 9, 10, 11]
+    assert [m["content"] for m in load_state(session).messages][-2:] == ["back again", "welcome"]
+
+
+@pytest.mark.django_db
+def test_legacy_rows_are_reencoded_and_shortlist_snapshots_dropped(settings):
+    settings.SESSION_STATE_CODEC = "msgpack+zstd"
+    kept = Project.objects.create(name="Kept", city="Dubai", country="UAE", price_usd=Decimal("1.00"))
+    session = ConversationSession.objects.create(state={
+        "stage": "recommendations",
+        "candidate_projects": [{"id": kept.id, "name": "Kept"}, {"id": 999999, "name": "Deleted"}],
+    })
+    ConversationSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+    compact_idle_sessions(timezone.now() - timedelta(days=1), max_messages=200, keep_messages=50, pause=0)
+
+    session.refresh_from_db()
+    assert session.state_codec == "msgpack+zstd"
+    data = stored_state(session)
+    assert "candidate_projects" not in data
+    assert data["candidate_project_ids"] == [kept.id]
+
+
+@pytest.mark.django_db
+def test_command_runs_all_steps():
+    conversation(2, idle=timedelta(days=40))
+
+    call_command("session_lifecycle", "--pause", "0")
+
+    assert ConversationArchive.objects.count() == 1
+    # the in-memory test database doesn't use incremental auto_vacuum
+    assert "INCREMENTAL" in reclaim_space("incremental")
+
+
+@pytest.mark.django_db
+def test_old_idempotency_keys_are_purged():
+    session = conversation(2, idle=timedelta(hours=1))
+    now = timezone.now()
+    ChatIdempotencyKey.objects.create(session=session, key="old", fingerprint="f", response={}, completed_at=now - timedelta(days=2))
+    ChatIdempotencyKey.objects.create(session=session, key="new", fingerprint="f", response={}, completed_at=now)
+    ChatIdempotencyKey.objects.create(session=session, key="in-flight", fingerprint="f")
+
+    assert purge_idempotency_keys(now - timedelta(days=1), batch_size=1, pause=0) == 1
+    assert set(ChatIdempotencyKey.objects.values_list("key", flat=True)) == {"new", "in-flight"}
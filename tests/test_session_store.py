@@ -0,0 +1,177 @@
+import json
+import os
+import statistics
+import time
+
+import pytest
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from properties.models import ConversationMessage, ConversationSession, Project
+from agent import langgraph_graph
+from agent.state import AgentState, BuyerProfile, ProjectSummary
+from api_layer.session_store import (
+    StaleSessionError,
+    create_session,
+    load_state,
+    save_state,
+    stored_state,
+)
+
+
+def make_shortlist():
+    p = Project.objects.create(
+        name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("300000.00")
+    )
+    return [ProjectSummary(id=p.id, name=p.name, city=p.city, country=p.country, price_usd=300000.0)]
+
+
+@pytest.mark.django_db
+def test_save_appends_only_new_messages_and_roundtrips():
+    state = AgentState(messages=[{"role": "assistant", "content": "Hello!"}])
+    session = create_session(state)
+    assert state.conversation_id == session.id
+
+    state.messages.append({"role": "user", "content": "2BHK in Dubai"})
+    state.messages.append({"role": "assistant", "content": "Here you go"})
+    state.candidate_projects = make_shortlist()
+    state.buyer_profile = BuyerProfile(city="Dubai", bedrooms=2, currency="AED")
+    save_state(session, state)
+
+    session.refresh_from_db()
+    assert session.message_count == 3
+    assert session.state_codec == "json"
+    assert "messages" not in stored_state(session)
+    assert stored_state(session)["candidate_project_ids"] == [state.candidate_projects[0].id]
+    assert list(ConversationMessage.objects.filter(session=session).values_list("seq", flat=True)) == [0, 1, 2]
+
+    loaded = load_state(session)
+    assert loaded.messages == state.messages
+    assert loaded.conversation_id == session.id
+    assert loaded.candidate_projects[0].name == "Marina Heights"
+    assert loaded.candidate_projects[0].currency == "AED"
+
+
+@pytest.mark.django_db
+def test_load_state_accepts_legacy_full_blob():
+    session = ConversationSession.objects.create(state={
+        "messages": [{"role": "assistant", "content": "Hi"}],
+        "candidate_projects": [{"id": 1, "name": "Old", "city": "Dubai", "country": "UAE", "price_usd": 1.0}],
+        "stage": "recommendations",
+    })
+    state = load_state(session)
+    assert state.messages == [{"role": "assistant", "content": "Hi"}]
+    assert state.candidate_projects[0].name == "Old"
+    assert state.stage == "recommendations"
+
+
+def _bytes_written(ctx):
+    return sum(
+        len(q["sql"].encode())
+        for q in ctx.captured_queries
+        if q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE"))
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("history", [10, 100, 1000])
+def test_bytes_written_per_turn_benchmark(history):
+    """
+    Benchmark: bytes of SQL written for one more turn (user + assistant message)
+    on a conversation that already has `history` messages.
+    """
+    messages = [
+        {"role": "user" if i % 2 else "assistant", "content": f"message {i} " + "x" * 80}
+        for i in range(history)
+    ]
+    shortlist = make_shortlist()
+
+    # Old approach: rewrite the whole state blob every turn
+    legacy = ConversationSession.objects.create(state={})
+    full = AgentState(conversation_id=legacy.id, messages=list(messages), candidate_projects=shortlist)
+    full.messages += [{"role": "user", "content": "next"}, {"role": "assistant", "content": "reply"}]
+    with CaptureQueriesContext(connection) as old_ctx:
+        legacy.state = full.model_dump(mode="json")
+        legacy.save()
+
+    # New approach: append two rows + update the compact state
+    state = AgentState(messages=list(messages), candidate_projects=shortlist)
+    session = create_session(state)
+    state.messages += [{"role": "user", "content": "next"}, {"role": "assistant", "content": "reply"}]
+    with CaptureQueriesContext(connection) as new_ctx:
+        save_state(session, state)
+
+    old_bytes, new_bytes = _bytes_written(old_ctx), _bytes_written(new_ctx)
+
+    # The new write size doesn't grow with the history
+    assert new_bytes < 2000
+    if history >= 100:
+        assert new_bytes * 5 < old_bytes
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not os.getenv("CHAT_BENCHMARK"), reason="timing benchmark: set CHAT_BENCHMARK=1")
+def test_chat_turn_time_does_not_grow_with_history(client, monkeypatch):
+    """
+    Benchmark: median wall time of a real chat turn (POST /api/agents/chat:
+    load, graph run, save, response) on conversations of 10 and 1000
+    messages. A turn handles only its new messages, so 100x the history must
+    not cost anywhere near 100x the time.
+    """
+    replies = []
+    monkeypatch.setattr(langgraph_graph.llm, "chat", lambda messages: replies.pop(0))
+    shortlist = make_shortlist()
+
+    def median_turn_ms(history):
+        state = AgentState(
+            messages=[
+                {"role": "user" if i % 2 else "assistant", "content": f"message {i} " + "x" * 80}
+                for i in range(history)
+            ],
+            candidate_projects=shortlist,
+        )
+        session = create_session(state)
+        times = []
+        for i in range(7):
+            replies.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+            start = time.perf_counter()
+            resp = client.post(
+                "/api/agents/chat",
+                data=json.dumps({"conversation_id": str(session.id), "message": f"question {i}"}),
+                content_type="application/json",
+            )
+            times.append((time.perf_counter() - start) * 1000)
+            assert resp.status_code == 200
+        session.refresh_from_db()
+        assert session.message_count == history + 14
+        return statistics.median(times)
+
+    median_turn_ms(10)  # warmup
+    short, long = median_turn_ms(10), median_turn_ms(1000)
+    assert long < short * 3, f"{long:.2f} ms with 1000 messages, {short:.2f} ms with 10"
+
+
+@pytest.mark.django_db
+def test_stale_write_is_refused():
+    session = create_session(AgentState(messages=[{"role": "assistant", "content": "Hello!"}]))
+    worker_a = ConversationSession.objects.get(pk=session.pk)
+    worker_b = ConversationSession.objects.get(pk=session.pk)
+
+    state_a = load_state(worker_a)
+    state_a.messages += [{"role": "user", "content": "from A"}, {"role": "assistant", "content": "re A"}]
+    save_state(worker_a, state_a)
+    assert worker_a.version == 2
+
+    state_b = load_state(worker_b)
+    state_b.messages += [{"role": "user", "content": "from B"}]
+    state_b.stage = "booking"
+    with pytest.raises(StaleSessionError):
+        save_state(worker_b, state_b)
+
+    session.refresh_from_db()
+    assert session.version == 2
+    assert session.message_count == 3
+    assert stored_state(session)["stage"] is None
+    assert list(session.messages.values_list("content", flat=True)) == ["Hello!", "from A", "re A"]
@@ -0,0 +1,137 @@
+import json
+import random
+
+import ormsgpack
+import pytest
+
+from agent.state import AgentState, BuyerProfile, LeadInfo
+from api_layer import state_codec
+from api_layer.session_store import compact_state, create_session, load_state
+from properties.management.commands.train_state_dictionary import Command as TrainCommand
+from properties.models import ConversationSession
+
+
+CITIES = ["Dubai", "Abu Dhabi", "Mumbai", "London", "Pune", "Sharjah", "Bangalore"]
+STAGES = ["collecting_prefs", "recommendations", "booking", "generic"]
+
+
+def sample_state(rng: random.Random) -> dict:
+    state = AgentState(
+        buyer_profile=BuyerProfile(
+            city=rng.choice(CITIES),
+            bedrooms=rng.randint(1, 5),
+            budget_max=rng.randrange(100_000, 2_000_000, 5_000),
+            property_type=rng.choice(["apartment", "villa", None]),
+            currency=rng.choice(["USD", "AED", "INR"]),
+        ),
+        lead_info=LeadInfo(first_name=rng.choice(["Asha", "Omar", None]), email=None),
+        selected_project_id=rng.choice([None, rng.randint(1, 500)]),
+        intent=rng.choice(["prefs", "detail", "book"]),
+        stage=rng.choice(STAGES),
+    )
+    data = compact_state(state)
+    data["candidate_project_ids"] = rng.sample(range(1, 500), rng.randint(0, 5))
+    return data
+
+
+@pytest.fixture
+def dict_dir(settings, tmp_path):
+    settings.SESSION_STATE_ZSTD_DICT_DIR = str(tmp_path)
+    state_codec.load_dictionaries.cache_clear()
+    yield tmp_path
+    state_codec.load_dictionaries.cache_clear()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("codec", state_codec.CODECS)
+def test_session_roundtrip_with_each_codec(settings, codec):
+    settings.SESSION_STATE_CODEC = codec
+    state = AgentState(
+        messages=[{"role": "assistant", "content": "Hello!"}],
+        buyer_profile=BuyerProfile(city="Dubai", bedrooms=2),
+        stage="recommendations",
+    )
+    session = create_session(state)
+
+    session = ConversationSession.objects.get(pk=session.id)
+    assert session.state_codec == codec
+    assert (session.state_blob is None) == (codec == "json")
+    loaded = load_state(session)
+    assert loaded.buyer_profile.city == "Dubai"
+    assert loaded.stage == "recommendations"
+    assert loaded.messages == state.messages
+
+
+@pytest.mark.django_db
+def test_existing_json_rows_still_load(settings):
+    settings.SESSION_STATE_CODEC = "msgpack+zstd"
+    session = ConversationSession.objects.create(state={"stage": "booking", "candidate_project_ids": []})
+    assert session.state_codec == "json"
+    assert load_state(session).stage == "booking"
+
+
+def test_dictionary_frames_decode_after_retraining(dict_dir):
+    rng = random.Random(7)
+    data = sample_state(rng)
+
+    first = state_codec.save_dictionary(state_codec.train_dictionary([sample_state(rng) for _ in range(300)], 2048))
+    codec, blob = state_codec.encode(data, "msgpack+zstd")
+    assert state_codec.load_dictionaries()[0].dict_id() == int(first.stem.split("-")[1])
+
+    # a newer dictionary becomes the active one, the old rows keep decoding
+    state_codec.save_dictionary(state_codec.train_dictionary([sample_state(rng) for _ in range(300)], 4096))
+    assert state_codec.decode(codec, None, blob) == data
+
+    first.unlink()
+    state_codec.load_dictionaries.cache_clear()
+    with pytest.raises(ValueError):
+        state_codec.decode(codec, None, blob)
+
+
+def test_dictionary_trained_by_another_process_is_picked_up(dict_dir):
+    rng = random.Random(5)
+    data = sample_state(rng)
+    assert state_codec.load_dictionaries()[0] is None  # loaded (empty) before the training
+
+    # another process trains a dictionary and writes rows with it
+    dictionary = state_codec.train_dictionary([sample_state(rng) for _ in range(300)], 2048)
+    state_codec.dictionary_path(dictionary.dict_id()).write_bytes(dictionary.as_bytes())
+    blob = state_codec.compress(ormsgpack.packb(data), dictionary)
+
+    assert state_codec.decode("msgpack+zstd", None, blob) == data
+
+
+@pytest.mark.django_db
+def test_train_state_dictionary_command(dict_dir):
+    rng = random.Random(3)
+    ConversationSession.objects.bulk_create([ConversationSession(state=sample_state(rng)) for _ in range(300)])
+
+    TrainCommand().run_from_argv(["manage.py", "train_state_dictionary", "--size", "2048"])
+
+    assert len(list(dict_dir.glob("state-*.zdict"))) == 1
+    assert state_codec.load_dictionaries()[0] is not None
+
+
+def test_codec_sizes(dict_dir):
+    """
+    Stored size per state: the JSONField text used before vs. each codec.
+    """
+    rng = random.Random(11)
+    state_codec.save_dictionary(state_codec.train_dictionary([sample_state(rng) for _ in range(500)], 4096))
+    with_dict = state_codec.load_dictionaries()[0]
+    states = [sample_state(rng) for _ in range(200)]
+
+    def avg_bytes(encode):
+        return sum(len(encode(s)) for s in states) / len(states)
+
+    sizes = {
+        "json (before)": avg_bytes(lambda s: json.dumps(s).encode()),
+        "msgpack": avg_bytes(ormsgpack.packb),
+        "msgpack+zstd": avg_bytes(lambda s: state_codec.compress(ormsgpack.packb(s))),
+        "msgpack+zstd+dict": avg_bytes(lambda s: state_codec.compress(ormsgpack.packb(s), with_dict)),
+    }
+
+    assert sizes["msgpack"] < sizes["json (before)"]
+    # without a dictionary small states barely compress; the dictionary is what pays off
+    assert sizes["msgpack+zstd"] <= sizes["msgpack"]
+    assert sizes["msgpack+zstd+dict"] * 2 < sizes["json (before)"]
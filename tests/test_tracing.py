@@ -0,0 +1,136 @@
+import json
+import logging
+from decimal import Decimal
+
+import pytest
+
+from agent import langgraph_graph
+from agent.metrics import Counter, Histogram, Registry
+from agent.tracing import LLM_TOKENS, SPAN_SECONDS, TURN_DB_QUERIES
+from properties.models import Project
+
+
+class FakeResponse:
+    def __init__(self, content: str, usage: dict):
+        self.data = {"choices": [{"message": {"content": content}}], "usage": usage}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def openrouter(monkeypatch):
+    """
+    Stands in for the OpenRouter HTTP call (so LLMClient itself is exercised):
+    returns queued replies, each with a usage block.
+    """
+    replies = []
+
+    def post(url, **kwargs):
+        content = replies.pop(0)
+        return FakeResponse(content, {
+            "prompt_tokens": 100, "completion_tokens": 20, "prompt_tokens_details": {"cached_tokens": 64},
+        })
+
+    monkeypatch.setattr(langgraph_graph.llm.http, "post", post)
+    return replies
+
+
+@pytest.fixture
+def trace_log(caplog):
+    logger = logging.getLogger("agent.trace")
+    logger.addHandler(caplog.handler)
+    caplog.set_level(logging.INFO, logger="agent.trace")
+    yield lambda: [json.loads(r.getMessage()) for r in caplog.records if r.name == "agent.trace"]
+    logger.removeHandler(caplog.handler)
+
+
+@pytest.mark.django_db
+def test_turn_trace_covers_nodes_tools_llm_and_db(client, openrouter, trace_log):
+    Project.objects.create(name="Marina Heights", city="Dubai", country="UAE", no_of_bedrooms=2, price_usd=Decimal("280000"))
+    conversation_id = client.post("/api/conversations").json()["conversation_id"]
+    sql_calls = SPAN_SECONDS["tool"].count(name="project_sql_tool", status="ok")
+    prompt_tokens = LLM_TOKENS.value(model=langgraph_graph.llm.model, kind="prompt")
+
+    openrouter.append(json.dumps({"intent": "prefs", "city": "Dubai", "bedrooms": 2, "budget_max": "300k"}))
+    resp = client.post(
+        "/api/agents/chat",
+        data=json.dumps({"conversation_id": conversation_id, "message": "2BHK in Dubai"}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 200
+
+    [trace] = trace_log()
+    assert trace["conversation_id"] == conversation_id
+    assert trace["stage"] == resp.json()["agent_state"]["stage"]
+    assert [s["name"] for s in trace["spans"] if s["kind"] == "node"] == [
+        "user_input_node", "intent_classification_node", "t2sql_node",
+    ]
+    [llm_span] = [s for s in trace["spans"] if s["kind"] == "llm"]
+    assert llm_span["prompt_tokens"] == 100 and llm_span["cached_tokens"] == 64
+    assert any(s["kind"] == "tool" and s["name"] == "project_sql_tool" for s in trace["spans"])
+    assert trace["db_queries"] > 0
+    assert trace["prompt_tokens"] == 100 and trace["completion_tokens"] == 20
+
+    assert SPAN_SECONDS["tool"].count(name="project_sql_tool", status="ok") == sql_calls + 1
+    assert LLM_TOKENS.value(model=langgraph_graph.llm.model, kind="prompt") == prompt_tokens + 100
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, settings, openrouter):
+    conversation_id = client.post("/api/conversations").json()["conversation_id"]
+    openrouter.extend([json.dumps({"intent": "generic"}), "Happy to help!"])
+    client.post(
+        "/api/agents/chat",
+        data=json.dumps({"conversation_id": conversation_id, "message": "hi"}),
+        content_type="application/json",
+    )
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = resp.content.decode()
+    assert "# TYPE agent_node_seconds histogram" in text
+    assert 'agent_node_seconds_bucket{name="respond_node",status="ok",le="+Inf"}' in text
+    assert 'agent_llm_requests_total{model="' in text
+    assert 'chat_turn_admission{stat="admitted"}' in text
+    assert "agent_turn_db_queries_count" in text
+
+    settings.METRICS_TOKEN = "s3cret"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code == 200
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = Histogram("demo_seconds", "Demo", ["name"], registry=registry, buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, name='a "b"')
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP demo_seconds Demo", "# TYPE demo_seconds histogram"]
+    assert lines[2:] == [
+        'demo_seconds_bucket{name="a \\"b\\"",le="0.1"} 1',
+        'demo_seconds_bucket{name="a \\"b\\"",le="1"} 3',
+        'demo_seconds_bucket{name="a \\"b\\"",le="+Inf"} 4',
+        'demo_seconds_sum{name="a \\"b\\""} 4.25',
+        'demo_seconds_count{name="a \\"b\\""} 4',
+    ]
+    assert TURN_DB_QUERIES.buckets[0] == 0
+
+
+def test_counter_samples_keep_the_total_suffix():
+    registry = Registry()
+    counter = Counter("demo_requests_total", "Demo", ["cache"], registry=registry)
+    counter.inc(cache="hit")
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{cache="hit"} 1' in text
+    assert "_total_total" not in text
+    with pytest.raises(ValueError):
+        Counter("demo_requests", "Demo", registry=registry)
@@ -0,0 +1,76 @@
+from agent.tools.web_search_tool import CircuitBreaker, WebSearchTool
+from agent.ttl_cache import TTLCache
+
+
+def test_results_are_cached(web_search_stub):
+    tool = WebSearchTool(api_url=web_search_stub.url)
+
+    assert tool.search_project_info("Marina Heights", "Dubai") == "About Marina Heights Dubai"
+    assert tool.search_project_info("Marina Heights", "Dubai") == "About Marina Heights Dubai"
+
+    assert web_search_stub.requests == ["Marina Heights Dubai"]
+    stats = tool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["calls"] == 1
+    assert stats["latency_max_ms"] > 0
+
+
+def test_misses_and_errors_are_negatively_cached(web_search_stub):
+    tool = WebSearchTool(api_url=web_search_stub.url)
+
+    web_search_stub.mode = "empty"
+    assert tool.search_project_info("Ghost Tower") is None
+    assert tool.search_project_info("Ghost Tower") is None
+
+    web_search_stub.mode = "error"
+    assert tool.search_project_info("Broken Tower") is None
+    assert tool.search_project_info("Broken Tower") is None
+
+    assert web_search_stub.requests == ["Ghost Tower", "Broken Tower"]
+    assert tool.stats()["negative_hits"] == 2
+    assert tool.stats()["errors"] == 1
+
+
+def test_circuit_breaker_skips_failing_provider(web_search_stub, settings):
+    settings.WEB_SEARCH_BREAKER_THRESHOLD = 2
+    tool = WebSearchTool(api_url=web_search_stub.url, negative_ttl=0)
+    web_search_stub.mode = "error"
+
+    tool.search_project_info("A")
+    tool.search_project_info("B")
+    assert tool.breaker.state == "open"
+
+    assert tool.search_project_info("C") is None
+    assert web_search_stub.requests == ["A", "B"]
+    assert tool.stats()["short_circuits"] == 1
+
+
+def test_circuit_breaker_half_open_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()          # single trial call
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_ttl_cache_expiry_and_lru():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=5, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", None, ttl=1)
+    assert cache.lookup("b") == (True, None)
+
+    now[0] = 2
+    assert cache.lookup("b") == (False, None)
+
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert "a" not in cache
+    assert cache.get("d") == 4
@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import pytest
+
+from agent import langgraph_graph
+from agent.llm_client import LLMClient
+from agent.state import AgentState
+from api_layer.session_cache import session_cache
+from api_layer.session_store import create_session
+from properties.models import ConversationMessage, ConversationSession
+from silver_land_ai.asgi import application
+
+
+@pytest.fixture
+def streaming_llm(monkeypatch):
+    """
+    Stub LLM: small talk, with the reply streamed in three tokens.
+    """
+    def chat(messages):
+        return json.dumps({"intent": "generic"})
+
+    def chat_stream(messages, on_token):
+        tokens = ["Happy ", "to ", "help!"]
+        for token in tokens:
+            on_token(token)
+        return "".join(tokens)
+
+    monkeypatch.setattr(langgraph_graph.llm, "chat", chat)
+    monkeypatch.setattr(langgraph_graph.llm, "chat_stream", chat_stream)
+
+
+class SocketClient:
+    """
+    Drives the ASGI app through one WebSocket connection.
+    """
+
+    def __init__(self, path: str):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {"type": "websocket", "path": path, "headers": [], "query_string": b""}
+        self.task = asyncio.create_task(application(scope, self.incoming.get, self.outgoing.put))
+        self.incoming.put_nowait({"type": "websocket.connect"})
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outgoing.get(), 5)
+
+    async def receive_event(self):
+        message = await self.receive()
+        assert message["type"] == "websocket.send", message
+        return json.loads(message["text"])
+
+    def send(self, data):
+        self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def close(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+def new_conversation():
+    return create_session(AgentState(messages=[{"role": "assistant", "content": "Hello"}], stage="greeting"))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_turns_stream_tokens_and_are_saved_at_disconnect(settings, monkeypatch, streaming_llm):
+    settings.SESSION_CACHE_FLUSH_INTERVAL = 60
+    settings.SESSION_CACHE_STICKY_ROUTING = True
+    monkeypatch.setattr(session_cache, "_background", False)
+    session = new_conversation()
+
+    async def scenario():
+        client = SocketClient(f"/ws/conversations/{session.id}")
+        assert (await client.receive())["type"] == "websocket.accept"
+        ready = await client.receive_event()
+        assert ready["type"] == "ready" and ready["agent_state"]["stage"] == "greeting"
+
+        turns = []
+        for text in ("hi", "anything new?"):
+            client.send({"message": text})
+            events = []
+            while not events or events[-1]["type"] != "turn":
+                events.append(await client.receive_event())
+            turns.append(events)
+
+        # written behind: nothing reached the DB while connected
+        stored = await ConversationMessage.objects.filter(session_id=session.id).acount()
+        await client.close()
+        return turns, stored
+
+    turns, stored_while_connected = asyncio.run(scenario())
+
+    for events in turns:
+        assert [e["text"] for e in events[:-1]] == ["Happy ", "to ", "help!"]
+        assert [m["content"] for m in events[-1]["new_messages"]] == ["Happy to help!"]
+    assert stored_while_connected == 1
+
+    assert ConversationMessage.objects.filter(session_id=session.id).count() == 5
+    assert ConversationSession.objects.get(pk=session.id).version == 2  # one save for both turns
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reconnect_recovers_from_the_db_and_bad_frames_get_errors(streaming_llm):
+    session = new_conversation()
+
+    async def scenario():
+        first = SocketClient(f"/ws/conversations/{session.id}")
+        await first.receive()
+        await first.receive_event()
+        first.send({"message": "hi"})
+        while (await first.receive_event())["type"] != "turn":
+            pass
+        await first.close()
+
+        session_cache.invalidate(session.id)
+        second = SocketClient(f"/ws/conversations/{session.id}")
+        await second.receive()
+        ready = await second.receive_event()
+        second.send({"text": "no message"})
+        error = await second.receive_event()
+        await second.close()
+        return ready, error
+
+    ready, error = asyncio.run(scenario())
+
+    assert ready["agent_state"]["stage"] == "generic"
+    assert error == {"type": "error", "status": 400, "detail": 'Expected {"message": "..."}.'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unknown_conversations_are_refused():
+    async def scenario():
+        client = SocketClient("/ws/conversations/00000000-0000-0000-0000-000000000000")
+        message = await client.receive()
+        await asyncio.wait_for(client.task, 5)
+        return message
+
+    assert asyncio.run(scenario()) == {"type": "websocket.close", "code": 4404}
+
+
+class FakeStreamResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def test_chat_stream_parses_server_sent_events(monkeypatch):
+    client = LLMClient()
+    chunk = lambda text: "data: " + json.dumps({"choices": [{"delta": {"content": text}}]})
+    lines = [": OPENROUTER PROCESSING", chunk("Off"), "", chunk("-plan"), chunk(""), "data: [DONE]"]
+    sent = {}
+
+    def post(url, **kwargs):
+        sent.update(kwargs)
+        return FakeStreamResponse(lines)
+
+    monkeypatch.setattr(client.http, "post", post)
+    tokens = []
+
+    assert client.chat_stream([{"role": "user", "content": "hi"}], tokens.append) == "Off-plan"
+    assert tokens == ["Off", "-plan"]
+    assert sent["json"]["stream"] is True and sent["stream"] is True